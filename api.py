@@ -1,11 +1,19 @@
 import aiohttp
 import asyncio
-from db import save_new_post_to_db, save_new_image_to_db
-from logger import logger
-from location import load_district_geojson, get_district_by_point, find_nearby, get_unique_nearby_objects
-from typing import Optional, Any, Union
-from signals import safe_put, post_queue
+import os
+import re
+from db import save_new_posts_batch, get_high_water_marks, save_high_water_mark, get_existing_post_ids
+from logger import bind_log_context, log_context, logger
+from metrics import (CRAWL_CYCLES, CRAWL_FAILURES, CRAWL_INTERVAL_SECONDS, CRAWL_LAST_CYCLE_SECONDS,
+                     CRAWL_LAST_NEW_POSTS, CRAWL_LAST_SUCCESS, CRAWL_NEW_POSTS_RATE, KUFAR_ADS_SAVED,
+                     add_collector, timed)
+from typing import Optional, Any
+from datetime import datetime
 from models import Post
+from ratelimit import TokenBucket
+from scheduler import CrawlScheduler, AdaptiveInterval
+from pipeline import Stage
+from enrichment import EnrichmentExecutor
 
 # ✅ Словарь городов (Kufar использует region code)
 CITY_FILTERS = {
@@ -17,16 +25,30 @@ CITY_FILTERS = {
     "mogilev": "country-belarus~province-mogilyovskaja_oblast~locality-mogilyov"
     }
 
+# Адрес search-api; для нагрузочных тестов — заглушка bench/fake_kufar.py
+KUFAR_API_URL = os.getenv("KUFAR_API_URL", "https://api.kufar.by").rstrip("/")
 
+# Общий лимит запросов к api.kufar.by для всех городов
+KUFAR_RATE_LIMITER = TokenBucket(rate=float(os.getenv("KUFAR_RPS", 2)))
+
+# Сколько страниц максимум листать за один опрос города
+KUFAR_MAX_PAGES = int(os.getenv("KUFAR_MAX_PAGES", 5))
+
+# list_time и ad_id самого свежего уже сохранённого объявления по каждому городу
+HIGH_WATER_MARKS: dict[str, tuple[datetime, Optional[str]]] = {}
+
+
+@timed("api.fetch_ads")
 async def fetch_ads(session: aiohttp.ClientSession,
                     city: str,
-                    limit: int = 30) -> Optional[Any]:
+                    limit: int = 30,
+                    cursor: Optional[str] = None) -> Optional[Any]:
     city_filters = CITY_FILTERS.get(city.lower())
     if not city_filters:
         logger.error(f"Unknown city {city}")
         return None
     url = (
-        f"https://api.kufar.by/search-api/v2/search/rendered-paginated"
+        f"{KUFAR_API_URL}/search-api/v2/search/rendered-paginated"
         f"?cat=1010"
         f"&cur=BYR"
         f"&gtsy={city_filters}"
@@ -35,12 +57,21 @@ async def fetch_ads(session: aiohttp.ClientSession,
         f"&sort=lst.d"
         f"&typ=let"
     )
+    if cursor:
+        url += f"&cursor={cursor}"
 
+    await KUFAR_RATE_LIMITER.acquire()
     try:
         async with session.get(url, timeout=5) as resp:
             if resp.status == 200:
                 data = await resp.json()
                 return data
+            elif resp.status == 429:
+                # притормаживаем все города, а не только этот запрос
+                retry_after = to_float(resp.headers.get("Retry-After")) or 5
+                KUFAR_RATE_LIMITER.pause(retry_after)
+                logger.warning(f"Kufar rate limit for city {city}, pausing requests for {retry_after} sec")
+                return None
             else:
                 logger.error(f"Error {resp.status} while send request to {url}")
                 return None
@@ -51,6 +82,82 @@ async def fetch_ads(session: aiohttp.ClientSession,
     return None
 
 
+def get_next_cursor(data: dict) -> Optional[str]:
+    for page in data.get("pagination", {}).get("pages", []):
+        if page.get("label") == "next":
+            return page.get("token")
+    return None
+
+
+def get_list_time(ad: dict) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(ad["list_time"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def is_known_ad(ad: dict, high_water_mark: Optional[tuple[datetime, Optional[str]]]) -> bool:
+    """Объявление не новее отметки. list_time с точностью до секунды, поэтому в той же секунде
+    отсекается только объявление отметки, остальные отфильтрует parse по id в базе."""
+    list_time = get_list_time(ad)
+    if not high_water_mark or not list_time:
+        return False
+    mark_time, mark_ad_id = high_water_mark
+    return list_time < mark_time or (list_time == mark_time and str(ad.get("ad_id")) == mark_ad_id)
+
+
+def newest_ad_mark(ads: list[dict]) -> Optional[tuple[datetime, str]]:
+    dated_ads = [(get_list_time(ad), ad) for ad in ads if get_list_time(ad)]
+    if not dated_ads:
+        return None
+    list_time, newest = max(dated_ads, key=lambda item: item[0])
+    return list_time, str(newest.get("ad_id"))
+
+
+async def fetch_new_ads(session: aiohttp.ClientSession, city: str) -> Optional[list[dict]]:
+    """Листает выдачу, пока не дойдёт до объявления не новее high-water mark города (не больше KUFAR_MAX_PAGES страниц).
+
+    Без сохранённой отметки берётся только первая страница. Отметка здесь не двигается:
+    это делает advance_high_water_mark, когда объявления сохранены.
+    """
+    high_water_mark = HIGH_WATER_MARKS.get(city)
+    new_ads = []
+    cursor = None
+
+    for page in range(KUFAR_MAX_PAGES):
+        data = await fetch_ads(session, city, cursor=cursor)
+        if not data or "ads" not in data:
+            if page == 0:
+                return None
+            break
+
+        reached_known = False
+        for ad in data["ads"]:
+            if is_known_ad(ad, high_water_mark):
+                reached_known = True
+                continue
+            new_ads.append(ad)
+
+        if high_water_mark is None or reached_known:
+            break
+        cursor = get_next_cursor(data)
+        if not cursor:
+            break
+    else:
+        logger.warning(f"Page limit {KUFAR_MAX_PAGES} reached for city {city}, older ads are skipped")
+
+    return new_ads
+
+
+async def advance_high_water_mark(city: str, mark: Optional[tuple[datetime, str]]) -> None:
+    """Двигает отметку города вперёд; вызывается только после того, как батч сохранён."""
+    current = HIGH_WATER_MARKS.get(city)
+    if mark is None or (current is not None and mark[0] <= current[0]):
+        return
+    HIGH_WATER_MARKS[city] = mark
+    await save_high_water_mark(city, *mark)
+
+
 def get_address(parameters: dict) -> str:
     for parameter in parameters.get('account_parameters', []):
         if parameter.get('p') and parameter.get('p') == "address":
@@ -83,6 +190,16 @@ def get_parameters(parameters: dict) -> dict:
     return data
 
 
+def to_int(value: Any) -> Optional[int]:
+    match = re.match(r"\s*(\d+)", str(value or ''))
+    return int(match.group(1)) if match else None
+
+
+def to_float(value: Any) -> Optional[float]:
+    match = re.match(r"\s*(\d+(?:[.,]\d+)?)", str(value or ''))
+    return float(match.group(1).replace(',', '.')) if match else None
+
+
 def get_location(parameters: dict) -> Optional[tuple[float, float]]:
     for parameter in parameters.get('ad_parameters', []):
         if parameter.get('pl') and parameter.get('pl') == "Координаты":
@@ -92,31 +209,64 @@ def get_location(parameters: dict) -> Optional[tuple[float, float]]:
     return 0.0, 0.0
 
 
-async def parse_city(session: aiohttp.ClientSession, city: str) -> None:
-    """Парсит конкретный город"""
-    data = await fetch_ads(session, city)
-    if not data or "ads" not in data:
-        logger.error(f"No data to city: {city}")
-        return
+class AdsBatch:
+    """Объявления одного опроса города на пути parse -> enrich -> persist.
+
+    done завершается числом новых постов, когда батч сохранён (или отброшен).
+    mark — (list_time, ad_id) самого свежего объявления: high-water mark после сохранения.
+    """
+    __slots__ = ("city", "ads", "mark", "posts", "images", "done")
+
+    def __init__(self, city: str, ads: list[dict]):
+        self.city = city
+        self.ads = ads
+        self.mark = newest_ad_mark(ads)
+        self.posts: list[dict] = []
+        self.images: dict[str, list[str]] = {}
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def finish(self, new_posts: Optional[int]) -> None:
+        if not self.done.done():
+            self.done.set_result(new_posts)
+
+
+@timed("api.parse_city")
+async def parse_city(session: aiohttp.ClientSession, city: str) -> Optional[int]:
+    """Опрашивает город и ждёт, пока конвейер сохранит его объявления.
 
-    for ad in data["ads"]:
+    Возвращает число новых объявлений (None, если данные не получены). Пока очереди
+    конвейера заполнены, put() ждёт — так планировщик не опрашивает Kufar быстрее,
+    чем успевают обрабатываться объявления.
+    """
+    with log_context(city=city):
+        ads = await fetch_new_ads(session, city)
+        if ads is None:
+            logger.error(f"No data to city: {city}")
+            return None
+        if not ads:
+            return 0
+
+        batch = AdsBatch(city, ads)
+        await parse_stage.put(batch)
+        return await batch.done
+
+
+@timed("api.parse_ads")
+async def parse_ads(batch: AdsBatch) -> list[AdsBatch]:
+    """Этап parse: отбрасывает известные объявления и разбирает поля, не требующие геоданных"""
+    city = batch.city
+    bind_log_context(city=city)
+    known_ids = await get_existing_post_ids(str(ad.get("ad_id")) for ad in batch.ads)
+    ads = [ad for ad in batch.ads if str(ad.get("ad_id")) not in known_ids]
+    logger.info(f"City {city}: {len(ads)} ads to process, {len(batch.ads) - len(ads)} already known skipped")
+    if not ads:
+        await advance_high_water_mark(city, batch.mark)
+        batch.finish(0)
+        return []
+
+    for ad in ads:
         ad_id = str(ad.get("ad_id"))
-        price_byn = price_to_float(ad.get("price_byn", 0.0))
-        price_usd = price_to_float(ad.get("price_usd", 0.0))
-        address = get_address(ad)
-        short_description = ad.get("body_short", "Без описания")
-        post_url = ad.get("ad_link", "")
         lat, lon = get_location(ad)
-        district = get_district_by_point(lat, lon, load_district_geojson(city))
-        city_district = district.lower().strip() if district else ""
-
-        nearby_obj = find_nearby(lat, lon, 500)
-        subway = ', '.join(get_unique_nearby_objects(nearby_obj.get('subway', []), 5)) if nearby_obj.get('subway') else ''
-        pharmacy = ', '.join(get_unique_nearby_objects(nearby_obj.get('pharmacy', []), 5)) if nearby_obj.get('pharmacy') else ''
-        kindergarten = ', '.join(get_unique_nearby_objects(nearby_obj.get('kindergarten', []), 5)) if nearby_obj.get('kindergarten') else ''
-        school = ', '.join(get_unique_nearby_objects(nearby_obj.get('school', []), 5)) if nearby_obj.get('school') else ''
-        bank = ', '.join(get_unique_nearby_objects(nearby_obj.get('bank', []), 5)) if nearby_obj.get('bank') else ''
-        convenience = ', '.join(get_unique_nearby_objects(nearby_obj.get('convenience', []), 5)) if nearby_obj.get('convenience') else ''
 
         parameters = get_parameters(ad)
         rooms = parameters.get('number_of_rooms', '')
@@ -126,62 +276,132 @@ async def parse_city(session: aiohttp.ClientSession, city: str) -> None:
         balcony = parameters.get('balcony', '')
         prepayment = parameters.get('prepayment', '')
 
-        saved = await save_new_post_to_db(
-            id=ad_id,
-            price_byn=price_byn,
-            price_usd=price_usd,
-            address=address,
-            short_description=short_description,
-            post_url=post_url,
-            city=city,
-            lat=lat,
-            lon=lon,
-            city_district=city_district,
-            subway=subway,
-            pharmacy=pharmacy,
-            kindergarten=kindergarten,
-            school=school,
-            bank=bank,
-            shop=convenience,
-            rooms=rooms,
-            number_of_floors=number_of_floors,
-            apartment_floor=apartment_floor,
-            total_area=total_area,
-            balcony=balcony,
-            prepayment=prepayment
-
-        )
-
-        images = ad.get("images", [])
-        for img in images:
-            path = img.get('path')
-            if not path:
-                continue
-            url = f"https://rms.kufar.by/v1/list_thumbs_2x/{path}"
-            await save_new_image_to_db(url, ad_id)
+        batch.posts.append({
+            'id': ad_id,
+            'price_byn': price_to_float(ad.get("price_byn", 0.0)),
+            'price_usd': price_to_float(ad.get("price_usd", 0.0)),
+            'address': get_address(ad),
+            'short_description': ad.get("body_short", "Без описания"),
+            'post_url': ad.get("ad_link", ""),
+            'city': city,
+            'is_sent': False,
+            'lat': lat,
+            'lon': lon,
+            'rooms': rooms,
+            'number_of_floors': number_of_floors,
+            'apartment_floor': apartment_floor,
+            'total_area': total_area,
+            'balcony': balcony,
+            'prepayment': prepayment,
+            'rooms_num': to_int(rooms),
+            'total_area_num': to_float(total_area),
+            'apartment_floor_num': to_int(apartment_floor),
+            'number_of_floors_num': to_int(number_of_floors),
+        })
+
+        batch.images[ad_id] = [f"https://rms.kufar.by/v1/list_thumbs_2x/{img.get('path')}"
+                               for img in ad.get("images", []) if img.get('path')]
+
+    batch.ads = []
+    return [batch]
 
-        if saved:
-            logger.info(f"New post [{ad_id}] for city {city}")
 
-        post = await Post.get(id=ad_id)
-        safe_put(post_queue, post)
+@timed("api.enrich_ads")
+async def enrich_ads(batch: AdsBatch) -> list[AdsBatch]:
+    """Этап enrich: район и ближайшая инфраструктура по координатам (считается в пуле процессов)"""
+    bind_log_context(city=batch.city)
+    results = await enricher.enrich(batch.city, [(post['lat'], post['lon']) for post in batch.posts])
+    for post, fields in zip(batch.posts, results):
+        post.update(fields)
+    return [batch]
 
 
-def price_to_float(price_: str) -> Union[float, str]:
+@timed("api.persist_ads")
+async def persist_ads(batch: AdsBatch) -> list[Post]:
+    """Этап persist: сохраняет батч одной транзакцией и отдаёт новые посты дальше в порядке выдачи"""
+    bind_log_context(city=batch.city)
+    new_ids = await save_new_posts_batch(batch.posts, batch.images)
+    if new_ids is None:
+        batch.finish(None)
+        return []
+    await advance_high_water_mark(batch.city, batch.mark)
+    batch.finish(len(new_ids))
+    KUFAR_ADS_SAVED.inc(len(new_ids), city=batch.city)
+    if not new_ids:
+        return []
+
+    order = {post['id']: i for i, post in enumerate(batch.posts)}
+    posts = sorted(await Post.filter(id__in=list(new_ids)), key=lambda p: order[p.id])
+    for post in posts:
+        logger.info(f"New post [{post.id}] for city {batch.city}")
+    return posts
+
+
+def fail_batch(batch: AdsBatch, error: Exception) -> None:
+    batch.finish(None)
+
+
+def price_to_float(price_: str) -> float:
+    """Цена Kufar в копейках -> рубли; пустая или нечисловая цена считается договорной (0.0)."""
     try:
         price = float(price_) / 100
         return price
-    except ValueError:
-        return price_
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def peak_hours_from_env(value: str) -> tuple[int, int]:
+    start, end = value.split("-", 1)
+    return int(start), int(end)
+
+
+enricher = EnrichmentExecutor(list(CITY_FILTERS.keys()),
+                              workers=int(os.getenv("ENRICH_WORKERS", 2)),
+                              inline=os.getenv("ENRICH_INLINE", "0") == "1")
+
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 10))
+
+parse_stage = Stage("parse", parse_ads, workers=int(os.getenv("PIPELINE_PARSE_WORKERS", 2)),
+                    maxsize=PIPELINE_QUEUE_SIZE, on_error=fail_batch)
+enrich_stage = Stage("enrich", enrich_ads, workers=int(os.getenv("PIPELINE_ENRICH_WORKERS", 2)),
+                     maxsize=PIPELINE_QUEUE_SIZE, on_error=fail_batch)
+persist_stage = Stage("persist", persist_ads, workers=int(os.getenv("PIPELINE_PERSIST_WORKERS", 1)),
+                      maxsize=PIPELINE_QUEUE_SIZE, on_error=fail_batch)
+
+crawler = CrawlScheduler(parse_city, list(CITY_FILTERS.keys()),
+                         concurrency=int(os.getenv("PARSE_CONCURRENCY", 3)),
+                         timeout=float(os.getenv("PARSE_CITY_TIMEOUT", 60)),
+                         policy=AdaptiveInterval(
+                             min_interval=float(os.getenv("PARSE_MIN_INTERVAL", 60)),
+                             max_interval=float(os.getenv("PARSE_MAX_INTERVAL", 30 * 60)),
+                             target_new_per_poll=float(os.getenv("PARSE_TARGET_NEW_PER_POLL", 3)),
+                             peak_hours=peak_hours_from_env(os.getenv("PARSE_PEAK_HOURS", "8-23")),
+                             peak_factor=float(os.getenv("PARSE_PEAK_FACTOR", 0.5)),
+                         ))
 
 
 async def start_parse(interval: int = 20):
-    """Запускает парсер с заданным интервалом"""
+    """Запускает парсер: interval — стартовый интервал, дальше он подстраивается под каждый город"""
     logger.info(f"Parser has been started")
+    HIGH_WATER_MARKS.update(await get_high_water_marks())
     async with aiohttp.ClientSession() as session:
-        while True:
-            for city in CITY_FILTERS.keys():
-                await parse_city(session, city)
-                await asyncio.sleep(1)  # небольшая пауза между городами
-            logger.info(f"Parsing complete. Waiting: {interval} sec...")
-            await asyncio.sleep(interval)
+        await crawler.run(session, interval)
+
+
+def collect_crawl_stats() -> None:
+    """Состояние опроса по городам для /metrics (у таймера api.parse_city метки города нет)."""
+    for city, stats in crawler.stats.items():
+        CRAWL_CYCLES.labels(city=city).set(stats.cycles)
+        CRAWL_FAILURES.labels(city=city).set(stats.failures)
+        if stats.interval is not None:
+            CRAWL_INTERVAL_SECONDS.set(stats.interval, city=city)
+        if stats.rate is not None:
+            CRAWL_NEW_POSTS_RATE.set(stats.rate * 3600, city=city)
+        if stats.last_cycle_seconds is not None:
+            CRAWL_LAST_CYCLE_SECONDS.set(stats.last_cycle_seconds, city=city)
+        if stats.last_success is not None:
+            CRAWL_LAST_SUCCESS.set(stats.last_success.timestamp(), city=city)
+            CRAWL_LAST_NEW_POSTS.set(stats.last_new_posts, city=city)
+
+
+add_collector(collect_crawl_stats)
@@ -0,0 +1,75 @@
+"""Пропускная способность и задержка рассылки через DeliveryEngine против заглушки Bot API.
+
+Запуск из корня проекта: python -m bench.bench_delivery --messages 600 --chats 600
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from bench.fake_telegram import start_fake_telegram
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=600)
+    parser.add_argument("--chats", type=int, default=600)
+    parser.add_argument("--port", type=int, default=18081)
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка ответа заглушки, с")
+    parser.add_argument("--flood-probability", type=float, default=0.0)
+    parser.add_argument("--baseline", type=int, default=50,
+                        help="сколько сообщений отправить старым способом (по одному со sleep 0.2 с)")
+    args = parser.parse_args()
+
+    runner, stats = await start_fake_telegram(args.port, latency=args.latency,
+                                              flood_probability=args.flood_probability)
+    os.environ["TG_BOT_TOKEN"] = "123456:fake-token"
+    os.environ["TG_API_SERVER"] = f"http://127.0.0.1:{args.port}"
+    import tg
+
+    chats = [str(1000 + i % args.chats) for i in range(args.messages)]
+
+    if args.baseline:
+        started = time.perf_counter()
+        for chat_id in chats[:args.baseline]:
+            while True:
+                try:
+                    await tg.bot.send_message(chat_id, "baseline")
+                    break
+                except TelegramRetryAfter as e:
+                    await asyncio.sleep(e.retry_after)
+            await asyncio.sleep(0.2)
+        baseline_rate = args.baseline / (time.perf_counter() - started)
+        print(f"serial + sleep(0.2): {baseline_rate:.1f} msg/s")
+
+    latencies = []
+
+    async def send(chat_id: str) -> None:
+        queued = time.perf_counter()
+        await tg.delivery.send(chat_id, lambda: tg.bot.send_message(chat_id, "benchmark"))
+        latencies.append(time.perf_counter() - queued)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(chat_id) for chat_id in chats))
+    elapsed = time.perf_counter() - started
+
+    print(f"delivery engine:     {len(latencies) / elapsed:.1f} msg/s "
+          f"({len(latencies)} messages to {args.chats} chats in {elapsed:.1f} s)")
+    print(f"latency p50: {statistics.median(latencies):.2f} s, p95: {percentile(latencies, 0.95):.2f} s")
+    print(f"FloodWait answers: {stats.flood_waits}")
+
+    await tg.delivery.close()
+    await tg.bot.session.close()
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
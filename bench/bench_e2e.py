@@ -0,0 +1,232 @@
+"""Сквозной бенчмарк: заглушка Kufar -> парсер -> конвейер -> outbox -> заглушка Bot API.
+
+Запускает настоящие start_parse, конвейер parse/enrich/persist/match и воркер outbox
+на засеянной базе (sqlite во временном каталоге или --db-url). Замеряет:
+сколько объявлений в секунду сохранено, сколько доставок в секунду поставлено
+в outbox, сколько сообщений в секунду отправлено, задержку от публикации
+объявления до отправки сообщения и пиковый RSS. Результат — JSON, чтобы сравнивать
+коммиты между собой.
+
+Запуск из корня проекта:
+    python -m bench.bench_e2e --users 10000 --posts 100000 --duration 60 --output e2e.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import resource
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+AD_ID_RE = re.compile(r"/vi/(\d+)")
+CITIES = ["minsk", "vitebsk", "gomel", "grodno", "brest", "mogilev"]
+SEED_BATCH = 5000
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def city_districts() -> dict[str, list[str]]:
+    from location import load_district_geojson
+
+    return {city: [name.lower().strip() for name, _ in load_district_geojson(city) if name] for city in CITIES}
+
+
+def random_user(i: int, rnd: random.Random, districts: dict[str, list[str]]):
+    """Подписчик с правдоподобно узким фильтром: треть на весь город, остальные на один район."""
+    from models import User
+
+    city = rnd.choice(CITIES)
+    min_price = rnd.choice((1, 300, 500, 800))
+    return User(id=str(10 ** 6 + i), first_name=f"user {i}", city=city, is_active=True,
+                min_price=min_price, max_price=min_price + rnd.choice((400, 800, 1500)),
+                district="all" if rnd.random() < 0.3 or not districts[city] else rnd.choice(districts[city]),
+                rooms_count=rnd.choice((1, 2, 3, 4, 5, 5)))
+
+
+async def seed_database(users: int, posts: int, seed: int) -> None:
+    from models import Post, User
+
+    rnd = random.Random(seed)
+    districts = city_districts()
+    for start in range(0, users, SEED_BATCH):
+        await User.bulk_create([random_user(i, rnd, districts) for i in range(start, min(start + SEED_BATCH, users))])
+
+    old = datetime.now() - timedelta(days=30)
+    for start in range(0, posts, SEED_BATCH):
+        await Post.bulk_create([
+            Post(id=f"seed-{i}", price_byn=rnd.randint(300, 2500), price_usd=0, address="", short_description="",
+                 post_url="", city=rnd.choice(CITIES), is_sent=True, city_district="", rooms_num=rnd.randint(1, 4),
+                 date=old + timedelta(seconds=i))
+            for i in range(start, min(start + SEED_BATCH, posts))
+        ])
+
+
+async def wait_outbox_empty(timeout: float) -> bool:
+    from models import OutboxItem
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not await OutboxItem.filter(status__in=["pending", "sending"]).exists():
+            return True
+        await asyncio.sleep(0.5)
+    return False
+
+
+async def run(args: argparse.Namespace) -> dict:
+    workdir = tempfile.TemporaryDirectory()
+    os.environ.update({
+        "DB_PATH": args.db_url or f"sqlite://{workdir.name}/bench.db",
+        "KUFAR_API_URL": f"http://127.0.0.1:{args.kufar_port}",
+        "TG_API_SERVER": f"http://127.0.0.1:{args.tg_port}",
+        "TG_BOT_TOKEN": "123456:fake-token",
+        "KUFAR_RPS": str(args.kufar_rps),
+        "PARSE_MIN_INTERVAL": str(args.poll),
+        "PARSE_MAX_INTERVAL": str(args.poll),
+        "TG_GLOBAL_RPS": str(args.tg_rps),
+        "TG_CHAT_RPS": str(args.tg_chat_rps),
+        "TG_SENDER_WORKERS": str(args.tg_workers),
+        "MAX_PRICE_UNLIMITED": "20000",
+    })
+
+    from bench.fake_kufar import start_fake_kufar
+    from bench.fake_telegram import start_fake_telegram
+
+    kufar_runner, kufar_stats = await start_fake_kufar(args.kufar_port, rate=args.ads_per_minute,
+                                                       initial=30, latency=args.kufar_latency, seed=args.seed)
+    tg_runner, tg_stats = await start_fake_telegram(args.tg_port, latency=args.tg_latency)
+    feeds = kufar_runner.app["feeds"]
+
+    import main as app
+    from api import enricher, start_parse
+    from db import init_db
+    from models import OutboxItem, Post
+    from outbox import run_outbox_worker
+    from subscriptions import subscription_index
+    from tg import delivery
+    from tortoise import Tortoise
+
+    outbox_task = parser = None
+    try:
+        await init_db()
+        seeding_started = time.monotonic()
+        await seed_database(args.users, args.posts, args.seed)
+        seeding_seconds = time.monotonic() - seeding_started
+        await subscription_index.rebuild()
+        rss_after_seed = peak_rss_mb()
+
+        app.pipeline.start()
+        outbox_task = asyncio.create_task(run_outbox_worker())
+        started = time.monotonic()
+        parser = asyncio.create_task(start_parse(args.poll))
+
+        await asyncio.sleep(args.duration)
+        parser.cancel()
+        await asyncio.gather(parser, return_exceptions=True)
+        await app.pipeline.drain()
+        ingest_seconds = time.monotonic() - started
+
+        drained = await wait_outbox_empty(args.drain_timeout)
+        total_seconds = time.monotonic() - started
+
+        ingested = await Post.exclude(id__startswith="seed-").count()
+        matches = await OutboxItem.all().count()
+        messages = len(tg_stats.sent)
+    finally:
+        for task in (parser, outbox_task, *delivery.workers):
+            if task is not None:
+                task.cancel()
+        # недоставленное при таймауте остаётся в очереди движка, поэтому без delivery.close()
+        await asyncio.gather(*(task for task in (parser, outbox_task, *delivery.workers) if task is not None),
+                             return_exceptions=True)
+        delivery.workers = []
+        enricher.shutdown()
+        await Tortoise.close_connections()
+        await kufar_runner.cleanup()
+        await tg_runner.cleanup()
+        workdir.cleanup()
+
+    published_at = {ad_id: at for feed in feeds.values() for ad_id, at in feed.published_at.items()}
+    latencies = []
+    for sent_at, text in tg_stats.texts:
+        match = AD_ID_RE.search(text)
+        if match and int(match.group(1)) in published_at:
+            latencies.append(sent_at - published_at[int(match.group(1))])
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": vars(args),
+        "seeding_seconds": round(seeding_seconds, 2),
+        "ingest_seconds": round(ingest_seconds, 2),
+        "total_seconds": round(total_seconds, 2),
+        "outbox_drained": drained,
+        "kufar_requests": kufar_stats.requests,
+        "ads_ingested": ingested,
+        "ads_per_sec": round(ingested / ingest_seconds, 2),
+        "matches": matches,
+        "matches_per_sec": round(matches / total_seconds, 2),
+        "messages": messages,
+        "messages_per_sec": round(messages / total_seconds, 2),
+        "flood_waits": tg_stats.flood_waits,
+        "latency_sec": {
+            "count": len(latencies),
+            "p50": round(percentile(latencies, 0.5), 3) if latencies else None,
+            "p90": round(percentile(latencies, 0.9), 3) if latencies else None,
+            "p99": round(percentile(latencies, 0.99), 3) if latencies else None,
+            "max": round(max(latencies), 3) if latencies else None,
+        },
+        "rss_after_seed_mb": round(rss_after_seed, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--posts", type=int, default=100_000, help="старых постов в базе")
+    parser.add_argument("--duration", type=float, default=60, help="сколько секунд работает парсер")
+    parser.add_argument("--drain-timeout", type=float, default=120, help="сколько ждать опустошения outbox")
+    parser.add_argument("--ads-per-minute", type=float, default=10, help="новых объявлений в минуту на город")
+    parser.add_argument("--poll", type=float, default=5, help="интервал опроса города, с")
+    parser.add_argument("--kufar-rps", type=float, default=20)
+    parser.add_argument("--kufar-latency", type=float, default=0.05)
+    parser.add_argument("--tg-latency", type=float, default=0.02)
+    parser.add_argument("--tg-rps", type=float, default=1000, help="общий лимит отправки (в проде 30)")
+    parser.add_argument("--tg-chat-rps", type=float, default=1)
+    parser.add_argument("--tg-workers", type=int, default=64)
+    parser.add_argument("--kufar-port", type=int, default=18082)
+    parser.add_argument("--tg-port", type=int, default=18081)
+    parser.add_argument("--db-url", help="вместо временной sqlite, например postgres://...")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="куда дополнительно записать JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+
+
+if __name__ == "__main__":
+    main()
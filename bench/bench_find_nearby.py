@@ -0,0 +1,54 @@
+"""Сравнение find_nearby на сеточном индексе с полным перебором POI.
+
+Запуск из корня проекта: python -m bench.bench_find_nearby
+"""
+import random
+import time
+
+from location import find_nearby, find_nearby_linear
+
+CITY_CENTERS = {
+    "minsk": (53.9023, 27.5619),
+    "vitebsk": (55.1904, 30.2049),
+    "gomel": (52.4345, 30.9754),
+    "grodno": (53.6694, 23.8131),
+    "brest": (52.0976, 23.7341),
+    "mogilev": (53.9168, 30.3449),
+}
+RADIUS = 500
+POINTS_PER_CITY = 50
+
+
+def sample_points(seed: int = 42) -> list[tuple[str, float, float]]:
+    rnd = random.Random(seed)
+    points = []
+    for city, (lat, lon) in CITY_CENTERS.items():
+        points.append((city, lat, lon))
+        for _ in range(POINTS_PER_CITY - 1):
+            points.append((city, lat + rnd.uniform(-0.05, 0.05), lon + rnd.uniform(-0.08, 0.08)))
+    return points
+
+
+def measure(func, points: list[tuple[str, float, float]]) -> tuple[float, list]:
+    started = time.perf_counter()
+    results = [func(lat, lon, RADIUS) for _, lat, lon in points]
+    return time.perf_counter() - started, results
+
+
+def main() -> None:
+    points = sample_points()
+
+    linear_time, linear_results = measure(find_nearby_linear, points)
+    index_time, index_results = measure(find_nearby, points)
+
+    assert linear_results == index_results, "Index results differ from the linear scan"
+
+    n = len(points)
+    print(f"points: {n} ({len(CITY_CENTERS)} cities), radius: {RADIUS} m")
+    print(f"linear scan: {linear_time:.3f} s total, {linear_time / n * 1000:.3f} ms/query")
+    print(f"grid index:  {index_time:.3f} s total, {index_time / n * 1000:.3f} ms/query")
+    print(f"speedup:     x{linear_time / index_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Пакетные find_nearby_batch и find_nearest_batch против поштучных find_nearby и find_nearest.
+
+Страницы берутся из сохранённых ответов search-api Kufar (json-файлы в аргументах),
+без аргументов — синтетические страницы вокруг центров городов.
+Результаты сравниваются поштучно: множества названий и списки ближайших должны совпадать,
+иначе скрипт завершается с ошибкой. С --check выполняется только это сравнение, без замеров.
+
+Запуск из корня проекта: python -m bench.bench_find_nearby_batch [--check] [page.json ...]
+"""
+import json
+import random
+import sys
+import time
+
+from api import get_location
+from bench.bench_find_nearby import CITY_CENTERS, RADIUS
+from enrichment import NEARBY_LIMIT
+from location import find_nearby, find_nearby_batch, find_nearest, find_nearest_batch
+
+ADS_PER_PAGE = 30
+PAGES_PER_CITY = 5
+REPEAT = 5
+
+
+def recorded_pages(paths: list[str]) -> list[list[tuple[float, float]]]:
+    pages = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        pages.append([get_location(ad) for ad in data.get("ads", [])])
+    return pages
+
+
+def synthetic_pages(seed: int = 42) -> list[list[tuple[float, float]]]:
+    rnd = random.Random(seed)
+    pages = []
+    for lat, lon in CITY_CENTERS.values():
+        for _ in range(PAGES_PER_CITY):
+            pages.append([(lat + rnd.uniform(-0.05, 0.05), lon + rnd.uniform(-0.08, 0.08))
+                          for _ in range(ADS_PER_PAGE)])
+    return pages
+
+
+def measure(func, pages) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        for page in pages:
+            func(page)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def check_parity(pages: list[list[tuple[float, float]]]) -> None:
+    """Пакетные функции должны возвращать ровно то же, что поштучные; иначе SystemExit."""
+    for page in pages:
+        if find_nearby_batch(page, RADIUS) != [find_nearby(lat, lon, RADIUS) for lat, lon in page]:
+            sys.exit("find_nearby_batch results differ from find_nearby")
+        if (find_nearest_batch(page, NEARBY_LIMIT, RADIUS)
+                != [find_nearest(lat, lon, NEARBY_LIMIT, RADIUS) for lat, lon in page]):
+            sys.exit("find_nearest_batch results differ from find_nearest")
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    check_only = "--check" in args
+    paths = [arg for arg in args if arg != "--check"]
+    pages = recorded_pages(paths) if paths else synthetic_pages()
+    ads = sum(len(page) for page in pages)
+
+    check_parity(pages)
+    if check_only:
+        print(f"pages: {len(pages)}, ads: {ads}: batch results match")
+        return
+
+    single_time = measure(lambda page: [find_nearby(lat, lon, RADIUS) for lat, lon in page], pages)
+    batch_time = measure(lambda page: find_nearby_batch(page, RADIUS), pages)
+
+    print(f"pages: {len(pages)}, ads: {ads}, radius: {RADIUS} m (best of {REPEAT})")
+    print(f"find_nearby per ad: {single_time * 1000:.1f} ms total, {single_time / len(pages) * 1000:.2f} ms/page")
+    print(f"find_nearby_batch:  {batch_time * 1000:.1f} ms total, {batch_time / len(pages) * 1000:.2f} ms/page")
+    print(f"speedup:            x{single_time / batch_time:.1f}")
+
+    single_time = measure(
+        lambda page: [find_nearest(lat, lon, NEARBY_LIMIT, RADIUS) for lat, lon in page], pages)
+    batch_time = measure(lambda page: find_nearest_batch(page, NEARBY_LIMIT, RADIUS), pages)
+
+    print(f"find_nearest per ad: {single_time * 1000:.1f} ms total, {single_time / len(pages) * 1000:.2f} ms/page")
+    print(f"find_nearest_batch:  {batch_time * 1000:.1f} ms total, {batch_time / len(pages) * 1000:.2f} ms/page")
+    print(f"speedup:             x{single_time / batch_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Сколько event loop стоит всплеск из 10k записей лога: прямой RotatingFileHandler против очереди.
+
+Пока идут записи (info и каждая десятая — exception с traceback), отдельная задача
+меряет задержку event loop. Время, проведённое в вызовах logger.*, — это время, на
+которое запись блокирует loop. Отдельно показано, за сколько поток записи дописывает хвост.
+Второй прогон имитирует медленный диск: каждый STALL_EVERY-й flush файла ждёт STALL_MS.
+
+Запуск из корня проекта: python -m bench.bench_logging [records]
+"""
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from logger import configure_logging, log_context, stop_log_listener
+
+CHUNK = 100  # записей между переключениями на другие задачи
+STALL_EVERY = 500
+STALL_MS = 20
+
+
+async def lag_probe(lags: list[float], stop: asyncio.Event, period: float = 0.001) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(period)
+        lags.append(time.perf_counter() - started - period)
+
+
+async def burst(log: logging.Logger, records: int) -> list[float]:
+    calls = []
+    for i in range(records):
+        started = time.perf_counter()
+        with log_context(city="minsk", ad_id=str(10 ** 8 + i)):
+            if i % 10 == 0:
+                try:
+                    raise ConnectionError("Telegram server says - Bad Gateway")
+                except ConnectionError as e:
+                    log.exception(f"Message to user [{10 ** 6 + i}] not sent: {e}")
+            else:
+                log.info(f"New post [{10 ** 8 + i}] for city minsk")
+        calls.append(time.perf_counter() - started)
+        if i % CHUNK == 0:
+            await asyncio.sleep(0)
+    return calls
+
+
+async def measure(records: int) -> tuple[list[float], list[float]]:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(lag_probe(lags, stop))
+    await asyncio.sleep(0.01)
+    calls = await burst(logging.getLogger("bench"), records)
+    stop.set()
+    await probe
+    return calls, lags
+
+
+def add_disk_stalls(handler: logging.Handler) -> None:
+    flush = handler.flush
+    flushes = 0
+
+    def stalling_flush() -> None:
+        nonlocal flushes
+        flushes += 1
+        if flushes % STALL_EVERY == 0:
+            time.sleep(STALL_MS / 1000)
+        flush()
+
+    handler.flush = stalling_flush
+
+
+def run_mode(name: str, records: int, use_queue: bool, log_format: str, repeat_burst: int, stalls: bool) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        log_file = Path(directory) / "bench.log"
+        listener = configure_logging(log_file, use_queue=use_queue, log_format=log_format)
+        handler = logging.getLogger().handlers[0]
+        for log_filter in handler.filters:
+            if hasattr(log_filter, "burst"):
+                log_filter.burst = repeat_burst
+        if stalls:
+            add_disk_stalls(listener.handlers[0] if listener else handler)
+
+        calls, lags = asyncio.run(measure(records))
+        flush_started = time.perf_counter()
+        if listener:
+            stop_log_listener(listener)
+        flush = time.perf_counter() - flush_started
+        lines = sum(1 for path in Path(directory).glob("bench.log*") for line in path.open(encoding="utf-8")
+                    if line[:1] in "2{")
+
+    calls.sort()
+    print(f"{name:28} blocked {sum(calls) * 1000:7.1f} ms, "
+          f"p99 call {calls[int(len(calls) * 0.99)] * 1e6:6.0f} us, max lag {max(lags) * 1000:5.1f} ms, "
+          f"writer tail {flush * 1000:6.1f} ms, lines {lines}")
+
+
+def main() -> None:
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    for stalls in (False, True):
+        print(f"records: {records}, every 10th with traceback"
+              + (f", disk stall {STALL_MS} ms every {STALL_EVERY} flushes" if stalls else ""))
+        run_mode("sync RotatingFileHandler", records, False, "text", 0, stalls)
+        run_mode("queue, text", records, True, "text", 0, stalls)
+        run_mode("queue, json", records, True, "json", 0, stalls)
+        run_mode("queue, text, repeat limit", records, True, "text", 5, stalls)
+    configure_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Задержка event loop во время обогащения объявлений: inline против пула процессов.
+
+Пока идёт обогащение нескольких страниц выдачи, фоновая корутина каждые TICK секунд
+замеряет, насколько позже она просыпается. Для бота это время, на которое
+замирает обработка нажатий кнопок.
+
+Запуск из корня проекта: python -m bench.bench_loop_lag
+"""
+import asyncio
+import random
+import statistics
+import time
+
+from bench.bench_find_nearby import CITY_CENTERS
+from enrichment import EnrichmentExecutor
+
+TICK = 0.01
+PAGES = 12
+ADS_PER_PAGE = 30
+
+
+def sample_pages(seed: int = 42) -> list[tuple[str, list[tuple[float, float]]]]:
+    rnd = random.Random(seed)
+    cities = list(CITY_CENTERS)
+    pages = []
+    for page in range(PAGES):
+        city = cities[page % len(cities)]
+        lat, lon = CITY_CENTERS[city]
+        pages.append((city, [(lat + rnd.uniform(-0.05, 0.05), lon + rnd.uniform(-0.08, 0.08))
+                             for _ in range(ADS_PER_PAGE)]))
+    return pages
+
+
+async def measure_lag(stop: asyncio.Event, lags: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+
+async def run_cycle(executor: EnrichmentExecutor, pages) -> tuple[float, list[float], list]:
+    stop = asyncio.Event()
+    lags: list[float] = []
+    ticker = asyncio.create_task(measure_lag(stop, lags))
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(executor.enrich(city, coords) for city, coords in pages))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+    return elapsed, lags, results
+
+
+def report(name: str, elapsed: float, lags: list[float]) -> None:
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    p99 = lags_ms[int(len(lags_ms) * 0.99) - 1] if len(lags_ms) > 1 else lags_ms[0]
+    print(f"{name:<8} cycle {elapsed:.2f} s | loop lag max {lags_ms[-1]:.1f} ms, "
+          f"p99 {p99:.1f} ms, mean {statistics.mean(lags_ms):.1f} ms ({len(lags_ms)} ticks)")
+
+
+async def main() -> None:
+    pages = sample_pages()
+    print(f"pages: {PAGES} x {ADS_PER_PAGE} ads, tick: {TICK * 1000:.0f} ms")
+
+    inline = EnrichmentExecutor(list(CITY_CENTERS), inline=True)
+    await inline.enrich(*pages[0])  # прогрев: загрузка POI и полигонов
+    elapsed, lags, inline_results = await run_cycle(inline, pages)
+    report("inline", elapsed, lags)
+
+    pool = EnrichmentExecutor(list(CITY_CENTERS), workers=2)
+    await asyncio.gather(*(pool.enrich(*page) for page in pages[:2]))  # прогрев воркеров
+    try:
+        elapsed, lags, pool_results = await run_cycle(pool, pages)
+    finally:
+        pool.shutdown()
+    report("pool", elapsed, lags)
+
+    assert [[r["city_district"] for r in page] for page in inline_results] == \
+           [[r["city_district"] for r in page] for page in pool_results], "Pool results differ from inline"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+"""Накладные расходы метрик: декоратор timed, счётчик, гистограмма и отдача /metrics.
+
+Сравнивает пустую функцию с обёрнутой в timed; разница — цена одного замера.
+Запуск из корня проекта: python -m bench.bench_metrics
+"""
+import asyncio
+import time
+
+from metrics import Counter, Histogram, render, timed
+
+CALLS = 200_000
+REPEAT = 5
+
+
+def best_ns_per_call(func) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.perf_counter_ns()
+        func()
+        best = min(best, time.perf_counter_ns() - started)
+    return best / CALLS
+
+
+def noop(x):
+    return x
+
+
+async def async_noop(x):
+    return x
+
+
+def sync_loop(func):
+    def run():
+        for i in range(CALLS):
+            func(i)
+    return run
+
+
+def async_loop(func):
+    async def calls():
+        for i in range(CALLS):
+            await func(i)
+    return lambda: asyncio.run(calls())
+
+
+def main() -> None:
+    counter = Counter("bench_counter_total", "bench", ("city",)).labels(city="minsk")
+    histogram = Histogram("bench_seconds", "bench", ("function",)).labels(function="bench")
+
+    results = {
+        "sync call": best_ns_per_call(sync_loop(noop)),
+        "sync call + timed": best_ns_per_call(sync_loop(timed("bench.noop")(noop))),
+        "async call": best_ns_per_call(async_loop(async_noop)),
+        "async call + timed": best_ns_per_call(async_loop(timed("bench.async_noop")(async_noop))),
+        "counter.inc": best_ns_per_call(sync_loop(lambda i: counter.inc())),
+        "histogram.observe": best_ns_per_call(sync_loop(lambda i: histogram.observe(i * 1e-6))),
+    }
+    for name, ns in results.items():
+        print(f"{name:20} {ns:8.0f} ns/call")
+    print(f"timed overhead: sync {results['sync call + timed'] - results['sync call']:.0f} ns, "
+          f"async {results['async call + timed'] - results['async call']:.0f} ns")
+
+    started = time.perf_counter()
+    text = render()
+    print(f"render /metrics: {(time.perf_counter() - started) * 1000:.2f} ms, {len(text)} bytes")
+
+
+if __name__ == "__main__":
+    main()
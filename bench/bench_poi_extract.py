@@ -0,0 +1,45 @@
+"""Время и память полного скана .osm.pbf при сборке кеша POI.
+
+Скан идёт в отдельном процессе, чтобы пиковый RSS не включал ничего лишнего;
+tracemalloc показывает пик памяти, выделенной Python-объектами обработчика.
+
+Запуск из корня проекта: python -m bench.bench_poi_extract [file.osm.pbf]
+"""
+import json
+import subprocess
+import sys
+
+from poi_cache import OSM_FILE
+
+CHILD = """
+import json, resource, sys, time, tracemalloc
+from poi_cache import scan_pbf
+tracemalloc.start()
+started = time.perf_counter()
+store = scan_pbf(sys.argv[1])
+elapsed = time.perf_counter() - started
+_, traced_peak = tracemalloc.get_traced_memory()
+print(json.dumps({
+    "seconds": elapsed,
+    "traced_peak_mb": traced_peak / 2**20,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "counts": {key: len(columns.lat) for key, columns in store.categories.items()},
+}))
+"""
+
+
+def main() -> None:
+    osm_file = sys.argv[1] if len(sys.argv) > 1 else OSM_FILE
+    output = subprocess.run([sys.executable, "-c", CHILD, osm_file], check=True,
+                            capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    print(f"file: {osm_file}")
+    print(f"scan: {result['seconds']:.2f} s, python heap peak: {result['traced_peak_mb']:.1f} MB, "
+          f"peak RSS: {result['max_rss_mb']:.1f} MB")
+    print(f"POI: {sum(result['counts'].values())} "
+          f"({', '.join(f'{key}: {count}' for key, count in result['counts'].items())})")
+
+
+if __name__ == "__main__":
+    main()
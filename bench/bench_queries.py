@@ -0,0 +1,121 @@
+"""Запросы горячего пути (get_last_five_posts, get_active_users) на засеянной SQLite-базе — без индексов и с ними.
+
+Запуск из корня проекта: python -m bench.bench_queries --posts 1000000 --users 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from tortoise import Tortoise
+
+from db import get_last_five_posts, get_active_users
+
+CITIES = ["minsk", "vitebsk", "gomel", "grodno", "brest", "mogilev"]
+DISTRICTS = [f"район {i}" for i in range(9)]
+INDEXED_TABLES = ("posts", "users")
+
+
+def seed(path: str, posts: int, users: int, seed_value: int = 1) -> None:
+    rnd = random.Random(seed_value)
+    now = datetime(2026, 1, 1)
+    connection = sqlite3.connect(path)
+
+    def post_rows():
+        for i in range(posts):
+            rooms = rnd.randint(1, 5)
+            yield (str(i), rnd.uniform(300, 3000), rnd.uniform(100, 1000), "адрес", "описание", "url",
+                   (now - timedelta(minutes=i)).isoformat(), rnd.choice(CITIES), 1,
+                   rnd.choice(DISTRICTS), str(rooms), rooms, "9", 9, "3", 3, "45", 45.0)
+
+    def user_rows():
+        for i in range(users):
+            min_price = rnd.uniform(100, 1500)
+            yield (str(i), "user", min_price, min_price + rnd.uniform(100, 1500), rnd.choice(CITIES),
+                   rnd.choice(DISTRICTS + ["all"] * 3), rnd.random() < 0.7, rnd.randint(1, 5))
+
+    connection.executemany(
+        'INSERT INTO "posts" ("id", "price_byn", "price_usd", "address", "short_description", "post_url", "date",'
+        ' "city", "is_sent", "city_district", "rooms", "rooms_num", "number_of_floors", "number_of_floors_num",'
+        ' "apartment_floor", "apartment_floor_num", "total_area", "total_area_num")'
+        ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', post_rows())
+    connection.executemany(
+        'INSERT INTO "users" ("id", "first_name", "min_price", "max_price", "city", "district", "is_active",'
+        ' "rooms_count") VALUES (?, ?, ?, ?, ?, ?, ?, ?)', user_rows())
+    connection.commit()
+    connection.close()
+
+
+def toggle_indexes(path: str, saved: list[str]) -> list[str]:
+    """Удаляет индексы таблиц и возвращает их DDL, либо восстанавливает ранее сохранённые."""
+    connection = sqlite3.connect(path)
+    if saved:
+        for sql in saved:
+            connection.execute(sql)
+        result = []
+    else:
+        result = [sql for name, sql in connection.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+            f"AND tbl_name IN {INDEXED_TABLES}")]
+        for sql in result:
+            connection.execute(f'DROP INDEX "{sql.split(chr(34))[1]}"')
+    connection.execute("ANALYZE")
+    connection.commit()
+    connection.close()
+    return result
+
+
+async def measure(queries: list[tuple]) -> dict[str, float]:
+    timings = {"get_last_five_posts": 0.0, "get_active_users": 0.0}
+    for city, district, min_price, max_price, rooms in queries:
+        started = time.perf_counter()
+        await get_last_five_posts(city, min_price, max_price, 5, district, rooms)
+        timings["get_last_five_posts"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        await (await get_active_users(city, district, rooms))
+        timings["get_active_users"] += time.perf_counter() - started
+    return {name: total / len(queries) * 1000 for name, total in timings.items()}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    queries = [(rnd.choice(CITIES), rnd.choice(DISTRICTS + ["all"]), rnd.uniform(200, 800),
+                rnd.uniform(900, 2500), rnd.randint(1, 5)) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        await Tortoise.init(db_url=f"sqlite://{path}", modules={"models": ["models"]})
+        await Tortoise.generate_schemas()
+        await Tortoise.close_connections()
+
+        started = time.perf_counter()
+        seed(path, args.posts, args.users)
+        print(f"seeded {args.posts} posts and {args.users} users in {time.perf_counter() - started:.1f} s")
+
+        saved = toggle_indexes(path, [])
+        results = {}
+        for label in ("no indexes", "indexes"):
+            await Tortoise.init(db_url=f"sqlite://{path}", modules={"models": ["models"]})
+            results[label] = await measure(queries)
+            await Tortoise.close_connections()
+            if label == "no indexes":
+                toggle_indexes(path, saved)
+
+    print(f"{'ms per query':<24}{'no indexes':>12}{'indexes':>12}")
+    for name in results["indexes"]:
+        print(f"{name:<24}{results['no indexes'][name]:>12.2f}{results['indexes'][name]:>12.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
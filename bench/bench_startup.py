@@ -0,0 +1,41 @@
+"""Время импорта location.py и пиковый RSS с кешем POI и без него.
+
+Каждый замер — отдельный процесс: холодный старт пишет кеш во временный
+каталог (скан .pbf + запись), тёплый читает уже готовый кеш через mmap.
+
+Запуск из корня проекта: python -m bench.bench_startup
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+CHILD = """
+import json, resource, time
+started = time.perf_counter()
+import location
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def run_child(cache_dir: str) -> dict:
+    env = dict(os.environ, POI_CACHE_DIR=cache_dir)
+    output = subprocess.run([sys.executable, "-c", CHILD], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold = run_child(cache_dir)
+        warm = run_child(cache_dir)
+
+    print(f"{'':<22}{'startup, s':>12}{'peak RSS, MB':>15}")
+    print(f"{'pbf scan (no cache)':<22}{cold['seconds']:>12.3f}{cold['max_rss_mb']:>15.1f}")
+    print(f"{'mmap cache':<22}{warm['seconds']:>12.3f}{warm['max_rss_mb']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
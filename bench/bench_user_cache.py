@@ -0,0 +1,70 @@
+"""Чтение пользователя в обработчиках бота: get_or_create_user с кэшем и без него.
+
+--users пользователей создаются во временной sqlite, затем каждый читается --reads раз
+в случайном порядке (как нажатия кнопок в меню настроек). Без кэша каждое чтение — запрос в базу.
+Запуск из корня проекта: python -m bench.bench_user_cache [--users 2000] [--reads 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+
+async def read_all(user_ids: list[int]) -> float:
+    from db import get_or_create_user
+
+    started = time.perf_counter()
+    for user_id in user_ids:
+        await get_or_create_user(user_id, False, "bench")
+    return time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace) -> dict:
+    workdir = tempfile.TemporaryDirectory()
+    os.environ.update({
+        "DB_PATH": f"sqlite://{workdir.name}/bench.db",
+        "TG_BOT_TOKEN": "123456:fake-token",
+        "MAX_PRICE_UNLIMITED": "20000",
+    })
+    import signals  # noqa: F401 — write-through через post_save
+    from db import USER_CACHE, close_db, init_db
+
+    await init_db()
+    try:
+        users = list(range(10 ** 6, 10 ** 6 + args.users))
+        await read_all(users)
+        reads = users * args.reads
+        random.Random(1).shuffle(reads)
+
+        USER_CACHE.maxsize = 0
+        USER_CACHE.items.clear()
+        uncached = await read_all(reads)
+        USER_CACHE.maxsize = args.users
+        await read_all(users)
+        USER_CACHE.hits = USER_CACHE.misses = 0
+        cached = await read_all(reads)
+    finally:
+        await close_db()
+        workdir.cleanup()
+
+    return {
+        "reads": len(reads),
+        "uncached_us_per_read": round(uncached / len(reads) * 1e6, 1),
+        "cached_us_per_read": round(cached / len(reads) * 1e6, 1),
+        "hit_ratio": round(USER_CACHE.hits / max(USER_CACHE.hits + USER_CACHE.misses, 1), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=10, help="чтений на пользователя")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
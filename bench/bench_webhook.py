@@ -0,0 +1,156 @@
+"""Обработка входящих обновлений: long polling против webhook (в том числе несколькими процессами).
+
+Каждый из --users пользователей присылает /start; бот отвечает sendMessage в заглушку Bot API.
+Задержка — от момента, когда обновление появилось у «Telegram» (POST на webhook или очередь
+getUpdates), до ответа бота в этот чат. База — временная sqlite или --db-url
+(для нескольких процессов webhook лучше PostgreSQL).
+
+Запуск из корня проекта:
+    python -m bench.bench_webhook --mode polling
+    python -m bench.bench_webhook --mode webhook
+    python -m bench.bench_webhook --mode webhook --workers 4 --db-url postgres://...
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.bench_e2e import percentile
+
+FIRST_USER_ID = 10 ** 6
+
+
+async def wait_port(host: str, port: int, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def wait_replies(tg_stats, users: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if len({chat_id for _, _, chat_id in tg_stats.sent}) >= users:
+            return
+        await asyncio.sleep(0.1)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    workdir = tempfile.TemporaryDirectory()
+    os.environ.update({
+        "DB_PATH": args.db_url or f"sqlite://{workdir.name}/bench.db",
+        "TG_API_SERVER": f"http://127.0.0.1:{args.tg_port}",
+        "TG_BOT_TOKEN": "123456:fake-token",
+        "TG_GLOBAL_RPS": "1000",
+        "BOT_MODE": args.mode,
+        "WEBHOOK_HOST": "127.0.0.1",
+        "WEBHOOK_PORT": str(args.webhook_port),
+        "WEBHOOK_SECRET": "bench-secret",
+        "WEBHOOK_URL": "",
+        "WEBHOOK_WORKERS": str(args.workers),
+        "MAX_PRICE_UNLIMITED": "20000",
+    })
+
+    from bench.fake_telegram import enqueue_updates, make_message_update, post_updates, start_fake_telegram
+
+    tg_runner, tg_stats = await start_fake_telegram(args.tg_port, latency=args.tg_latency)
+
+    import main as app
+    from db import init_db
+    from tg import WEBHOOK_PATH, WEBHOOK_SECRET, bot, dp, run_webhook_server
+    from tortoise import Tortoise
+
+    await init_db()
+    child = None
+    bot_task = None
+    if args.mode == "webhook" and args.workers > 1:
+        child = subprocess.Popen([sys.executable, "main.py", "webhook"], env=os.environ.copy())
+    elif args.mode == "webhook":
+        app.new_user_stage.start()
+        bot_task = asyncio.create_task(run_webhook_server(register=False))
+    else:
+        app.new_user_stage.start()
+        bot_task = asyncio.create_task(dp.start_polling(bot, handle_signals=False))
+
+    updates = [make_message_update(i + 1, FIRST_USER_ID + i, "/start") for i in range(args.users)]
+    try:
+        if args.mode == "webhook":
+            await wait_port("127.0.0.1", args.webhook_port)
+        else:
+            await asyncio.sleep(1)
+
+        started = time.monotonic()
+        if args.mode == "webhook":
+            posted = await post_updates(f"http://127.0.0.1:{args.webhook_port}{WEBHOOK_PATH}", updates,
+                                        secret=WEBHOOK_SECRET, concurrency=args.concurrency)
+            created_at = {FIRST_USER_ID + update_id - 1: sent for update_id, sent, _ in posted}
+            acks = [answered - sent for _, sent, answered in posted]
+        else:
+            enqueue_updates(tg_runner.app, updates)
+            created_at = {FIRST_USER_ID + i: started for i in range(args.users)}
+            acks = []
+        await wait_replies(tg_stats, args.users, args.timeout)
+        elapsed = time.monotonic() - started
+    finally:
+        if child is not None:
+            child.terminate()
+            child.wait()
+        if args.mode == "polling":
+            await dp.stop_polling()
+        elif bot_task is not None:
+            bot_task.cancel()
+        if bot_task is not None:
+            await asyncio.gather(bot_task, return_exceptions=True)
+        await app.new_user_stage.drain()
+        await bot.session.close()
+        await Tortoise.close_connections()
+        await tg_runner.cleanup()
+        workdir.cleanup()
+
+    first_reply = {}
+    for sent_at, method, chat_id in tg_stats.sent:
+        first_reply.setdefault(int(chat_id), sent_at)
+    latencies = [first_reply[user_id] - created for user_id, created in created_at.items() if user_id in first_reply]
+
+    return {
+        "mode": args.mode,
+        "workers": args.workers,
+        "users": args.users,
+        "replied": len(latencies),
+        "seconds": round(elapsed, 2),
+        "updates_per_sec": round(len(latencies) / elapsed, 1),
+        "reply_latency_ms": {
+            "p50": round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+            "p99": round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+        },
+        "webhook_ack_ms_p99": round(percentile(acks, 0.99) * 1000, 1) if acks else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=("polling", "webhook"), default="webhook")
+    parser.add_argument("--workers", type=int, default=1, help="процессов webhook (больше 1 — через main.py webhook)")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50, help="одновременных POST на webhook")
+    parser.add_argument("--tg-latency", type=float, default=0.02)
+    parser.add_argument("--tg-port", type=int, default=18081)
+    parser.add_argument("--webhook-port", type=int, default=18443)
+    parser.add_argument("--timeout", type=float, default=120, help="сколько ждать ответов бота")
+    parser.add_argument("--db-url", help="вместо временной sqlite, например postgres://...")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
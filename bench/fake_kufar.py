@@ -0,0 +1,233 @@
+"""Заглушка search-api Kufar для нагрузочных тестов без api.kufar.by.
+
+Отдаёт /search-api/v2/search/rendered-paginated в двух режимах:
+- replay — записанные json-страницы (по кругу для любого города, пагинация по файлам);
+- synthetic — объявления, которые «публикуются» с заданной частотой в каждом городе.
+Умеет задержку, 429 и 5xx с заданной вероятностью.
+
+Сервер:  python -m bench.fake_kufar serve --port 8082 --rate 30 (и KUFAR_API_URL=http://127.0.0.1:8082 у бота)
+Запись:  python -m bench.fake_kufar record --city minsk --pages 3 --out ./bench/pages
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from aiohttp import web
+
+from api import CITY_FILTERS
+
+SEARCH_PATH = "/search-api/v2/search/rendered-paginated"
+
+CITY_CENTERS = {
+    "minsk": (53.9023, 27.5619),
+    "vitebsk": (55.1904, 30.2049),
+    "gomel": (52.4345, 30.9754),
+    "grodno": (53.6694, 23.8131),
+    "brest": (52.0976, 23.7341),
+    "mogilev": (53.9168, 30.3449),
+}
+CITY_BY_FILTER = {city_filter: city for city, city_filter in CITY_FILTERS.items()}
+
+
+class FakeKufarStats:
+    def __init__(self):
+        self.requests = 0
+        self.pages: dict[str, int] = {}  # город -> отданных страниц
+        self.ads_served = 0
+        self.errors: dict[int, int] = {}  # HTTP-статус -> сколько раз отдан
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"o": offset}).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["o"])
+    except (ValueError, KeyError, TypeError):
+        return 0
+
+
+def page_response(ads: list[dict], offset: int, size: int, total: int) -> dict:
+    pages = [{"label": "self", "num": offset // size + 1, "token": encode_cursor(offset)}]
+    if offset + size < total:
+        pages.append({"label": "next", "num": offset // size + 2, "token": encode_cursor(offset + size)})
+    return {"ads": ads, "total": total, "pagination": {"pages": pages}}
+
+
+class SyntheticFeed:
+    """Лента объявлений одного города: rate новых объявлений в минуту, свежие первыми."""
+
+    def __init__(self, city: str, rate: float, initial: int, max_ads: int, rnd: random.Random, first_id: int):
+        self.city = city
+        self.rate = rate
+        self.max_ads = max_ads
+        self.rnd = rnd
+        self.next_id = first_id
+        self.started = time.monotonic()
+        self.published = 0
+        self.published_at: dict[int, float] = {}  # ad_id -> время публикации (без стартовых объявлений)
+        self.ads: list[dict] = []
+        for _ in range(initial):
+            self._publish()
+
+    def _publish(self) -> None:
+        lat, lon = CITY_CENTERS.get(self.city, (53.9, 27.56))
+        lat += self.rnd.uniform(-0.05, 0.05)
+        lon += self.rnd.uniform(-0.08, 0.08)
+        ad_id = self.next_id
+        self.next_id += 1
+        rooms = self.rnd.randint(1, 4)
+        floors = self.rnd.randint(5, 25)
+        price_byn = self.rnd.randint(400, 2500) * 100
+        self.ads.insert(0, {
+            "ad_id": ad_id,
+            "ad_link": f"https://re.kufar.by/vi/{ad_id}",
+            "list_time": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),
+            "body_short": f"Сдаётся {rooms}-комнатная квартира",
+            "price_byn": str(price_byn),
+            "price_usd": str(price_byn * 10 // 33),
+            "account_parameters": [{"p": "address", "pl": "Адрес", "v": f"ул. Тестовая, {ad_id % 200 + 1}"}],
+            "ad_parameters": [
+                {"p": "coordinates", "pl": "Координаты", "v": [lon, lat]},
+                {"p": "rooms", "pl": "Комнат", "v": str(rooms), "vl": str(rooms)},
+                {"p": "size", "pl": "Общая площадь", "v": 20 + rooms * 15 + self.rnd.randint(0, 10), "vl": ""},
+                {"p": "floor", "pl": "Этаж", "v": [self.rnd.randint(1, floors)], "vl": [str(self.rnd.randint(1, floors))]},
+                {"p": "re_number_floors", "pl": "Этажность дома", "v": str(floors), "vl": str(floors)},
+            ],
+            "images": [{"path": f"fake/{ad_id}/{i}.jpg"} for i in range(self.rnd.randint(0, 5))],
+        })
+        del self.ads[self.max_ads:]
+
+    def refresh(self) -> None:
+        due = int((time.monotonic() - self.started) * self.rate / 60)
+        while self.published < due:
+            self._publish()
+            self.published += 1
+            self.published_at[self.ads[0]["ad_id"]] = time.monotonic()
+
+    def page(self, offset: int, size: int) -> dict:
+        self.refresh()
+        return page_response(self.ads[offset:offset + size], offset, size, len(self.ads))
+
+
+class ReplayFeed:
+    """Записанные ответы search-api: страница N отдаётся по курсору N, город не учитывается."""
+
+    def __init__(self, directory: str):
+        self.pages = [json.loads(path.read_text(encoding="utf-8"))
+                      for path in sorted(Path(directory).glob("*.json"))]
+        if not self.pages:
+            raise ValueError(f"No recorded pages in {directory}")
+
+    def page(self, offset: int, size: int) -> dict:
+        index = min(offset // size, len(self.pages) - 1)
+        ads = self.pages[index].get("ads", [])
+        return page_response(ads, index * size, size, len(self.pages) * size)
+
+
+def create_app(rate: float = 10, initial: int = 100, max_ads: int = 1000, replay_dir: Optional[str] = None,
+               latency: float = 0.05, jitter: float = 0.0, error_probability: float = 0.0,
+               rate_limit_probability: float = 0.0, retry_after: int = 1, seed: int = 1) -> web.Application:
+    stats = FakeKufarStats()
+    rnd = random.Random(seed)
+    replay = ReplayFeed(replay_dir) if replay_dir else None
+    feeds = {city: SyntheticFeed(city, rate, initial, max_ads, random.Random(seed + i), (i + 1) * 10 ** 8)
+             for i, city in enumerate(CITY_FILTERS)}
+
+    async def search(request: web.Request) -> web.Response:
+        stats.requests += 1
+        await asyncio.sleep(latency + rnd.uniform(0, jitter))
+
+        if rnd.random() < rate_limit_probability:
+            stats.errors[429] = stats.errors.get(429, 0) + 1
+            return web.json_response({"error": "Too Many Requests"}, status=429,
+                                     headers={"Retry-After": str(retry_after)})
+        if rnd.random() < error_probability:
+            status = rnd.choice((500, 502, 503))
+            stats.errors[status] = stats.errors.get(status, 0) + 1
+            return web.json_response({"error": "Internal error"}, status=status)
+
+        city = CITY_BY_FILTER.get(request.query.get("gtsy", ""))
+        if city is None:
+            return web.json_response({"error": "Unknown region"}, status=400)
+
+        size = int(request.query.get("size", 30))
+        offset = decode_cursor(request.query.get("cursor"))
+        data = (replay or feeds[city]).page(offset, size)
+
+        stats.pages[city] = stats.pages.get(city, 0) + 1
+        stats.ads_served += len(data["ads"])
+        return web.json_response(data)
+
+    app = web.Application()
+    app["stats"] = stats
+    app["feeds"] = feeds
+    app.router.add_get(SEARCH_PATH, search)
+    return app
+
+
+async def start_fake_kufar(port: int, **options) -> tuple[web.AppRunner, FakeKufarStats]:
+    app = create_app(**options)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner, app["stats"]
+
+
+async def record(city: str, pages: int, out: str) -> None:
+    """Сохраняет несколько страниц выдачи (с KUFAR_API_URL, по умолчанию живой api.kufar.by) для replay."""
+    import aiohttp
+    from api import fetch_ads, get_next_cursor
+
+    directory = Path(out)
+    directory.mkdir(parents=True, exist_ok=True)
+    cursor = None
+    async with aiohttp.ClientSession() as session:
+        for page in range(pages):
+            data = await fetch_ads(session, city, cursor=cursor)
+            if not data:
+                break
+            path = directory / f"{city}-{page:03d}.json"
+            path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            print(f"saved {path} ({len(data.get('ads', []))} ads)")
+            cursor = get_next_cursor(data)
+            if not cursor:
+                break
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve")
+    serve.add_argument("--port", type=int, default=8082)
+    serve.add_argument("--rate", type=float, default=10, help="новых объявлений в минуту на город")
+    serve.add_argument("--initial", type=int, default=100, help="объявлений в ленте на старте")
+    serve.add_argument("--replay", help="каталог с записанными страницами вместо синтетики")
+    serve.add_argument("--latency", type=float, default=0.05)
+    serve.add_argument("--jitter", type=float, default=0.0)
+    serve.add_argument("--error-probability", type=float, default=0.0, help="доля ответов 5xx")
+    serve.add_argument("--rate-limit-probability", type=float, default=0.0, help="доля ответов 429")
+
+    rec = commands.add_parser("record")
+    rec.add_argument("--city", default="minsk")
+    rec.add_argument("--pages", type=int, default=3)
+    rec.add_argument("--out", default="./bench/pages")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        asyncio.run(record(args.city, args.pages, args.out))
+    else:
+        web.run_app(create_app(rate=args.rate, initial=args.initial, replay_dir=args.replay, latency=args.latency,
+                               jitter=args.jitter, error_probability=args.error_probability,
+                               rate_limit_probability=args.rate_limit_probability),
+                    host="127.0.0.1", port=args.port)
@@ -0,0 +1,147 @@
+"""Заглушка Telegram Bot API для бенчмарков: отвечает на sendMessage/sendMediaGroup, умеет задержку и 429.
+
+Отдельно: python -m bench.fake_telegram --port 8081 (и TG_API_SERVER=http://127.0.0.1:8081 у бота).
+Со стороны Telegram умеет и обратное: post_updates шлёт обновления на webhook бота,
+а enqueue_updates кладёт их в очередь, которую бот забирает через getUpdates (long polling).
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Optional
+
+import aiohttp
+from aiohttp import web
+
+
+class FakeTelegramStats:
+    def __init__(self):
+        self.requests: dict[str, int] = {}
+        self.flood_waits = 0
+        self.sent: list[tuple[float, str, str]] = []  # (время, метод, chat_id)
+        self.texts: list[tuple[float, str]] = []  # (время, текст или подпись к первому фото)
+
+
+def make_message(message_id: int, chat_id: str, **extra) -> dict:
+    return {"message_id": message_id, "date": int(time.time()),
+            "chat": {"id": int(chat_id), "type": "private"}, **extra}
+
+
+def create_app(latency: float = 0.05, flood_probability: float = 0.0, retry_after: int = 1,
+               seed: int = 1) -> web.Application:
+    stats = FakeTelegramStats()
+    rnd = random.Random(seed)
+    counter = iter(range(1, 10 ** 9))
+    updates: list[dict] = []
+    updates_ready = asyncio.Event()
+
+    async def handle(request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        stats.requests[method] = stats.requests.get(method, 0) + 1
+        data = dict(await request.post())
+        if request.content_type == "application/json":
+            data = await request.json()
+
+        await asyncio.sleep(latency)
+
+        if method in ("sendMessage", "sendMediaGroup") and rnd.random() < flood_probability:
+            stats.flood_waits += 1
+            return web.json_response({"ok": False, "error_code": 429,
+                                      "description": f"Too Many Requests: retry after {retry_after}",
+                                      "parameters": {"retry_after": retry_after}})
+
+        chat_id = str(data.get("chat_id", 0))
+        if method == "sendMessage":
+            stats.sent.append((time.monotonic(), method, chat_id))
+            stats.texts.append((time.monotonic(), data.get("text", "")))
+            result = make_message(next(counter), chat_id, text=data.get("text", ""))
+        elif method == "sendMediaGroup":
+            stats.sent.append((time.monotonic(), method, chat_id))
+            media = data.get("media", "[]")
+            media = json.loads(media) if isinstance(media, str) else media
+            stats.texts.append((time.monotonic(), media[0].get("caption", "") if media else ""))
+            result = []
+            for _ in media:
+                message_id = next(counter)
+                photo = {"file_id": f"fake-file-{message_id}", "file_unique_id": f"u{message_id}",
+                         "width": 320, "height": 240}
+                result.append(make_message(message_id, chat_id, photo=[photo]))
+        elif method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "fake", "username": "fake_bot"}
+        elif method == "getUpdates":
+            offset = int(data.get("offset") or 0)
+            while updates and updates[0]["update_id"] < offset:
+                updates.pop(0)
+            if not updates:
+                updates_ready.clear()
+                try:
+                    await asyncio.wait_for(updates_ready.wait(), timeout=float(data.get("timeout") or 1))
+                except asyncio.TimeoutError:
+                    pass
+            result = updates[:int(data.get("limit") or 100)]
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    app = web.Application()
+    app["stats"] = stats
+    app["updates"] = updates
+    app["updates_ready"] = updates_ready
+    app.router.add_post("/bot{token}/{method}", handle)
+    return app
+
+
+def make_message_update(update_id: int, user_id: int, text: str) -> dict:
+    """Update с текстовым сообщением пользователя, как его присылает Telegram."""
+    user = {"id": user_id, "is_bot": False, "first_name": f"user {user_id}"}
+    message = {"message_id": update_id, "date": int(time.time()), "chat": {"id": user_id, "type": "private"},
+               "from": user, "text": text}
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+def enqueue_updates(app: web.Application, new_updates: list[dict]) -> None:
+    """Обновления для getUpdates: отдаются, пока бот не подтвердит их через offset."""
+    app["updates"].extend(new_updates)
+    app["updates_ready"].set()
+
+
+async def post_updates(url: str, updates: list[dict], secret: Optional[str] = None,
+                       concurrency: int = 50) -> list[tuple[int, float, float]]:
+    """Шлёт обновления на webhook; возвращает (update_id, время отправки, время ответа) для каждого."""
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def post(session: aiohttp.ClientSession, update: dict) -> None:
+        async with semaphore:
+            started = time.monotonic()
+            async with session.post(url, json=update, headers=headers) as response:
+                await response.read()
+                if response.status != 200:
+                    raise RuntimeError(f"Webhook answered {response.status} to update {update['update_id']}")
+            results.append((update["update_id"], started, time.monotonic()))
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(post(session, update) for update in updates))
+    return results
+
+
+async def start_fake_telegram(port: int, **options) -> tuple[web.AppRunner, FakeTelegramStats]:
+    app = create_app(**options)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner, app["stats"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--flood-probability", type=float, default=0.0)
+    args = parser.parse_args()
+    web.run_app(create_app(latency=args.latency, flood_probability=args.flood_probability),
+                host="127.0.0.1", port=args.port)
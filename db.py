@@ -1,11 +1,18 @@
-from models import User, Post, Image
+from models import User, Post, Image, CrawlState, OutboxItem
 from logger import logger
+from metrics import timed
+from cache import LRUCache
+import json
 import os
-from typing import Any
+from typing import Any, Iterable, Optional
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from tortoise.exceptions import IntegrityError, OperationalError, DoesNotExist
 from tortoise.queryset import QuerySet
-from tortoise.expressions import Q
+from tortoise.expressions import Q, F
 from tortoise import Tortoise
+from tortoise.utils import get_schema_sql
+from tortoise.transactions import in_transaction
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -23,65 +30,166 @@ TORTOISE_ORM = {
 }
 
 
-async def save_new_post_to_db(id: str,
-                              price_byn: float,
-                              price_usd: float,
-                              address: str,
-                              short_description: str,
-                              post_url: str,
-                              city: str,
-                              lat: float,
-                              lon: float,
-                              city_district: str,
-                              subway: str,
-                              pharmacy: str,
-                              kindergarten: str,
-                              school: str,
-                              bank: str,
-                              shop: str,
-                              rooms: str,
-                              number_of_floors: str,
-                              apartment_floor: str,
-                              total_area: str,
-                              balcony: str,
-                              prepayment: str) -> bool:
+class RecentIds:
+    """Ограниченное множество недавно виденных id (вытесняются самые старые)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.items: OrderedDict[str, None] = OrderedDict()
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.items
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, item: str) -> None:
+        self.items[item] = None
+        self.items.move_to_end(item)
+        if len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+
+KNOWN_POST_IDS = RecentIds(maxsize=int(os.getenv("KNOWN_POST_IDS_CACHE", 50_000)))
+
+
+class DistrictCatalogue:
+    """Районы городов для клавиатуры выбора: имена из ./geo/<city>.geojson (тот же файл, что у
+    location.district_geojson_path; location не импортируется, он загружает POI) и районы
+    уже сохранённых объявлений (читаются из базы при запуске, затем пополняются при сохранении).
+    Список отсортирован, GeoJSON перечитывается при смене mtime."""
+
+    def __init__(self):
+        self.from_geojson: dict[str, set[str]] = {}
+        self.seen: dict[str, set[str]] = {}
+        self.mtimes: dict[str, float] = {}
+        self.ordered: dict[str, list[str]] = {}
+
+    def load_geojson(self, city: str) -> None:
+        path = f"./geo/{city}.geojson"
+        try:
+            mtime = os.path.getmtime(path)
+            if self.mtimes.get(city) == mtime:
+                return
+            with open(path, "r", encoding="utf-8") as file:
+                features = json.load(file)["features"]
+        except (OSError, ValueError, KeyError) as e:
+            if city not in self.mtimes:
+                logger.error(f"Districts for city [{city}] are not loaded from GeoJSON: {e}")
+                self.mtimes[city] = 0.0
+            return
+        names = (feature["properties"].get("name:ru") for feature in features)
+        self.from_geojson[city] = {name.strip().lower() for name in names if name and name.strip()}
+        self.mtimes[city] = mtime
+        self.ordered.pop(city, None)
+
+    async def load_seen(self) -> None:
+        """Районы из базы: иначе процессы, которые не сохраняют посты (webhook), видели бы только GeoJSON."""
+        try:
+            pairs = await Post.exclude(city_district__isnull=True).exclude(
+                city_district="").distinct().values_list("city", "city_district")
+        except Exception as e:
+            logger.exception(f"Failed to load districts from database: {e}")
+            return
+        for city, district in pairs:
+            self.add(city, district)
+
+    def add(self, city: str, district: str | None) -> None:
+        district = (district or "").strip().lower()
+        if district and district not in self.seen.setdefault(city, set()):
+            self.seen[city].add(district)
+            self.ordered.pop(city, None)
+
+    def get(self, city: str) -> list[str]:
+        city = str(city).strip().lower()
+        self.load_geojson(city)
+        ordered = self.ordered.get(city)
+        if ordered is None:
+            ordered = self.ordered[city] = sorted(self.from_geojson.get(city, set()) | self.seen.get(city, set()))
+        return ordered
+
+
+DISTRICTS = DistrictCatalogue()
+
+# Пользователи для обработчиков бота. Сохранённый объект кладёт обратно сигнал post_save
+# (signals.on_user_update); ttl ограничивает расхождение с другими процессами webhook
+# для показа меню, а изменения настроек начинаются с refresh_user.
+USER_CACHE = LRUCache(maxsize=int(os.getenv("USER_CACHE_SIZE", 10_000)),
+                      ttl=float(os.getenv("USER_CACHE_TTL", 60)))
+
+
+@timed("db.get_existing_post_ids")
+async def get_existing_post_ids(ids: Iterable[str]) -> set[str]:
+    """Какие из ids уже есть в базе: сначала память, остальные — одним запросом."""
+    ids = set(ids)
+    known = {post_id for post_id in ids if post_id in KNOWN_POST_IDS}
+    unknown = ids - known
+    if unknown:
+        try:
+            found = await Post.filter(id__in=list(unknown)).values_list("id", flat=True)
+        except Exception as e:
+            logger.exception(f"Failed to check existing posts: {e}")
+            found = []
+        for post_id in found:
+            KNOWN_POST_IDS.add(post_id)
+        known.update(found)
+    return known
+
+
+async def insert_new_posts(posts: list[dict], images: dict[str, list[str]]) -> dict[str, Post]:
+    """Добавляет в одной транзакции посты, которых ещё нет в базе, и их картинки; возвращает добавленные по id."""
+    async with in_transaction() as connection:
+        ids = [post['id'] for post in posts]
+        existing = set(await Post.filter(id__in=ids).using_db(connection).values_list("id", flat=True))
+        new_posts = {post['id']: Post(**post) for post in posts if post['id'] not in existing}
+
+        await Post.bulk_create(new_posts.values(), ignore_conflicts=True, using_db=connection)
+        await Image.bulk_create([Image(image_src=src, from_post_id=post_id)
+                                 for post_id in new_posts for src in images.get(post_id, [])],
+                                using_db=connection)
+    return new_posts
+
+
+@timed("db.save_new_posts_batch")
+async def save_new_posts_batch(posts: list[dict], images: dict[str, list[str]]) -> Optional[set[str]]:
+    """Сохраняет страницу объявлений и их картинки одной транзакцией, возвращает id реально добавленных постов.
+
+    posts — словари с полями модели Post, images — ссылки на картинки по id поста.
+    Уже существующие посты не трогаются (bulk_create с ignore_conflicts работает и на SQLite, и на PostgreSQL).
+    Если транзакция страницы не прошла, посты сохраняются по одному: объявление с ошибкой пропускается,
+    остальные сохраняются. None — не сохранился ни один пост (например, база недоступна).
+    """
+    if not posts:
+        return set()
+
     try:
-        new_post, created = await Post.get_or_create(
-            id=id, defaults={
-                'price_byn': price_byn,
-                'price_usd': price_usd,
-                'address': address,
-                'short_description': short_description,
-                'post_url': post_url,
-                'city': city,
-                'is_sent': False,
-                'lat': lat,
-                'lon': lon,
-                'city_district': city_district,
-                'nearby_subway': subway,
-                'nearby_pharmacy': pharmacy,
-                'nearby_kindergarten': kindergarten,
-                'nearby_school': school,
-                'nearby_bank': bank,
-                'nearby_shop': shop,
-                'rooms': rooms,
-                'number_of_floors': number_of_floors,
-                'apartment_floor': apartment_floor,
-                'total_area': total_area,
-                'balcony': balcony,
-                'prepayment': prepayment,
-            })
-        if created:
-            logger.info(f"The new record has been successfully added to database. ID: [{id}]")
-            return True
-        return False
-    except IntegrityError:
-        logger.info(f"Post{id} already exists")
+        new_posts = await insert_new_posts(posts, images)
+        saved_ids = [post['id'] for post in posts]
     except Exception as e:
-        logger.exception(f"Error saving recor to database. ID: [{id}]. {e}")
+        logger.exception(f"Error saving batch of {len(posts)} posts to database, saving one by one: {e}")
+        new_posts = {}
+        saved_ids = []
+        for post in posts:
+            try:
+                new_posts.update(await insert_new_posts([post], images))
+                saved_ids.append(post['id'])
+            except Exception as e:
+                logger.exception(f"Post [{post['id']}] skipped, failed to save it to database: {e}")
+        if not saved_ids:
+            return None
+
+    for post_id in saved_ids:
+        KNOWN_POST_IDS.add(post_id)
+    for post in new_posts.values():
+        DISTRICTS.add(post.city, post.city_district)
+    logger.info(f"Saved {len(new_posts)} new posts of {len(posts)} to database")
+    return set(new_posts)
 
 
 async def get_or_create_user(id: int, is_bot: bool, first_name: str) -> tuple[Any, Any]:
+    user = USER_CACHE.get(str(id))
+    if user is not None:
+        return user, False
     try:
         new_user, created = await User.get_or_create(id=id, defaults={
             'is_bot': is_bot,
@@ -93,31 +201,39 @@ async def get_or_create_user(id: int, is_bot: bool, first_name: str) -> tuple[An
             'district': 'all',
             'rooms_count': 5,
         })
+        USER_CACHE.put(str(new_user.id), new_user)
         return new_user, created
     except (OperationalError, IntegrityError) as e:
         logger.exception(f"Error creating or getting user [{id}]: {e}")
         return None, False
 
 
-async def save_new_image_to_db(src: str, post_id: str) -> bool:
-    if not src or not post_id:
-        return False
-
+@timed("db.save_image_file_ids")
+async def save_image_file_ids(images: list[Image]) -> None:
     try:
-        post = await Post.get(id=post_id)
-    except DoesNotExist as e:
-        logger.exception(f"Skip image, post [{post_id}] does not exist")
-        return False
+        await Image.bulk_update(images, fields=["file_id"])
+    except Exception as e:
+        logger.exception(f"Failed to save telegram file_id for images: {e}")
+
 
+async def save_user(user: User, *fields: str) -> None:
+    """Сохраняет только изменённые поля; при ошибке объект в кэше уже изменён, поэтому он вытесняется."""
     try:
-        await Image.get_or_create(image_src=src, defaults={"from_post": post})
-        return True
-    except Exception as e:
-        logger.exception(f"Failed to save image for post [{post_id}] -> {e}")
-        return False
+        await user.save(update_fields=list(fields) or None)
+    except Exception:
+        USER_CACHE.pop(str(user.id))
+        raise
+
+
+async def refresh_user(user: User) -> User:
+    """Перечитывает пользователя из базы перед изменением. Объект из кэша мог устареть:
+    другой процесс webhook поменял настройки, и переключатель по старому значению потерял бы действие."""
+    await user.refresh_from_db()
+    return user
 
 
 async def get_user_by_id(user_id: str) -> User:
+    # результат идёт на запись (отключение заблокировавших бота), поэтому всегда из базы
     try:
         return await User.get(id=user_id)
     except DoesNotExist:
@@ -153,22 +269,15 @@ def rooms_count_filter_users(rooms_count: int, users: QuerySet[User]) -> QuerySe
 
 def rooms_count_filter_posts(rooms_count: int, posts: QuerySet[Post]) -> QuerySet[Post]:
     if rooms_count in [1, 2, 3]:
-        return posts.filter(rooms=rooms_count)
+        return posts.filter(rooms_num=rooms_count)
     elif rooms_count == 4:
-        return posts.filter(rooms__gte=4)
+        return posts.filter(rooms_num__gte=4)
     else:
         return posts
 
 
-async def get_districts_from_database(city: str) -> list:
-    city = str(city).strip().lower()
-    data = {"minsk": [], "vitebsk": [], "grodno": [], "mogilev": [], "gomel": [], "brest": []}
-    districts = await Post.filter(city=city).exclude(city_district__isnull=True).exclude(
-        city_district="").distinct().values_list("city_district", flat=True)
-
-    for d in districts:
-        data[city].append(d.strip().lower())
-    return data[city]
+def get_city_districts(city: str) -> list[str]:
+    return DISTRICTS.get(city)
 
 
 async def get_active_users(city: str, district: str, rooms_count: int) -> QuerySet[User]:
@@ -184,6 +293,125 @@ async def get_active_users(city: str, district: str, rooms_count: int) -> QueryS
         return User.filter(id=0)
 
 
+async def get_high_water_marks() -> dict[str, tuple[datetime, Optional[str]]]:
+    try:
+        states = await CrawlState.exclude(last_list_time__isnull=True)
+        return {state.city: (state.last_list_time, state.last_ad_id) for state in states}
+    except Exception as e:
+        logger.exception(f"Failed to load crawl state: {e}")
+        return {}
+
+
+async def save_high_water_mark(city: str, list_time: datetime, ad_id: str) -> None:
+    try:
+        await CrawlState.update_or_create(city=city, defaults={"last_list_time": list_time, "last_ad_id": ad_id})
+    except Exception as e:
+        logger.exception(f"Failed to save crawl state for city [{city}]: {e}")
+
+
+@timed("db.enqueue_deliveries")
+async def enqueue_deliveries(post_id: str, user_ids: list[str]) -> int:
+    """Кладёт доставки поста в outbox; повторная постановка той же пары (пост, пользователь) игнорируется."""
+    if not user_ids:
+        return 0
+    await OutboxItem.bulk_create([OutboxItem(post_id=post_id, user_id=user_id) for user_id in user_ids],
+                                 ignore_conflicts=True)
+    return len(user_ids)
+
+
+@timed("db.claim_deliveries")
+async def claim_deliveries(limit: int) -> list[OutboxItem]:
+    """Забирает пачку готовых к отправке доставок и помечает их как sending."""
+    async with in_transaction() as connection:
+        items = await (OutboxItem.filter(status="pending", next_attempt_at__lte=datetime.now())
+                       .order_by("id").limit(limit).select_for_update(skip_locked=True)
+                       .using_db(connection))
+        if not items:
+            return []
+        await (OutboxItem.filter(id__in=[item.id for item in items]).using_db(connection)
+               .update(status="sending", attempts=F("attempts") + 1))
+    for item in items:
+        item.status = "sending"
+        item.attempts += 1
+    return items
+
+
+@timed("db.complete_delivery")
+async def complete_delivery(item_id: int) -> bool:
+    """Идемпотентно отмечает доставку выполненной; False, если она уже была завершена."""
+    return bool(await OutboxItem.filter(id=item_id).exclude(status="sent").update(status="sent"))
+
+
+@timed("db.fail_delivery")
+async def fail_delivery(item: OutboxItem, max_attempts: int, backoff: float, permanent: bool = False) -> None:
+    """Возвращает доставку в очередь с backoff; permanent (пользователь недоступен, поста нет) — сразу failed."""
+    if permanent or item.attempts >= max_attempts:
+        await OutboxItem.filter(id=item.id, status="sending").update(status="failed")
+        if not permanent:
+            logger.warning(f"Delivery of post [{item.post_id}] to user [{item.user_id}] failed "
+                           f"after {item.attempts} attempts")
+        return
+    next_attempt_at = datetime.now() + timedelta(seconds=backoff * 2 ** (item.attempts - 1))
+    await OutboxItem.filter(id=item.id, status="sending").update(status="pending", next_attempt_at=next_attempt_at)
+
+
+async def get_unsent_posts(since: datetime) -> list[Post]:
+    """Сохранённые, но ещё не разложенные по outbox посты (процесс упал между persist и match)."""
+    try:
+        return await Post.filter(is_sent=False, date__gte=since).order_by("date")
+    except Exception as e:
+        logger.exception(f"Failed to load unsent posts: {e}")
+        return []
+
+
+async def reset_interrupted_deliveries() -> int:
+    """После рестарта возвращает в очередь доставки, оборвавшиеся на полпути."""
+    return await OutboxItem.filter(status="sending").update(status="pending")
+
+
+# Колонки, добавленные миграциями 2, 3 и 5. Миграции aerich написаны для PostgreSQL, а на SQLite
+# generate_schemas(safe=True) создаёт только недостающие таблицы, поэтому в старую базу их добавляет init_db.
+SQLITE_ADDED_COLUMNS = {
+    "posts": {"rooms_num": "INT", "total_area_num": "REAL", "apartment_floor_num": "INT",
+              "number_of_floors_num": "INT", "nearby": "JSON"},
+    "images": {"file_id": "TEXT"},
+}
+# заполнение числовых колонок как в миграции 2; регулярных выражений в SQLite нет, а CAST берёт числовой префикс
+SQLITE_BACKFILL = {
+    "rooms_num": """UPDATE "posts" SET "rooms_num" = CAST(ltrim("rooms") AS INT)
+                    WHERE ltrim("rooms") GLOB '[0-9]*'""",
+    "total_area_num": """UPDATE "posts" SET "total_area_num" = CAST(replace(ltrim("total_area"), ',', '.') AS REAL)
+                         WHERE ltrim("total_area") GLOB '[0-9]*'""",
+    "apartment_floor_num": """UPDATE "posts" SET "apartment_floor_num" = CAST(ltrim("apartment_floor") AS INT)
+                              WHERE ltrim("apartment_floor") GLOB '[0-9]*'""",
+    "number_of_floors_num": """UPDATE "posts" SET "number_of_floors_num" = CAST(ltrim("number_of_floors") AS INT)
+                               WHERE ltrim("number_of_floors") GLOB '[0-9]*'""",
+}
+
+
+async def upgrade_sqlite_schema() -> None:
+    """Доводит существующую SQLite-базу до текущих моделей: новые колонки, их заполнение и индексы."""
+    connection = Tortoise.get_connection("default")
+    if connection.capabilities.dialect != "sqlite":
+        return
+
+    for table, columns in SQLITE_ADDED_COLUMNS.items():
+        _, rows = await connection.execute_query(f'PRAGMA table_info("{table}")')
+        existing = {row["name"] for row in rows}
+        for column, column_type in columns.items():
+            if column in existing:
+                continue
+            await connection.execute_script(f'ALTER TABLE "{table}" ADD "{column}" {column_type}')
+            if column in SQLITE_BACKFILL:
+                await connection.execute_script(SQLITE_BACKFILL[column])
+            logger.info(f"SQLite schema upgraded: column {table}.{column} added")
+
+    # индексы моделей generate_schemas создаёт только вместе с новой таблицей
+    for statement in get_schema_sql(connection, safe=True).split(";"):
+        if statement.strip().startswith("CREATE INDEX"):
+            await connection.execute_script(statement)
+
+
 async def init_db():
     await Tortoise.init(
         db_url=os.getenv("DB_PATH"),
@@ -191,3 +419,10 @@ async def init_db():
     )
 
     await Tortoise.generate_schemas(safe=True)
+    await upgrade_sqlite_schema()
+    await DISTRICTS.load_seen()
+
+
+async def close_db():
+    # соединения aiosqlite держат не-daemon потоки: без закрытия процесс не завершится
+    await Tortoise.close_connections()
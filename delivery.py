@@ -0,0 +1,142 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+
+from logger import logger
+from metrics import FLOOD_WAIT_SECONDS, FLOOD_WAITS, TELEGRAM_ERRORS, TELEGRAM_REQUEST_SECONDS
+from ratelimit import TokenBucket
+
+SendFunc = Callable[[], Awaitable[Any]]
+
+
+class TelegramLimiter:
+    """Лимиты Bot API: общий (~30 сообщений/с) и на каждый чат (~1 сообщение/с)."""
+
+    def __init__(self, global_rate: float = 30, chat_rate: float = 1, max_chats: int = 10_000):
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_rate = chat_rate
+        self.max_chats = max_chats
+        self.chat_buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, capacity=1)
+            if len(self.chat_buckets) > self.max_chats:
+                self.chat_buckets.popitem(last=False)
+        self.chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    async def acquire(self, chat_id: str, cost: float = 1) -> None:
+        await self._chat_bucket(chat_id).acquire()
+        await self.global_bucket.acquire(cost)
+
+    def retry_after(self, seconds: float) -> None:
+        self.global_bucket.pause(seconds)
+
+    def set_global_rate(self, rate: float) -> None:
+        """Новый общий лимит, например доля процесса, когда отправляют несколько процессов."""
+        self.global_bucket = TokenBucket(rate)
+
+
+class DeliveryJob:
+    __slots__ = ("chat_id", "send", "cost", "future", "attempts", "created")
+
+    def __init__(self, chat_id: str, send: SendFunc, cost: float, future: asyncio.Future):
+        self.chat_id = chat_id
+        self.send = send
+        self.cost = cost
+        self.future = future
+        self.attempts = 0
+        self.created = time.monotonic()
+
+
+class DeliveryEngine:
+    """Пул отправителей с общим лимитером.
+
+    send() ставит вызов Bot API в очередь и ждёт его результата. FloodWait не блокирует
+    одну корутину: лимитер ставится на паузу для всех воркеров, а задача возвращается в очередь.
+    """
+
+    def __init__(self, limiter: TelegramLimiter, workers: int = 16, queue_size: int = 1000, max_retries: int = 5):
+        self.limiter = limiter
+        self.workers_count = workers
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: list[asyncio.Task] = []
+
+    def _ensure_started(self) -> None:
+        if self.workers:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.workers_count)]
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize() if self.queue else 0
+
+    async def send(self, chat_id: str, send: SendFunc, cost: float = 1) -> Any:
+        self._ensure_started()
+        job = DeliveryJob(str(chat_id), send, cost, asyncio.get_running_loop().create_future())
+        await self.queue.put(job)
+        return await job.future
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._process(job)
+            finally:
+                self.queue.task_done()
+
+    async def _process(self, job: DeliveryJob) -> None:
+        await self.limiter.acquire(job.chat_id, job.cost)
+        job.attempts += 1
+        try:
+            result = await job.send()
+        except TelegramRetryAfter as e:
+            logger.warning(f"FloodWait {e.retry_after} sec for chat {job.chat_id}")
+            FLOOD_WAITS.inc()
+            FLOOD_WAIT_SECONDS.inc(e.retry_after)
+            self.limiter.retry_after(e.retry_after)
+            if job.attempts < self.max_retries:
+                # в очередь возвращаем из отдельной задачи, чтобы воркер не ждал место в полной очереди
+                asyncio.create_task(self.queue.put(job))
+            elif not job.future.done():
+                job.future.set_exception(e)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+
+    async def close(self) -> None:
+        """Дожидается отправки всего, что уже в очереди, и останавливает воркеры."""
+        if not self.workers:
+            return
+        await self.queue.join()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+
+class RequestMetricsMiddleware(BaseRequestMiddleware):
+    """Время каждого запроса к Bot API (send_message, send_media_group, ...) и ошибки по типам."""
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot, method):
+        api_method = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            TELEGRAM_ERRORS.inc(method=api_method, error=type(e).__name__)
+            raise
+        finally:
+            TELEGRAM_REQUEST_SECONDS.observe(time.perf_counter() - started, method=api_method)
@@ -0,0 +1,108 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from logger import logger
+from metrics import timed
+
+# Поле поста -> категория POI
+NEARBY_FIELDS = {
+    'nearby_subway': 'subway',
+    'nearby_pharmacy': 'pharmacy',
+    'nearby_kindergarten': 'kindergarten',
+    'nearby_school': 'school',
+    'nearby_bank': 'bank',
+    'nearby_shop': 'convenience',
+}
+NEARBY_LIMIT = 5
+
+# location импортируется внутри функций: при работе через пул POI и полигоны
+# загружаются только в процессах-воркерах, а не в основном процессе бота.
+# Кеш POI при этом собирает основной процесс до запуска пула (ensure_poi_cache)
+
+
+def init_worker(cities: list[str]) -> None:
+    """Инициализация воркера: один раз загружает POI и полигоны районов всех городов"""
+    from location import get_district_index
+
+    for city in cities:
+        try:
+            get_district_index(city)
+        except OSError as e:
+            logger.error(f"Enrichment worker: districts for {city} are not loaded: {e}")
+
+
+def enrich_batch(city: str, coords: list[tuple[float, float]], radius: float) -> list[dict]:
+    """Район и ближайшая инфраструктура для каждой точки: словари с полями Post"""
+    from location import get_districts, reload_districts, find_nearest_batch
+
+    reload_districts()
+    results = []
+    for district, nearest in zip(get_districts(city, coords), find_nearest_batch(coords, NEARBY_LIMIT, radius)):
+        fields = {
+            'city_district': district.lower().strip() if district else "",
+            'nearby': {category: nearest[category] for category in NEARBY_FIELDS.values() if nearest[category]},
+        }
+        for field, category in NEARBY_FIELDS.items():
+            fields[field] = ', '.join(name for name, _ in nearest[category])
+        results.append(fields)
+    return results
+
+
+class EnrichmentExecutor:
+    """Обогащение объявлений геоданными вне event loop.
+
+    Батчи координат уходят в ProcessPoolExecutor, поэтому проверки полигонов и поиск POI
+    не блокируют диспетчер aiogram. inline=True (или workers=0) считает всё в текущем
+    процессе — для тестов и отладки.
+    """
+
+    def __init__(self, cities: list[str], workers: int = 2, inline: bool = False, radius: float = 500):
+        self.cities = cities
+        self.workers = workers
+        self.inline = inline or workers < 1
+        self.radius = radius
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.starting = asyncio.Lock()
+
+    async def start(self) -> None:
+        if self.inline or self.pool is not None:
+            return
+        async with self.starting:
+            if self.pool is not None:
+                return
+            # иначе каждый воркер при пустом кеше сканировал бы pbf сам, одновременно с остальными
+            from poi_cache import OSM_FILE, ensure_poi_cache
+            await asyncio.to_thread(ensure_poi_cache, OSM_FILE)
+            # spawn, а не fork: форк процесса с запущенным event loop и открытыми соединениями небезопасен
+            self.pool = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=init_worker, initargs=(self.cities,))
+            logger.info(f"Enrichment pool started with {self.workers} workers")
+
+    # замер здесь, а не в location: функции location выполняются в процессах пула,
+    # и их метрики не попали бы в /metrics основного процесса
+    @timed("enrichment.enrich")
+    async def enrich(self, city: str, coords: list[tuple[float, float]]) -> list[dict]:
+        if self.inline:
+            return enrich_batch(city, coords, self.radius)
+        await self.start()
+        pool = self.pool
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, enrich_batch, city, coords, self.radius)
+        except BrokenProcessPool as e:
+            # упавший воркер ломает пул целиком: без перезапуска все следующие батчи завершались бы ошибкой
+            logger.error(f"Enrichment pool is broken, restarting it: {e}")
+            if self.pool is pool:
+                self.pool = None
+                pool.shutdown(wait=False, cancel_futures=True)
+            await self.start()
+            return await loop.run_in_executor(self.pool, enrich_batch, city, coords, self.radius)
+
+    def shutdown(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
@@ -0,0 +1,48 @@
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from models import FsmState
+
+
+class DatabaseStorage(BaseStorage):
+    """FSM aiogram в таблице fsm_state.
+
+    MemoryStorage живёт в одном процессе, а обновления одного пользователя при нескольких
+    процессах webhook приходят в разные процессы: выбор города и района или минимальной
+    и максимальной цены обрывался бы на втором шаге. Пустые записи удаляются.
+    """
+
+    def __init__(self, key_builder: Optional[KeyBuilder] = None):
+        self.key_builder = key_builder or DefaultKeyBuilder(with_destiny=True)
+
+    async def _save(self, key: StorageKey, **values: Any) -> None:
+        record_key = self.key_builder.build(key)
+        record = await FsmState.get_or_none(key=record_key)
+        if record is None:
+            record = FsmState(key=record_key, data={})
+        for field, value in values.items():
+            setattr(record, field, value)
+
+        if record.state is None and not record.data:
+            await FsmState.filter(key=record_key).delete()
+        else:
+            await record.save()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._save(key, state=state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = await FsmState.get_or_none(key=self.key_builder.build(key))
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._save(key, data=dict(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = await FsmState.get_or_none(key=self.key_builder.build(key))
+        return dict(record.data) if record else {}
+
+    async def close(self) -> None:
+        pass
@@ -1,83 +1,113 @@
 from logger import logger
 import json
+from functools import cache
+import os
+import numpy as np
+import shapely
 from shapely.geometry import shape, Point
 from shapely.geometry.base import BaseGeometry
-import osmium
-from math import radians, sin, cos, sqrt, asin
+from poi_cache import OSM_FILE, CITY_OBJECTS, POIStore, load_poi_store
+from spatial_index import GridIndex, SortedIndex, distance
 from typing import Dict, Set
 
-OSM_FILE = "./geo/belarus-251117.osm.pbf"
+POI_STORE = load_poi_store(OSM_FILE)
 
-CITY_OBJECTS = {
-    "subway":  {"key": "railway", "value": "subway_entrance"},
-    "pharmacy": {"key": "amenity", "value": "pharmacy"},
-    "kindergarten": {"key": "amenity", "value": "kindergarten"},
-    "school": {"key": "amenity", "value": "school"},
-    "bank": {"key": "amenity", "value": "bank"},
-    "supermarket": {"key": "shop", "value": "supermarket"},
-    "convenience": {"key": "shop", "value": "convenience"},
-    "mall": {"key": "shop", "value": "mall"},
-}
+for k, v in POI_STORE.categories.items():
+    print(f"  {k}:{len(v.lat)} шт.")
 
-POI_DATA = {k: [] for k in CITY_OBJECTS.keys()}
 
+def build_poi_index(store: POIStore) -> Dict[str, GridIndex]:
+    # mmap-колонки переводим в списки: поэлементный доступ к ним в индексе заметно быстрее
+    return {key: GridIndex(columns.lat.tolist(), columns.lon.tolist())
+            for key, columns in store.categories.items()}
 
-class POIHandler(osmium.SimpleHandler):
-    def node(self, n):
-        if not n.tags:
-            return
 
-        for key, rule in CITY_OBJECTS.items():
-            if n.tags.get(rule["key"]) == rule["value"]:
-                POI_DATA[key].append({
-                    "name": n.tags.get("name:ru") or n.tags.get("name") or "",
-                    "lat": n.location.lat,
-                    "lon": n.location.lon
-                })
+@cache
+def poi_index() -> Dict[str, GridIndex]:
+    """Сеточный индекс для поштучных запросов (find_nearby, find_nearest); в пакетном обогащении
+    не нужен, поэтому строится при первом вызове."""
+    return build_poi_index(POI_STORE)
 
-    def way(self, w):
-        for key, rule in CITY_OBJECTS.items():
-            if w.tags.get(rule["key"]) == rule["value"]:
-                if w.nodes:
-                    lat = sum(n.lat for n in w.nodes) / len(w.nodes)
-                    lon = sum(n.lon for n in w.nodes) / len(w.nodes)
+# для пакетного поиска: те же колонки, отсортированные по широте
+POI_SORTED = {key: SortedIndex(columns.lat, columns.lon) for key, columns in POI_STORE.categories.items()}
+# у каких кодов названий непустое название (безымянные точки в find_nearest не учитываются)
+POI_NAMED = np.array([bool(name) for name in POI_STORE.names], dtype=bool)
+# ключи для SortedIndex.nearest_many: код названия точки или -1 у безымянной
+POI_NAME_KEYS = {key: np.where(POI_NAMED[columns.name], columns.name, -1)
+                 for key, columns in POI_STORE.categories.items()}
 
-                    POI_DATA[key].append({
-                        "name": w.tags.get("name:ru") or w.tags.get("name") or "",
-                        "lat": lat,
-                        "lon": lon
-                    })
 
+def find_nearby(lat: float, lon: float, radius: int = 500) -> Dict[str, Set[str]]:
+    result = {k: set() for k in CITY_OBJECTS.keys()}
+    for key, index in poi_index().items():
+        name = POI_STORE.categories[key].name
+        for _, i in index.query_radius(lat, lon, radius):
+            result[key].add(POI_STORE.names[name[i]])
+    return result
 
 
-handler = POIHandler()
-handler.apply_file(OSM_FILE, locations=True)
-
-for k, v in POI_DATA.items():
-    print(f"  {k}:{len(v)} шт.")
-
+def find_nearby_batch(coords: list[tuple[float, float]], radius: int = 500) -> list[Dict[str, Set[str]]]:
+    """find_nearby для всех объявлений страницы сразу: расстояния считаются векторно по всем парам."""
+    results = [{k: set() for k in CITY_OBJECTS.keys()} for _ in coords]
+    if not coords:
+        return results
+
+    lats, lons = np.array(coords, dtype=np.float64).reshape(-1, 2).T
+    names_count = len(POI_STORE.names)
+    for key, index in POI_SORTED.items():
+        query, found, _ = index.query_radius_many(lats, lons, radius)
+        # уникальные пары (объявление, код имени)
+        pairs = np.unique(query * names_count + POI_STORE.categories[key].name[found])
+        for ad, code in zip((pairs // names_count).tolist(), (pairs % names_count).tolist()):
+            results[ad][key].add(POI_STORE.names[code])
+    return results
+
+
+def find_nearest(lat: float, lon: float, k: int, radius: int = 500) -> Dict[str, list[tuple[str, int]]]:
+    """k ближайших объектов каждой категории с разными непустыми названиями: [(название, метры), ...]"""
+    names = POI_STORE.names
+    result = {}
+    for key, index in poi_index().items():
+        codes = POI_STORE.categories[key].name
+        nearest = index.nearest(lat, lon, k, radius, key=lambda i: names[codes[i]])
+        result[key] = [(names[codes[i]], round(dist)) for dist, i in nearest]
+    return result
 
-def distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    R = 6371000
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
 
-    a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
+def find_nearest_batch(coords: list[tuple[float, float]], k: int,
+                       radius: int = 500) -> list[Dict[str, list[tuple[str, int]]]]:
+    """find_nearest для всех объявлений страницы сразу: k-NN по SortedIndex.nearest_many с ранней
+    остановкой — пары до конца радиуса перебираются только для объявлений, которым не хватило названий."""
+    results = [{key: [] for key in POI_SORTED} for _ in coords]
+    if not coords or k < 1:
+        return results
 
-    return 2 * R * asin(sqrt(a))
+    lats, lons = np.array(coords, dtype=np.float64).reshape(-1, 2).T
+    names = POI_STORE.names
+    for key, index in POI_SORTED.items():
+        query, found, dist = index.nearest_many(lats, lons, k, radius, keys=POI_NAME_KEYS[key])
+        codes = POI_STORE.categories[key].name[found]
+        for ad, code, meters in zip(query.tolist(), codes.tolist(), dist.tolist()):
+            results[ad][key].append((names[code], round(meters)))
+    return results
 
 
-def find_nearby(lat: float, lon: float, radius: int = 500) -> Dict[str, Set[str]]:
+def find_nearby_linear(lat: float, lon: float, radius: int = 500) -> Dict[str, Set[str]]:
+    """Полный перебор всех POI — эталон для сравнения с индексом."""
     result = {k: set() for k in CITY_OBJECTS.keys()}
-    for key, poi_list in POI_DATA.items():
-        for poi in poi_list:
-            if distance(lat, lon, poi["lat"], poi["lon"]) <= radius:
-                result[key].add(poi["name"])
+    for key, columns in POI_STORE.categories.items():
+        for poi_lat, poi_lon, name in zip(columns.lat.tolist(), columns.lon.tolist(), columns.name.tolist()):
+            if distance(lat, lon, poi_lat, poi_lon) <= radius:
+                result[key].add(POI_STORE.names[name])
     return result
 
 
+def district_geojson_path(city: str) -> str:
+    return f"./geo/{city}.geojson"
+
+
 def load_district_geojson(city: str) -> list[tuple[str | None, BaseGeometry]]:
-    path = f"./geo/{city}.geojson"
+    path = district_geojson_path(city)
     with open(path, "r", encoding="utf-8") as file:
         data = json.load(file)
 
@@ -111,6 +141,81 @@ def get_district_by_point(lat: float, lon: float, districts: list[tuple[str | No
     return None
 
 
+class DistrictIndex:
+    """Районы одного города: полигоны загружаются один раз, подготавливаются и кладутся в STRtree."""
+
+    def __init__(self, city: str):
+        self.city = city
+        self.path = district_geojson_path(city)
+        self.mtime = os.path.getmtime(self.path)
+
+        districts = load_district_geojson(city)
+        self.names = [name for name, _ in districts]
+        self.polygons = [polygon for _, polygon in districts]
+        shapely.prepare(self.polygons)
+        self.tree = shapely.STRtree(self.polygons)
+
+    def is_stale(self) -> bool:
+        try:
+            return os.path.getmtime(self.path) != self.mtime
+        except OSError:
+            return False
+
+    def lookup(self, lat: float, lon: float) -> str | None:
+        return self.lookup_many([(lat, lon)])[0]
+
+    def lookup_many(self, coords: list[tuple[float, float]]) -> list[str | None]:
+        """Район для каждой точки (lat, lon) одним векторным запросом к дереву."""
+        result: list[str | None] = [None] * len(coords)
+        if not coords:
+            return result
+
+        lats, lons = np.array(coords, dtype=np.float64).T
+        points = shapely.points(lons, lats)
+        input_idx, tree_idx = self.tree.query(points, predicate="within")
+
+        # при пересечении полигонов берём первый по порядку в файле, как get_district_by_point
+        best: dict[int, int] = {}
+        for i, j in zip(input_idx.tolist(), tree_idx.tolist()):
+            if i not in best or j < best[i]:
+                best[i] = j
+
+        for i, j in best.items():
+            lat, lon = coords[i]
+            if lat != 0.0 and lon != 0.0:
+                result[i] = self.names[j]
+        return result
+
+
+DISTRICT_INDEXES: dict[str, DistrictIndex] = {}
+
+
+def get_district_index(city: str) -> DistrictIndex:
+    index = DISTRICT_INDEXES.get(city)
+    if index is None:
+        index = DISTRICT_INDEXES[city] = DistrictIndex(city)
+    return index
+
+
+def reload_districts(force: bool = False) -> list[str]:
+    """Перечитывает GeoJSON городов, файлы которых изменились в ./geo (или все при force)."""
+    reloaded = []
+    for city, index in list(DISTRICT_INDEXES.items()):
+        if force or index.is_stale():
+            DISTRICT_INDEXES[city] = DistrictIndex(city)
+            reloaded.append(city)
+            logger.info(f"District polygons reloaded for city {city}")
+    return reloaded
+
+
+def get_district(city: str, lat: float, lon: float) -> str | None:
+    return get_district_index(city).lookup(lat, lon)
+
+
+def get_districts(city: str, coords: list[tuple[float, float]]) -> list[str | None]:
+    return get_district_index(city).lookup_many(coords)
+
+
 if __name__ == "__main__":
     nearby = find_nearby(53.917755, 27.594841, 500)
     print(nearby["subway"])
@@ -1,20 +1,183 @@
+"""Логирование без файлового I/O в потоке event loop.
+
+Записи уходят через QueueHandler в очередь, а в файл их пишет QueueListener в своём
+потоке (LOG_QUEUE=0 — писать напрямую, как раньше). LOG_FORMAT=json включает
+JSON-строки с контекстом из log_context (city, ad_id, user_id, stage).
+Повторы предупреждений и ошибок из одного места кода ограничены: не больше
+LOG_REPEAT_BURST за LOG_REPEAT_WINDOW секунд, о пропущенных сообщает следующая запись.
+"""
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import multiprocessing
+import os
+import queue
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Optional
 
 
 LOG_DIR = Path('logs')
 LOG_DIR.mkdir(exist_ok=True)
 
-LOG_FILE = LOG_DIR / "app.log"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_QUEUE = os.getenv("LOG_QUEUE", "1") != "0"
+LOG_REPEAT_WINDOW = float(os.getenv("LOG_REPEAT_WINDOW", 60))
+LOG_REPEAT_BURST = int(os.getenv("LOG_REPEAT_BURST", 5))
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+# поля, которых нет в формате, не собираем: имя процесса и потока заметно удорожают каждую запись
+logging.logMultiprocessing = False
+logging.logProcesses = False
+logging.logThreads = False
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_log_context: ContextVar[dict] = ContextVar("log_context", default={})
+_listeners: list[QueueListener] = []
+
+
+@contextmanager
+def log_context(**fields):
+    """Поля контекста для всех записей внутри блока (и в созданных из него задачах)."""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def bind_log_context(**fields) -> None:
+    """Добавляет поля до конца текущего log_context, например одного элемента этапа конвейера."""
+    _log_context.set({**_log_context.get(), **fields})
+
+
+class ContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = _log_context.get()
+        return True
+
+
+class RepeatFilter(logging.Filter):
+    """Ограничивает поток одинаковых WARNING+ записей: ключ — место вызова, а не текст,
+    потому что в тексте обычно id пользователя или объявления."""
+
+    def __init__(self, window: float = LOG_REPEAT_WINDOW, burst: int = LOG_REPEAT_BURST):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.sites: dict[tuple[str, int], list] = {}  # место вызова -> [начало окна, записей, пропущено]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or self.burst <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        site = self.sites.get(key)
+        if site is None or now - site[0] >= self.window:
+            suppressed = site[2] if site else 0
+            self.sites[key] = [now, 1, 0]
+            if suppressed:
+                record.msg = f"{record.getMessage()} [{suppressed} similar messages suppressed]"
+                record.args = None
+            return True
+        site[1] += 1
+        if site[1] <= self.burst:
+            return True
+        site[2] += 1
+        return False
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, "context", {}),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class LogQueueHandler(QueueHandler):
+    """Готовит запись к передаче в другой поток: текст и traceback форматируются здесь,
+    а сама строка лога — уже в потоке QueueListener.
+
+    Запись не копируется (в отличие от QueueHandler): других обработчиков у корневого логгера нет.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def process_log_file(role: Optional[str] = None) -> Path:
+    """Файл лога текущего процесса. RotatingFileHandler не умеет ротировать один файл из нескольких
+    процессов, поэтому у каждого свой: app.log (роль all) или app.<роль>.log у основного процесса,
+    app[.<роль>].<имя процесса>.log у дочерних (процессы webhook, воркеры пула обогащения)."""
+    role = role or os.getenv("BOT_ROLE", "all")
+    name = "app" if role == "all" else f"app.{role}"
+    if multiprocessing.parent_process() is not None:
+        name = f"{name}.{multiprocessing.current_process().name}"
+    return LOG_DIR / f"{name}.log"
+
+
+def configure_logging(log_file: Optional[Path] = None, use_queue: bool = LOG_QUEUE,
+                      log_format: str = LOG_FORMAT) -> Optional[QueueListener]:
+    """Настраивает корневой логгер (по умолчанию в process_log_file()); возвращает QueueListener,
+    если записи идут через очередь. Очереди прежней настройки дописываются и останавливаются."""
+    file_handler = RotatingFileHandler(log_file or process_log_file(), maxBytes=1_000_000, backupCount=3,
+                                       encoding='UTF-8', delay=True)
+    file_handler.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+
+    listener = None
+    handler: logging.Handler = file_handler
+    if use_queue:
+        handler = LogQueueHandler(queue.SimpleQueue())
+        listener = QueueListener(handler.queue, file_handler)
+        listener.start()
+        _listeners.append(listener)
+    handler.addFilter(RepeatFilter())
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+        old.close()
+    root.addHandler(handler)
+    for old_listener in _listeners[:]:
+        if old_listener is not listener:
+            stop_log_listener(old_listener)
+    root.setLevel(logging.INFO)
+    return listener
+
+
+def stop_log_listener(listener: QueueListener) -> None:
+    """Дописывает всё из очереди в файл и останавливает поток записи."""
+    if listener in _listeners:
+        _listeners.remove(listener)
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+@atexit.register
+def _stop_log_listeners() -> None:
+    for listener in _listeners[:]:
+        stop_log_listener(listener)
+
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt='%Y-%m-%d %H:%M:%S',
-    handlers=[
-        RotatingFileHandler(LOG_FILE, maxBytes=1_000_000, backupCount=3, encoding='UTF-8'),
-    ]
-)
+log_listener = configure_logging()
 
 logger = logging.getLogger(__name__)
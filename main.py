@@ -1,47 +1,44 @@
 import asyncio
+import multiprocessing
+import os
+import signal
+import sys
 import signals
-from db import get_last_five_posts, get_active_users, init_db
-from tg import start_bot, message_to_new_user, send_message_to_all, send_post_with_images
-from api import start_parse
+from datetime import datetime, timedelta
+from db import close_db, get_last_five_posts, get_unsent_posts, init_db, enqueue_deliveries
+from tg import (start_bot, message_to_new_user, send_post_with_images, delivery, run_webhook_server,
+                TG_CRAWLER_RPS_SHARE, TG_GLOBAL_RPS, WEBHOOK_WORKERS)
+from outbox import run_outbox_worker, outbox_ready
+from api import start_parse, parse_stage, enrich_stage, persist_stage, enricher
 from messages import post_text
 from models import User, Post
-from logger import logger
+from logger import bind_log_context, configure_logging, logger
+from subscriptions import subscription_index
+from pipeline import Pipeline, Stage
+from metrics import QUEUE_DEPTH, add_collector, start_metrics_server, timed
 
-
-async def handle_new_post():
-    while True:
-        new_post = await signals.post_queue.get()
-        try:
-            asyncio.create_task(send_new_post_to_users(new_post.city, new_post))
-        except Exception as e:
-            logger.warning(f"Error is handler: {e}")
-
-
-async def handle_new_is_active_users():
-    while True:
-        new_user = await signals.user_queue.get()
-        asyncio.create_task(send_posts_for_new_user(new_user))
+# как часто краулер перечитывает подписки, когда пользователей обслуживают процессы webhook, сек
+SUBSCRIPTION_REFRESH = float(os.getenv("SUBSCRIPTION_REFRESH", 60))
+# за сколько часов при старте перепроверяются посты, не разложенные по outbox
+REMATCH_UNSENT_HOURS = float(os.getenv("REMATCH_UNSENT_HOURS", 24))
 
 
 async def send_new_post_to_users(city: str, post: Post) -> None:
-    active_users_qs = await get_active_users(city, post.city_district, post.rooms)
-    active_users = await active_users_qs
+    """Раскладывает пост по подходящим пользователям в outbox; саму отправку делает run_outbox_worker"""
+    if post.is_sent:
+        return
 
-    users_with_true_price_filters = [user for user in active_users if user.min_price <= post.price_byn <= user.max_price]
+    user_ids = subscription_index.match(post)
+    queued = await enqueue_deliveries(post.id, user_ids)
+    if queued:
+        outbox_ready.set()
 
-    images = await post.images.all()
-
-    if not post.is_sent:
-        if images:
-            for user in users_with_true_price_filters:
-                await send_post_with_images(user.id, images, post_text(post))
-        else:
-            await send_message_to_all(users_with_true_price_filters, post_text(post))
-        post.is_sent = True
-        await post.save()
+    post.is_sent = True
+    await post.save(update_fields=["is_sent"])
 
 
 async def send_posts_for_new_user(new_user: User) -> None:
+    bind_log_context(user_id=new_user.id)
     posts = await get_last_five_posts(new_user.city, new_user.min_price, new_user.max_price, 5, new_user.district, new_user.rooms_count)
     for post in posts:
         images = await post.images.all()
@@ -51,14 +48,188 @@ async def send_posts_for_new_user(new_user: User) -> None:
             await message_to_new_user(new_user.id, post_text(post))
 
 
+@timed("main.match_post")
+async def match_post(post: Post) -> None:
+    bind_log_context(city=post.city, ad_id=post.id)
+    await send_new_post_to_users(post.city, post)
+
+
+match_stage = Stage("match", match_post, workers=int(os.getenv("PIPELINE_MATCH_WORKERS", 4)),
+                    maxsize=int(os.getenv("PIPELINE_MATCH_QUEUE_SIZE", 200)))
+new_user_stage = Stage("new_users", send_posts_for_new_user, workers=int(os.getenv("NEW_USER_WORKERS", 4)),
+                       queue=signals.user_queue)
+
+# parse -> enrich -> persist -> match; дальше доставку ведут outbox и пул отправителей tg
+pipeline = Pipeline([parse_stage, enrich_stage, persist_stage, match_stage])
+
+
+async def rematch_unsent_posts() -> None:
+    """Посты с is_sent=False сохранены, но процесс упал до постановки в outbox: снова в match.
+    Повторная постановка безопасна — пара (пост, пользователь) в outbox уникальна."""
+    posts = await get_unsent_posts(datetime.now() - timedelta(hours=REMATCH_UNSENT_HOURS))
+    if posts:
+        logger.info(f"Rematching {len(posts)} unsent posts")
+    for post in posts:
+        await match_stage.put(post)
+
+
+def queue_depths() -> dict[str, int]:
+    depths = pipeline.depths()
+    depths[new_user_stage.name] = new_user_stage.depth
+    depths["deliver"] = delivery.depth
+    return depths
+
+
+def collect_queue_depths() -> None:
+    for name, depth in queue_depths().items():
+        QUEUE_DEPTH.set(depth, queue=name)
+
+
+add_collector(collect_queue_depths)
+
+
+async def monitor_queues(period: float = 60) -> None:
+    while True:
+        await asyncio.sleep(period)
+        depths = queue_depths()
+        if any(depths.values()):
+            logger.info(f"Queue depths: {depths}")
+
+
+async def refresh_subscriptions(period: float = SUBSCRIPTION_REFRESH) -> None:
+    """Настройки пользователей сохраняются в других процессах, и post_save сюда не доходит"""
+    while True:
+        await asyncio.sleep(period)
+        await subscription_index.rebuild()
+
+
+async def shutdown(tasks: list[asyncio.Task]) -> None:
+    """Останавливает опрос Kufar и дорабатывает то, что уже попало в очереди"""
+    parser, *workers = tasks
+    parser.cancel()
+    await asyncio.gather(parser, return_exceptions=True)
+
+    logger.info(f"Draining queues: {queue_depths()}")
+    await pipeline.drain()
+    await new_user_stage.drain()
+    enricher.shutdown()
+
+    # недоставленное остаётся в outbox и будет отправлено после рестарта
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    await delivery.close()
+
+
 async def run(interval):
+    """Всё в одном процессе: краулер, рассылка и обработка обновлений (polling или webhook по BOT_MODE)"""
     await init_db()
+    await subscription_index.rebuild()
+    metrics_server = await start_metrics_server()
+
+    pipeline.start()
+    new_user_stage.start()
+    tasks = [
+        asyncio.create_task(start_parse(interval)),
+        asyncio.create_task(rematch_unsent_posts()),
+        asyncio.create_task(run_outbox_worker()),
+        asyncio.create_task(monitor_queues()),
+    ]
+
+    try:
+        await start_bot()
+    finally:
+        await shutdown(tasks)
+        if metrics_server:
+            await metrics_server.cleanup()
+        await close_db()
+
+
+async def run_crawler(interval):
+    """Только опрос Kufar и рассылка; обновления от Telegram принимают процессы с ролью webhook"""
+    # вместе с процессами webhook отправка не должна превышать общий лимит Bot API
+    delivery.limiter.set_global_rate(TG_GLOBAL_RPS * TG_CRAWLER_RPS_SHARE)
+    await init_db()
+    await subscription_index.rebuild()
+    metrics_server = await start_metrics_server()
+
+    pipeline.start()
+    tasks = [
+        asyncio.create_task(start_parse(interval)),
+        asyncio.create_task(rematch_unsent_posts()),
+        asyncio.create_task(run_outbox_worker()),
+        asyncio.create_task(monitor_queues()),
+        asyncio.create_task(refresh_subscriptions()),
+    ]
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await shutdown(tasks)
+        if metrics_server:
+            await metrics_server.cleanup()
+        await close_db()
+
+
+async def run_webhook_worker(register: bool, reuse_port: bool, workers: int = 1) -> None:
+    """Обработка обновлений: настройки пользователей и последние посты для только что активированных"""
+    # SIGTERM (docker stop или главный процесс) — штатная остановка с дообработкой очередей
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    # у каждого процесса свой лимитер: часть общего лимита Bot API, оставшаяся от краулера, делится между ними
+    delivery.limiter.set_global_rate(TG_GLOBAL_RPS * (1 - TG_CRAWLER_RPS_SHARE) / workers)
+    await init_db()
+    new_user_stage.start()
+    try:
+        await run_webhook_server(register=register, reuse_port=reuse_port)
+    finally:
+        await new_user_stage.drain()
+        await delivery.close()
+        await close_db()
+
+
+def webhook_process(register: bool, reuse_port: bool = True, workers: int = 1) -> None:
+    try:
+        asyncio.run(run_webhook_worker(register, reuse_port, workers))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+def serve_webhook(workers: int = WEBHOOK_WORKERS) -> None:
+    """Несколько процессов на одном порту (SO_REUSEPORT); setWebhook делает только первый"""
+    if workers <= 1:
+        webhook_process(register=True, reuse_port=False)
+        return
+    # дочерние процессы заново импортируют tg и по WEBHOOK_WORKERS выбирают FSM в базе
+    os.environ["WEBHOOK_WORKERS"] = str(workers)
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=webhook_process, args=(i == 0, True, workers), name=f"webhook-{i}")
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+
+    def stop(signum, frame) -> None:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
 
-    asyncio.create_task(start_parse(interval))
-    asyncio.create_task(handle_new_post())
-    asyncio.create_task(handle_new_is_active_users())
-
-    await start_bot()
 
 if __name__ == "__main__":
-    asyncio.run(run(interval=10 * 60))
+    # all — всё в одном процессе; crawler и webhook — раздельный запуск, см. README
+    role = sys.argv[1] if len(sys.argv) > 1 else os.getenv("BOT_ROLE", "all")
+    # роль из аргумента: для имени файла лога этого процесса и дочерних, которые наследуют окружение
+    os.environ["BOT_ROLE"] = role
+    configure_logging()
+    if role == "webhook":
+        serve_webhook()
+    elif role == "crawler":
+        asyncio.run(run_crawler(interval=10 * 60))
+    else:
+        asyncio.run(run(interval=10 * 60))
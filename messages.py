@@ -140,29 +140,30 @@ def parameters_text(post):
 
 
 
+NEARBY_LINES = (
+    ("subway", "nearby_subway", "Ⓜ️ *Метро:*"),
+    ("pharmacy", "nearby_pharmacy", "💊 *Аптеки:*"),
+    ("kindergarten", "nearby_kindergarten", "🧸 *Детские учреждения:*"),
+    ("school", "nearby_school", "🏫 *Школы:*"),
+    ("bank", "nearby_bank", "🏦 *Банки:*"),
+    ("convenience", "nearby_shop", "🛒 *Магазины:*"),
+)
+
+
 def add_nearby_text(post):
     header = "🌀 *В радиусе 500 метров:*\n"
-    subway = f"Ⓜ️ *Метро:* {post.nearby_subway}" if post.nearby_subway else ""
-    pharmacy = f"💊 *Аптеки:* {post.nearby_pharmacy}" if post.nearby_pharmacy else ""
-    kindergarten = f"🧸 *Детские учреждения:* {post.nearby_kindergarten}" if post.nearby_kindergarten else ""
-    school = f"🏫 *Школы:* {post.nearby_school}" if post.nearby_school else ""
-    bank = f"🏦 *Банки:* {post.nearby_bank}" if post.nearby_bank else ""
-    shop = f"🛒 *Магазины:* {post.nearby_shop}" if post.nearby_shop else ""
-
+    nearby = post.nearby or {}
     text = []
 
-    if subway:
-        text.append(subway)
-    if pharmacy:
-        text.append(pharmacy)
-    if kindergarten:
-        text.append(kindergarten)
-    if school:
-        text.append(school)
-    if bank:
-        text.append(bank)
-    if shop:
-        text.append(shop)
+    for category, field, title in NEARBY_LINES:
+        if category in nearby:
+            # ближайшие сначала, с расстоянием: "Пушкинская (230 м)"
+            objects = ', '.join(f"{name} ({dist} м)" for name, dist in nearby[category])
+        else:
+            # посты, сохранённые до появления поля nearby
+            objects = getattr(post, field)
+        if objects:
+            text.append(f"{title} {objects}")
 
     if text:
         return header + "\n".join(text)
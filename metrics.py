@@ -0,0 +1,244 @@
+"""Метрики процесса в текстовом формате Prometheus: счётчики, gauge и гистограммы задержек.
+
+Эндпоинт /metrics поднимается на METRICS_HOST:METRICS_PORT (порт 0 — выключен).
+Декоратор timed пишет длительность sync и async функций в function_duration_seconds;
+METRICS_TIMING=0 отключает его на этапе импорта, обёртки тогда не создаются вовсе.
+"""
+import asyncio
+import functools
+import os
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Optional
+
+from aiohttp import web
+
+from logger import logger
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+TIMING_ENABLED = os.getenv("METRICS_TIMING", "1") != "0"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# секунды: от быстрых вызовов в памяти до медленных запросов к Kufar и Bot API
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = labels
+        self.children: dict[tuple[str, ...], object] = {}
+        if not labels:
+            self.labels()  # серия без меток видна с нулём сразу, а не после первого события
+        REGISTRY[name] = self
+
+    def labels(self, **labels):
+        """Серия с конкретными значениями меток; её стоит держать у себя, а не искать на каждый вызов."""
+        key = tuple(str(labels[name]) for name in self.label_names)
+        child = self.children.get(key)
+        if child is None:
+            child = self.children[key] = self._new_child()
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        ...
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        ...
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.description}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self) -> Value:
+        return Value()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        self.labels(**labels).inc(amount)
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{format_labels(self.label_names, key)} {format_value(child.value)}"
+                for key, child in self.children.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        self.labels(**labels).set(value)
+
+
+class HistogramSeries:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # по корзинам, последняя — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, description, labels)
+
+    def _new_child(self) -> HistogramSeries:
+        return HistogramSeries(self.buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        self.labels(**labels).observe(value)
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, child in self.children.items():
+            total = 0
+            for bound, count in zip((*self.buckets, "+Inf"), child.counts):
+                total += count
+                le = 'le="' + (bound if isinstance(bound, str) else format_value(bound)) + '"'
+                lines.append(f"{self.name}_bucket{format_labels(self.label_names, key, le)} {total}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, key)} {format_value(child.sum)}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, key)} {child.count}")
+        return lines
+
+
+REGISTRY: dict[str, Metric] = {}
+# вызываются перед каждой отдачей /metrics, чтобы обновить gauge, которые дешевле снять, чем вести
+COLLECTORS: list[Callable[[], None]] = []
+
+FUNCTION_SECONDS = Histogram("function_duration_seconds", "Duration of instrumented functions", ("function",))
+FUNCTION_ERRORS = Counter("function_errors_total", "Exceptions raised by instrumented functions", ("function",))
+TELEGRAM_REQUEST_SECONDS = Histogram("telegram_request_seconds", "Duration of Bot API requests", ("method",))
+TELEGRAM_ERRORS = Counter("telegram_errors_total", "Failed Bot API requests", ("method", "error"))
+FLOOD_WAITS = Counter("telegram_flood_waits_total", "FloodWait (429) answers from Bot API")
+FLOOD_WAIT_SECONDS = Counter("telegram_flood_wait_seconds_total", "Total retry_after from FloodWait answers")
+KUFAR_ADS_SAVED = Counter("kufar_ads_saved_total", "New ads saved to the database", ("city",))
+QUEUE_DEPTH = Gauge("queue_depth", "Items waiting in a pipeline or delivery queue", ("queue",))
+CRAWL_CYCLES = Counter("crawl_cycles_total", "Kufar polls of a city", ("city",))
+CRAWL_FAILURES = Counter("crawl_failures_total", "Failed or timed out Kufar polls of a city", ("city",))
+CRAWL_LAST_CYCLE_SECONDS = Gauge("crawl_last_cycle_seconds", "Duration of the last Kufar poll of a city", ("city",))
+CRAWL_INTERVAL_SECONDS = Gauge("crawl_interval_seconds", "Current poll interval of a city", ("city",))
+CRAWL_NEW_POSTS_RATE = Gauge("crawl_new_posts_per_hour", "Smoothed rate of new ads of a city", ("city",))
+CRAWL_LAST_NEW_POSTS = Gauge("crawl_last_new_posts", "New ads found by the last poll of a city", ("city",))
+CRAWL_LAST_SUCCESS = Gauge("crawl_last_success_timestamp", "Unix time of the last successful poll of a city",
+                           ("city",))
+
+
+def add_collector(collector: Callable[[], None]) -> None:
+    COLLECTORS.append(collector)
+
+
+def render() -> str:
+    for collector in COLLECTORS:
+        try:
+            collector()
+        except Exception as e:
+            logger.exception(f"Metrics collector failed: {e}")
+    return "".join(metric.render() for metric in REGISTRY.values())
+
+
+def timed(name: str):
+    """Длительность вызова (и число исключений) в function_duration_seconds{function=name}."""
+
+    def decorator(func):
+        if not TIMING_ENABLED:
+            return func
+        series = FUNCTION_SECONDS.labels(function=name)
+        errors = FUNCTION_ERRORS.labels(function=name)
+        perf_counter = time.perf_counter
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    errors.inc()
+                    raise
+                finally:
+                    series.observe(perf_counter() - started)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                series.observe(perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(body=render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+
+async def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT) -> Optional[web.AppRunner]:
+    if not port:
+        return None
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Metrics endpoint: http://{host}:{port}/metrics")
+    return runner
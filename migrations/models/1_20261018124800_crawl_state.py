@@ -0,0 +1,50 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "crawl_state" (
+    "city" VARCHAR(50) NOT NULL PRIMARY KEY,
+    "last_list_time" TIMESTAMPTZ,
+    "last_ad_id" VARCHAR(500)
+);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "crawl_state";"""
+
+
+MODELS_STATE = (
+    "eJztnP1v2jgYx/8VxE+t1Otart2m0+kkoPTGrYWK0rtp02Q5iYGoiZ3Zzlo08b+fbRLy5q"
+    "SECxRu+aWCx/4G+5PHfvzaH02XWMhhp10Kn5x7Djlq/tb40cTQlR80qSeNJvS8KE0aODQc"
+    "ld2U+QBbZTQYp9DkImkCHYaEyULMpLbHbYKFFfuOI43EFBltPI1MPra/+QhwMkV8hqhI+P"
+    "JVmG1soWfEwq/eI5jYyLESZTZtPpe/rlIAn3vK2p1Beq3yyh80gEkc38Xx/N6czwheCUSJ"
+    "pHWKMKKiPlasErKMQZVD07K8wsCpj1YFtSKDhSbQd3is0muSMAmWFG3MmaqmC5+Bg/CUz8"
+    "TXy7PFsjpRZZe5ZA3+bo+6H9qjo8uzY1kTIl7F8jUNgpSWSlqoR0AOlw9RcCOaDmQcOLb4"
+    "w20XZbleCTYyRc82q05RtgL5afhhDeYB0RXyMEvEPPK2aqAXQB73b3v34/btnSy4y9g3R1"
+    "Fpj3sypaWs85T16G3qhawe0vinP/7QkF8bn4eDngJGGJ9S9YtRvvHnpiwT9DkBmDwBaMWr"
+    "HZpDk8iaeqHQArZVppEkVRs1ld2/tnRbWa+xFLUW1VxkzzN5jLUWaTCg+fgEqQUyKaRF8v"
+    "Jmk9yWm7ZADKcKj6ykrEHQKfddYdf11suEwo7allnY6/XROufrY673Pa3PiXec9rnAwV61"
+    "d1Zv5JfW+cW7i/e/vr14L7Kokqws7wp8sD8Yv9Abq/cGGDWz+MboOY9fXFRNlHvdLrf3aZ"
+    "zobcMWenTb/nSc6HFvhoM/w+yxFt29GXYU6Vi3SKCFxC+RMmQTot2Rbb6x3WnzcNhOKHGB"
+    "jGMlg05adyi+u6u4oyGcxXtNKLKn+COaK8h9UVKITd1YLAgfd8Fj9o/rInSQ0Bp14GLisQ"
+    "ozGb8RdRQ1Q3zpbu37bvuq11y8TtRWdDVBO6SeH7NlhfYsZOc33Sob7K6nVBU116I47lHb"
+    "RMCYY017FUElJ9wkVCm2Eynb0ij87PRsK8HmavjQuek17ka9bv++PxwkJ0sqUZqEwV623V"
+    "GvfZOKLUsmPtN454skA1VNUpnEHFJMM1mZ8U9MciixeddjHzYjlIN4YUvw1Ypr0nrSKuD7"
+    "1CkDOK6pueq5WsFqbpl1v1BTwWrfZjOk3yc+NiXZxoBgdIrJ0x9bmjAd2vqffnk8v4lUuz"
+    "z+/2seNgMMYc3Eq0OIgyDOGR9HqhRYQ8i2RbbsdGF9tJ3h8CaBttNPs3u47fRGR+fHyYFI"
+    "uOYVX6DWzWLzx3JB/h2O4rbmoFUM4xzdEKMIn3ZU8dPik90dsGxZCFPjh8X9ZEJ4IJsku+"
+    "4vMYLUmAPmG0+wVCDKCHcGuHlAa60BJW8GqQvNTQDHpTXifMSPsj50CilHpSZ1OfIadUFn"
+    "Yc6CUVHZzmIlrPHm4zUgftwAbiir0RZ47ox4m/htIKvRatBSQtxSy5QrQY1T56m+ayAKyA"
+    "SIQT+hpcjqtDVkDWToiUDvihn/ElSpRfastEasQcwJhw6AFMEydJOqGqwGrAEdUYJSU4mY"
+    "pEaq26ugyINzV7tuWLBbkVDVYAOwJc5jpk7SaWJdJ9BdfxwhB+bsuaUPWu7tKnjmqMxim2"
+    "dbHpg6UpI526LsJ0VnW3yRY8/OthScpzygsy276dgKDqwyYJANNkcCUb03kjpJaVPGgfpW"
+    "wmGTqnojL3cjTwRY1/bd8u4aE9Yum8Tq2hio41ZZqgW7UgnVhntT++WzVWxOyYOKG7CMq2"
+    "qW9TmI7RwT2mDP9D9vl/4EXEV0EeNh+7umzb8UlSJdHZQ0S8gClq+bgOdeREupXr6RVhXT"
+    "y815VnEjbU8uPLaR6CtmTc0EM0g5KZpiwijP3swx6yuPL195/I4o0x6bzr98EpMcSlRJ3k"
+    "FpXV6ucQdF5Mq9g6LS0lsQmp3IfIhB9sMEeL7WJZ7zgks85+ElntiIkWCuXbH96344yBk0"
+    "RpIUyAcsKvjFEoOfk4b8Bwlf9xNrAUVZ6+LRTnpgc5I8zSwfUHL9tvrwsvgX+QkGsA=="
+)
@@ -0,0 +1,64 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "posts" ADD "rooms_num" INT;
+ALTER TABLE "posts" ADD "total_area_num" DOUBLE PRECISION;
+ALTER TABLE "posts" ADD "apartment_floor_num" INT;
+ALTER TABLE "posts" ADD "number_of_floors_num" INT;
+UPDATE "posts" SET "rooms_num" = CAST(substring("rooms" from '^[0-9]+') AS INT) WHERE "rooms" ~ '^[0-9]+';
+UPDATE "posts" SET "total_area_num" = CAST(substring(replace("total_area", ',', '.') from '^[0-9]+(?:[.][0-9]+)?') AS DOUBLE PRECISION) WHERE "total_area" ~ '^[0-9]+';
+UPDATE "posts" SET "apartment_floor_num" = CAST(substring("apartment_floor" from '^[0-9]+') AS INT) WHERE "apartment_floor" ~ '^[0-9]+';
+UPDATE "posts" SET "number_of_floors_num" = CAST(substring("number_of_floors" from '^[0-9]+') AS INT) WHERE "number_of_floors" ~ '^[0-9]+';
+CREATE INDEX IF NOT EXISTS "idx_posts_city_fb5eb0" ON "posts" ("city", "city_district", "price_byn", "date");
+CREATE INDEX IF NOT EXISTS "idx_posts_city_453dd1" ON "posts" ("city", "date");
+CREATE INDEX IF NOT EXISTS "idx_users_city_36f2cd" ON "users" ("city", "is_active", "district", "rooms_count");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_users_city_36f2cd";
+DROP INDEX IF EXISTS "idx_posts_city_453dd1";
+DROP INDEX IF EXISTS "idx_posts_city_fb5eb0";
+ALTER TABLE "posts" DROP COLUMN "number_of_floors_num";
+ALTER TABLE "posts" DROP COLUMN "apartment_floor_num";
+ALTER TABLE "posts" DROP COLUMN "total_area_num";
+ALTER TABLE "posts" DROP COLUMN "rooms_num";"""
+
+
+MODELS_STATE = (
+    "eJztnP9v2jgUwP8VlJ9aqde1XLtNp9NJQOmNWwsVpXfTqslyEgNRE5s5zlo08b+f7STkm5"
+    "NiDmi55pcVnv2C/fGX957zvJ+GR2zk+scdCh/dWwYZMn5r/DQw9MQHRelRw4CzWVImBAya"
+    "rqxuiXrAX1Y0fUahxXjRGLo+4iIb+RZ1ZswhmEtx4LpCSCxe0cGTRBRg53uAACMTxKaI8o"
+    "L7b1zsYBs9IT/+OnsAYwe5dqbNlsPm4tdlCWDzmZR2ppBeyrriB01gETfwcLr+bM6mBC8V"
+    "eIuEdIIworw/dqoToo1Rl2NR2F4uYDRAy4baicBGYxi4LNXpFUlYBAuKDma+7KYHn4CL8I"
+    "RN+dfzk0XYnaSzYS3Rg79bw86n1vDg/ORQ9ITwoQiHqR+VNGXRQj4CMhg+RMJNaLrQZ8B1"
+    "+D/M8VCR6wVnI0rUbIvaOcp2pH4cf1iBeUR0iTyukjBPZttmoFdAHvWuu7ej1vWNaLjn+9"
+    "9dSaU16oqSppTOc9KD97kBWT6k8U9v9Kkhvja+DvpdCYz4bELlLyb1Rl8N0SYYMAIweQTQ"
+    "Tnc7FsciXjU3oNAGjq2zSLJaay2V3Q9bfq2stliqVotcLmLnGT+kVosQmNB6eITUBoUS0i"
+    "RldYtFXtPLSyCGE4lHdFL0INqUex6Xq3brsKByo3ZEFf/l9mjV5Othpp57yjnHxzg/56IJ"
+    "9qK7sxyRX5qnZx/OPv76/uwjryJbspR8qJiDvf7omd1YjhvwqVXEN0JPZfzSSpuxci+75X"
+    "a/jDK7bbxCD65bXw4zO+7VoP9nXD21ojtXg7YkndoWCbQR/yWiQzajtDuyxjvHmxj7w3ZM"
+    "iQeEHdM0Onm9fZm7u7I7CsJFvJeEImeCP6O5hNzjLYXYUvlikfm4iR7z+rgu4gkSS5MNnA"
+    "ceSzNTmDe8j7xniIXTrXXbaV10jcXLWG1JV2G0Y+rlNlt0aPsm+34ZD4m/wHbEIyzZtBn/"
+    "gIA5x0ZoopDBdZP6oUTL5Jcv/U0u+F2HZBta7lV+QGYocuudG6USc5XRyrEdC7UtefEnxy"
+    "dbMVYXg7v2VbdxM+x2ere9QT8bbMlCIeICJ1z7w27rKmebQiaBr5idz5KMtGqSUsRjUB6m"
+    "+jr+U0plX2z7rn0nf0ooA+nGavBVKtek1aSlwxBQVwdwWqfmquZqR6fBOueGsc4GTgvXi7"
+    "B+HwfYEmQbfYLRMSaPf2wp4Nq380P18Xr5Etns8fr/b3k4PvARVgRubUJcBHGJf5xo5cCa"
+    "XG1bZHXDjdXRtgeDqwzadi/P7u663R0enB5mHZH4zCx9wK2Kgst9uaj+Dr24rU3QTbhxrs"
+    "rFqMKn9CreLL5C1KyzT2bD7f14ybLr/RIjSM058APzEWoZooLizgAbe3RWG1GaTSH1oLUO"
+    "4LRqjbgc8YPoD51AypBWUFeiXqOu2CysaeQV6W4WS8UabzleE+KHNeDGajXaipk7JbN15m"
+    "2kVqNVoKWEeFrHlEuFGqdqpgaeiSggY8CdfkK1yKp0a8gKyHDGDb3HI/4QlNYhe1G1RqxA"
+    "zAiDLoAUQR26Wa0arAKsCV3eAq1QIqVSI1W9q6BoBuee8tyw4m1FRqsGW+YbAG6WilxL8x"
+    "MzOs+nKb6KU5vNJCqqNk81vIoDxKJqfZaoNPqa07JE+41O0LynqQmzTP0N0dRIe88lLCtC"
+    "gnakd/l5iFxYkpqQz2d/tS8LCxmJi22mEN75MnOvkEIo5UdVKYQBr7HLFELHB/xHnB9y9N"
+    "LvNkKTaZGAE9NLGaxIc9+jlMHduDUV9wh8YJI13jlHSvUr51yCu0N9BuQ3jQmb1arzI0rz"
+    "I3jc4jkqc/3cdE0p1lM2i9VzMJBZrFq+ekZrTTf9dc3ZTfjpIv97DZZprZplnV62nezLNV"
+    "JR/nMWyhvgmnFt9axSolcbJdXpWxgWFLA+c/621ForJF+L6fn6PHcckG8zHG0hvldMDUVA"
+    "GpUcVYWkMKlT30Tf4H647ZvoPxD1lbdRyu/0pVT2xapkr/Y1z89XuNrHa5Ve7ZNl+UNeRY"
+    "JHOcSo+n4CPF3pbuRpxd3I0/huZMpjJJgpX4T9dTvolziNiUoO5B3mHby3ufNz1BD/b823"
+    "14m1gqLodbW3k3dsjrKXRMQD2i9tXhb/AgHI0zI="
+)
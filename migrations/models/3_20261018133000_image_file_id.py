@@ -0,0 +1,48 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "images" ADD "file_id" TEXT;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "images" DROP COLUMN "file_id";"""
+
+
+MODELS_STATE = (
+    "eJztnP9v2jgUwP8VlJ9aqde1XLtNp9NJQOmNWwsVpXfTqslyEgNRE5s5zlo08b+f7STkm5"
+    "NiDmi55pcVnv2C/Ynt9579vJ+GR2zk+scdCh/dWwYZMn5r/DQw9MQHRelRw4CzWVImBAya"
+    "rqxuiXrAX1Y0fUahxXjRGLo+4iIb+RZ1ZswhmEtx4LpCSCxe0cGTRBRg53uAACMTxKaI8o"
+    "L7b1zsYBs9IT/+OnsAYwe5dqbNlsPm4tdlCWDzmZR2ppBeyrriB01gETfwcLr+bM6mBC8V"
+    "eIuEdIIworw/dqoToo1Rl2NR2F4uYDRAy4baicBGYxi4LNXpFUlYBAuKDma+7KYHn4CL8I"
+    "RN+dfzk0XYnaSzYS3Rg79bw86n1vDg/ORQ9ITwVxG+pn5U0pRFC/kIyGD4EAk3oelCnwHX"
+    "4f8wx0NFrhecjShRsy1q5yjbkfpx/GEF5hHRJfK4SsI8GW2bgV4BedS77t6OWtc3ouGe73"
+    "93JZXWqCtKmlI6z0kP3udeyPIhjX96o08N8bXxddDvSmDEZxMqfzGpN/pqiDbBgBGAySOA"
+    "drrbsTgW8aq5Fwpt4Ng6kySrtdZU2f1ry8+V1SZL1WyR00WsPOOH1GwRAhNaD4+Q2qBQQp"
+    "qkrG6xyGt6eQnEcCLxiE6KHkSLcs/jctVqHRZULtSOqOK/3BqtGnw9zNRjTznm+DvOj7lo"
+    "gL3o6izfyC/N07MPZx9/fX/2kVeRLVlKPlSMwV5/9MxqLN8b8KlVxDdCT2X80kqbsXIvu+"
+    "R2v4wyq208Qw+uW18OMyvu1aD/Z1w9NaM7V4O2JJ1aFgm0Ef8lokM2o7Q7ssY7x5sY+8N2"
+    "7LhIaW/KyaZU9sTY7BwqJR4QzoGmJc/r7cuCsCtjriBcxHtJKHIm+DOaS8g93lKILZWDG9"
+    "nkm+gxr4/rIh4gsTSZPTyaW9ruwrjhfeQ9Qywcbq3bTuuiayxexhWSdBWeUEy93BESHdq+"
+    "H3S/DDLFX2A74hGWbNqMf0DAnGMjtPvI4LpJ/VCi5UeVT/1NTvhdx7kbmu5VzlXmVeTmO7"
+    "f0JZYqo5VjOxZqW7JWJ8cnWzFWF4O79lW3cTPsdnq3vUE/G8HKQiHiAiec+8Nu6ypnm0Im"
+    "ga8Ync+SjLRqklLEA3se+/s6rlNKZV9s+659J39KKAPpxmrwVSrXpNWkpcMQUFcHcFqn5q"
+    "rmakdb7DqbsbHOBrZg1wtbfx8H2BJkG32C0TEmj39sKYrdt01Z9ZlF+RTZ7JnF/296OD7w"
+    "EVYEbm1CXARxiX+caOXAmlxtW2R1w43V0bYHg6sM2nYvz+7uut0dHpweZh2ReCMyfWqgio"
+    "LLfbmo/g69uK0N0E24ca7KxajCp/Qq3iy+QtSss05mw+16M1G1XmIEqTkHfmA+Qi1DVFDc"
+    "GWBjjzbAI0qzKaQetNYBnFatEZcjfhD9oRNIGdIK6krUa9QVi4U1jbwi3cViqVjjLcdrQv"
+    "ywBtxYrUZbMXKnZLbOuI3UarQKtJQQT2ubcqlQ41SN1MAzEQVkDLjTT6gWWZVuDVkBGc64"
+    "ofd4xB+C0tpkL6rWiBWIGWHQBZAiqEM3q1WDVYA1octboBVKpFRqpKqzCopmcO4p9w0rTi"
+    "syWjXYMt8AcLNU5Fqa9JnReT7381Xs2mwm+1O1eKrhVWwgFlXrvUSl0dccliXab3SA5j1N"
+    "TZhl6m+IpsZdglwWuCIkaEd6l5+HyIUlqQn5SwKv9rCwkJG42GYK4Z0vM/cKKYRSflSVQh"
+    "jwGrtMIXR8wH/E+SHfXvpsIzSZFgk4Mb2UwYq7A3uUMrgbt6bicoYPTLLGmXOkVB85528N"
+    "UJ8B+U1jwGa16vyI0vwIHrd4jspcPzdcU4r1kM1i9RwMZBarlq+e0VrTTX9dY3YTfrrI/1"
+    "6DZVqrZlmnl20n+3KNVJT/nIXyBrhmXFs9q5To1UZJtfsWhgUFrM/svy211grJ12J6vj7P"
+    "HQfk2wxHW4ivFVNDEZBGJUdVISlM6tTX+ze4Hm77ev8PRH3lbZTyO30plX2xKtmrfc3z8x"
+    "Wu9vFapVf7ZFl+k1eR4FEOMaq+nwBPV7obeVpxN/I0vhuZ8hgJZsqDsL9uB/0SpzFRyYG8"
+    "w7yD9zZ3fo4a4j8D+vY6sVZQFL2u9nbyjs1R9pKIeED7pc3L4l/71j8g"
+)
@@ -0,0 +1,61 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "outbox" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "user_id" VARCHAR(64) NOT NULL,
+    "status" VARCHAR(16) NOT NULL DEFAULT 'pending',
+    "attempts" INT NOT NULL DEFAULT 0,
+    "next_attempt_at" TIMESTAMPTZ NOT NULL,
+    "post_id" VARCHAR(500) NOT NULL REFERENCES "posts" ("id") ON DELETE CASCADE,
+    CONSTRAINT "uid_outbox_post_id_5410ba" UNIQUE ("post_id", "user_id")
+);
+CREATE INDEX IF NOT EXISTS "idx_outbox_status_a060ae" ON "outbox" ("status", "next_attempt_at");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "outbox";"""
+
+
+MODELS_STATE = (
+    "eJztnO9P2zgYx/+VKq+YxHGUAzadTie1UG69QYug3E1Dk+UmbhuR2J3jDKqJ//1sJ2l+Oa"
+    "HJ0pYefgOt7SexP3n8+GvH7g/DJRZyvIMzCh+dWwYZMn5v/TAwdMUHRe5+y4DzeZwnEhgc"
+    "O7K4KcoBb1lw7DEKTcazJtDxEE+ykGdSe85sgnkq9h1HJBKTF7TxNE7ysf3NR4CRKWIzRH"
+    "nG/VeebGMLPSEv+jp/ABMbOVaqzqbNFuLuMgewxVymns0gvZBlxQ3HwCSO7+Jk+fmCzQhe"
+    "GvAaidQpwojy9liJRog6hk2OkoL68gRGfbSsqBUnWGgCfYclGr0iCZNgQdHGzJPNdOETcB"
+    "Ceshn/enL4HDQnbmxQSrTgn87N2cfOzd7J4TvREsIfRfCYBmHOkcx6lpeADAYXkXBjmg70"
+    "GHBs/ofZLspzPedsRI6abd46Q9kKzQ+iDyswD4kukUdFYuaxtzUDvQTyqH/Vux11rq5FxV"
+    "3P++ZIKp1RT+QcydRFJnXvNPNAlhdp/dsffWyJr60vw0FPAiMem1J5x7jc6Ish6gR9RgAm"
+    "jwBayWZHyVESL5p5oNACtlWlk6StanWVzT+2bF9ZrbOU9RbZXUTkmTwkeotIGEPz4RFSC+"
+    "RyyBEpKpvPco/cbArEcCrxiEaKFoRBue/ydFW0DjJKA7Utinjbi9Eq5+tjpvY9pc/xZ5z1"
+    "udDBthqd5RP55ah9/P74w2+nxx94EVmTZcr7Eh/sD0YvRGP53IBHzTy+EXoq4pc0amaU22"
+    "7I7X0epaJt1EP3rjqf36Ui7uVw8FdUPNGjzy6HXUk6ERYJtBC/E6lCNmW0ObLGr7Y7NXaH"
+    "7cR2kHK8KSabMNmRwWbjUClxgRAHFUfyrN2uBIRNDeYKwnm8F4Qie4o/oYWE3Oc1hdhUCd"
+    "xwTL4OL/P6uD5HDhKlxr2Hz+aWY3fOb3gbecsQC9ytc3vWOe8Zz9uRQkOfjclTnyFXpYcS"
+    "uaWiiMhyzYuieyNyIt9DVOD7mtFJ94aYM/uyOpjHRAAZr+1c/A/KahHVoIiKnkKFoJkw2c"
+    "14eXq8Qrg8PS6MliIrPf7EHrsqxNhig1JpjrAlMDUFsn26Ash2doIfgxRZaZBhX1egLOzM"
+    "SZOXu3RTLA+33aVjZtkgmUNXviylMG9gXaqeg/4x8bEpeLYGBKMDTB7/XJO037WVqhriVu"
+    "vaFXStlrShpH2lalaCVejYCHixghUNWv+q3v3ylYn4DyxbXMIMoij/gMB4gY1AgCGD28bl"
+    "g5RKgra4rzfZzTf91qahTl6mclOPItPVHQILlEXKKsN2IszWtPZyePAT6qIE5vnwrnvZa1"
+    "3f9M76t/3hID3KyUyRxBPsoO/f9DqXGbERMPE9hXe+SDK00iQDqWtZXB8olG7xQmDCZFdG"
+    "9E2vBHozQhlIVrYCX6WxJq0mLQWDT50qgJM2mquaqxVuGKkyh4ts9MRt/7VN3NQ7cIq7SL"
+    "M7cP5/3cP2gIewYs7WJcRBEBfo49gqA3bMzdZFtup0Y3W03eHwMoW228+yu7vq9m722u/S"
+    "QiS/fOSoloxKtJyjXCNap4pbm4M2IeMclcQow6dUFW8WX27WXCVOpqfb+tW4Kl5iBOl4AT"
+    "x//AgrDUQ5w40BNtYkHdaIdz6D1IVmHcBJU424GPGDaA+dQspQpUldgblGXRIszFmoiqoG"
+    "i6WhxluMdwzxQw24kZlGW+K5MzKv47ehmUarQEsJcSstUy4NNE6Vp/ruGFFAJoCLfkIrkV"
+    "XZasgKyHDOB3qXz/gDUJUW2fOmGrECMSMMOgBSBKvQTVtpsAqwY+jwGlSaSiRMNFLVuwqK"
+    "5nDhKtcNS95WpKw02CJtAPiwlOdauGEvZVNrx94WTs81vGcvDoNqeCULiHlTvZaoHPQrum"
+    "WB9Rt10KzSrAizyPwN0axwMjZzplExJeiGdhefbpADC7YmZI+8vtqXhbnNiCnXi4+e1GeQ"
+    "PuayQyDWuZfyzpNbGHN7KWX6ftleSnHkY5N7KW0P8JvY36UbJ1/yBNrBJD6uehio5EjwDu"
+    "2d3Iy+Kzlz7YExqfHyPTTS796zh4Gpx4D8VsFh01Z6o0jhRhE+gXNtlW55yV0Thtpl01hd"
+    "GwO5nbfSpCVlVXO+8rp8tokJi9gIX4Nl0kqz1Pvs1rMNtcaenJ/ejvMGuKakbbVRKbbTg5"
+    "JqGTKYFuSwvrAQubTa3OHhk/o8N7wysc7paAfxWDEzFBPSMGe/bEoK4zL6V7sajIfr/sGJ"
+    "74h6ymM5xYcbEya7MqqkzzgenZyscMaRlyo84yjzsqvdip0uxRDD4rsJsL3SIdF2ySHRdn"
+    "RINKEYCWbKN4J/3w4HBaIxNsmAvMO8gfcWFz/7LfEbn19fJ9YSiqLV5WonK2z206dlxAW6"
+    "2x5env8D/HkRSw=="
+)
@@ -0,0 +1,52 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "posts" ADD "nearby" JSONB;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "posts" DROP COLUMN "nearby";"""
+
+
+MODELS_STATE = (
+    "eJztnO9P2zgYx/+VKq+YxHGUAzadTie1UG69QYug3E1Dk+UmbhuR2J3jDKqJ//1sJ2l+Oa"
+    "HJ0pYefgPU9jeNP3n8+LHzmB+GSyzkeAdnFD46twwyZPze+mFg6Io/FLX7LQPO53GdKGBw"
+    "7MjmpmgHvGXDsccoNBmvmkDHQ7zIQp5J7TmzCeal2HccUUhM3tDG07jIx/Y3HwFGpojNEO"
+    "UV9195sY0t9IS86OP8AUxs5FipezZtthDfLmsAW8xl6dkM0gvZVnzhGJjE8V2cbD9fsBnB"
+    "SwG/I1E6RRhR3h8r0Qlxj2GXo6LgfnkBoz5a3qgVF1hoAn2HJTq9IgmTYEHRxsyT3XThE3"
+    "AQnrIZ/3hy+Bx0J+5s0Er04J/OzdnHzs3eyeE70RPCH0XwmAZhzZGsepaXgAwGF5FwY5oO"
+    "9BhwbP6D2S7Kcz3nbESNmm1enaFshfKD6I8VmIdEl8ijJjHz2NqagV4CedS/6t2OOlfX4s"
+    "Zdz/vmSCqdUU/UHMnSRaZ07zTzQJYXaf3bH31siY+tL8NBTwIjHptS+Y1xu9EXQ9wT9BkB"
+    "mDwCaCW7HRVHRbxp5oFCC9hWlUGSVtUaKpt/bNmxstpgKRstcrgIzzN5SIwWUTCG5sMjpB"
+    "bI1ZAjUtQ2X+UeudkSiOFU4hGdFD0InXLf5eUqbx1UlDpqWzTxtuejVcbXx0xte0qb4884"
+    "a3OhgW3VO8sn8stR+/j98YffTo8/8CbyTpYl70tssD8YveCN5XMDHjXz+EboqYhfUtTMLL"
+    "ddl9v7PEp522iE7l11Pr9LedzL4eCvqHliRJ9dDruSdMItEmgh/k2kCtmUaHNkjV9td2rs"
+    "DtuJ7SDlfFNMNiHZkclm41ApcYEIDirO5FndrjiETU3mCsJ5vBeEInuKP6GFhNzndwqxqQ"
+    "pwwzn5OrzM6+P6HBlIVBqPHr6aW87dObvhfeQ9Qywwt87tWee8ZzxvJxQa+mxMnvoMuap4"
+    "KFFbGhQR2a75oOjeiIzI9xAV+L5m4qR7Q6yZfXk7mPtEABm/27n4HbTVQVSDQVT0FCo4zY"
+    "RkN/3l6fEK7vL0uNBbiqr0/BNb7KoQY8UGQ6U5wpbA1BTI9ukKINvZBX4MUlSlQYZjXYGy"
+    "cDAnJS8P6aZYHm57SMfMsk4yh658W0ohb2Bfqp6B/jHxsSl4tgYEowNMHv9cU2i/aztVNY"
+    "JbHdeuENfqkDYMaV9pNCvBKuLYCHhxBCs6tP5dvfvlKxPxG1i2uIQZeFH+BwLjBTaCAAwZ"
+    "XBu3D0oqBbTFY73JYb7ptzYNDfKyKDf1KDJD3SGwILJIqTJsJ0K2pr2Xw4OfiC5KYJ4P77"
+    "qXvdb1Te+sf9sfDtKznKwURbzADsb+Ta9zmQk2Aia+p7DOF0mGKk0yCHUti8cHiki3eCMw"
+    "IdmVGX3TO4HejFAGkjdbga9SrEmrScuAwadOFcBJjeaq5mqFCSNV1nCRRi/c9l/bwk2dgV"
+    "M8RJrNwPn/DQ/bAx7CijVblxAHQVwQH8eqDNgxl62LbNXlxupou8PhZQptt59ld3fV7d3s"
+    "td+lA5H89pGj2jIqieUc5R7ROqO4tRloE2GcowoxyvApo4o3iy+3aq7iJ9PLbf1qXOUvMY"
+    "J0vACeP36ElSainHBjgI01hQ5rxDufQepCsw7gpFQjLkb8IPpDp5AyVGlRVyDXqEuchTkL"
+    "o6KqzmIp1HiL8Y4hfqgBN5JptCWWOyPzOnYbyjTaQrR5qn/fDgdlVBVA7zDv673FI7b9lj"
+    "gJ8XXXQjTR53LAWZb76S0FcYEsYEqIW2kfeCnQ9qqyV98dIwrIBPBVFaGVyKq0GrICMpzz"
+    "SMpFmAWgqjBWSDViBWJGGHQApAhWoZtWabAKsGPo8DuotFZLSDRS1csgiuZw4So3ZkteB6"
+    "VUGqwCrJzqAZ+W8lwLMyJTmlopkVs4nthwUmTsBtXwSnZo81K9Wauc9CuaZYH6jRpoNtKs"
+    "CLNI/oZoVjh6nDk0qlgSdEPdxacb5MCC3I/smeJX+zY2l+2ZMr34bE99BulzRDsEYp3Jqn"
+    "eezBHNJavK8v2yZFVxpmaTyaq2B/iX2N+lGSffogWxg0l8XPW0VcmZ6x1KTt1MfFdyqN0D"
+    "Y1IjuyEU6eSG7Glr6jEgP1Uw2LRKZ+IUZuLwBZxrq+KWl8w1IdQmm8bq2hjIfOlKi5aUqu"
+    "Z65XXZbBMLFnHSoAbLpEqz1ImM68nzrZH09NP5Tm+Aayq0rTYrxTo9Kam2IYNlQQ7rCxuR"
+    "S9XmTmef1Oe54Z2JdS5HO4j7ipmhWJCGNftlS1IYt9H/Fq1Bf7ju/+jxHVFPee6p+PRoQr"
+    "Irs0r6EOnRyckKh0h5q8JDpLIuu9utSCUqhhg2302A7ZVO4bZLTuG2o1O4iYiRYKZ8I1ic"
+    "OZSQNJA69LqincZyh7Y6vTz/BxEGgXo="
+)
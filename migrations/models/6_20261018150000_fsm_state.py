@@ -0,0 +1,57 @@
+from tortoise import BaseDBAsyncClient
+
+RUN_IN_TRANSACTION = True
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "fsm_state" (
+    "key" VARCHAR(255) NOT NULL PRIMARY KEY,
+    "state" VARCHAR(255),
+    "data" JSONB NOT NULL
+);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "fsm_state";"""
+
+
+MODELS_STATE = (
+    "eJztnG1P4zgQgP9KlU+sxHGUA3Z1Op3UQrntLdAVlLvVopXlJG4bkdjdxFmoVvz3s533xA"
+    "lNSfpy+Au0tiexn8yMx864PzWHmMj2Ds5c+GjfUkiR9nvnp4ahwz9Iavc7GpzPkzpeQKFu"
+    "i+YGbwe8uKHuURcalFVNoO0hVmQiz3CtObUIZqXYt21eSAzW0MLTpMjH1ncfAUqmiM6Qyy"
+    "ruv7FiC5voCXnR1/kDmFjINjN9Niy64HcXNYAu5qL0bAbdC9GW31AHBrF9B6fbzxd0RnAs"
+    "wHrES6cII5eNx0wNgvcxHHJUFPSXFVDXR3FHzaTARBPo2zQ16CVJGARzihamnhimA5+Ajf"
+    "CUztjXk8PnYDjJYINWfAT/9G7OPvZu9k4O3/GREPYogsd0HdYciapncQlIYXARATehaUOP"
+    "Attif6jloCLXc8aG18jZFqVzlM1Q/CD6sATzkGiMPGqSME+0rRnoFZDHw6vB7bh39Zl33P"
+    "G877ag0hsPeM2RKF3kSvdOcw8kvkjn3+H4Y4d/7XwdXQ8EMOLRqSvumLQbf9V4n6BPCcDk"
+    "EUAzPeyoOCpiTXMPFJrAMusYSVZqJVNZ/2PL28pyxlJlLcJcuOeZPKSshRfo0Hh4hK4JCj"
+    "XkiJS1LVY5R06+BGI4FXj4IPkIQqd84TmlDjuuq3TXE8/ZtLN+QLV8ddh8F1310cnJEurH"
+    "WpWqn6ir9tbx01wWaCywkybdINOEIYdbRPj37ehajjBqnyN4h9nQ7k3LoPsdPgN+W0VFlw"
+    "Gq/THxscFBdnTfsqmFvQN+2z+1ViY8DiIz10Uw9656X/Kczy5H/fwkxi/Q3x43OnRYucyH"
+    "BhWVDtTiTbzNeU/ZHD7EVK6n0qmbPfC8XoZGvVHPKZ7IL0fd4/fHH347Pf7AmoiexCXvKz"
+    "R0eD1+wU2K5wY81yjiG6OnMn5poWZmoM1GroMv42pDjgPXy9H1X1HzvHVnnadNoInYnUgd"
+    "shmh9ZHVfrWcaTtOshW2E8tG0rC9nGxKZEcm+LVDdYkD+PRUc0GUl9sVh7CuNZGEcBHvBX"
+    "GRNcWf0EJAHrKeQmzI4tFwTv4cXmb7uD5HChKVJtbjwsd47i7oDRsjGxmigbr1bs965wPt"
+    "eTOh0MinOnkaUuTI4qFUbWVQRES75oOiey1SIt9DLsf3LRcn3YvljC+6g5lPBJCy3s75/6"
+    "CtCqIaDKKip1DDaaZEdtNfnh4v4S5Pj0u9Ja/Kzj+JxtZZsgcSawyV5gibHFNTILunS4Ds"
+    "5vdJE5C8KgsytHUJylJjTou8bNJNsTzctEknzPJOsoCuendfIt7A9v5rN0GuCUYHmDy2tP"
+    "+xcxv+KwS3Kq5dIq5VIW0Y0m5pNCvASuLYCHh5BMsH1P6u3n385pn/B6bFL2EEXpR9QEBf"
+    "YC0IwJDGZJP2QUmtgLbc1ps083W//G7IyKui3MyjyJm6TWBJZJGRyrGdcLGW9l4OD14RXV"
+    "TAPB/d9S8Hnc83g7Ph7TB8ARDPcqKSF7ECK7D9m0HvMhdsBEx8T6KdL5IMpRTJINQ1TRYf"
+    "SCLd8o3AlMiuzOjr3gn0ZsSlIN3ZGnylwoq0nLQIGHzXrgM4LaO4yrma0pf/1Ws4U/7+Xy"
+    "3cNr9wkycylptIs4mM/z/zsDzgISxZs/UJsRHEJfFxIpUDqzOxtsjWXW4sj7Y/Gl1m0PaH"
+    "eXZ3V/3BzV73XTYQKW4f2bIto4pYzpbuEbUZxbWmoE2EcbYsxKjCJ40q3iy+wqq5jp/MLr"
+    "fVq3GZv8QIuvoCeL7+CGtNRAXBtQHWWgodWsQ7n0HXgcYqgNOiCnE54gc+HncKXYpqLepK"
+    "xBXqCmdhzMKoqK6ziAUV3nK8OsQPK8CNxBTaCs2dkfkqehuKKbSlaItUy5PpE4kG0um3Kk"
+    "RrLG8+DdglxKm1DxwLKH2V6avv6MgFZALYqoq4tcjKZBVkCWQ4Z5GUgzANQNVhLBFViCWI"
+    "KaHQBtBFkoNM5XSzUgqsBKwObdaDWmu1lIhCKnsZ5KI5XDjSjdmK10EZKQVWAlZM9YBNS0"
+    "WupRmRGZmVUiI3cCS04aTIxA3K4VXs0BZF1WatdNKvqZYl0m9UQfORZk2YZeJviGaNo8e5"
+    "Q6OSJUE/lLv4dINsWJL7kT9TvLVvYwvZnhnVS872rM4ge45oh0C0max654kc0UKyqijfr0"
+    "pW5Wdq1pmsanmA3cT6IdQ4/RYtiB0M4uO6p60qzlzvUHLqeuK7ikPtHtDJCtkNoZBKbsif"
+    "tnY9CsS3GgqblVKZOKWZOGwB51iyuOUldU0JKpXNYnUsDES+dK1FS0ZqxfXKdulsEwsWft"
+    "JgBZZpKcVSJTK2k+e7QtLTq/Od3gDXTGhbb1ZK5NSkJNuGDJYFBawvbETGUus7nX2yOs81"
+    "70y0uRztIeYrZppkQRrW7FctSWHSRv0sWoP+sO1f9PiBXE967qn89GhKZFdmlTX8hCQ3jR"
+    "oQw+a7CbC71CncbsUp3G50CjcVMRJMpW8EyzOHUiKb+iXO7c8d2uj08vwfPaMxhA=="
+)
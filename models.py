@@ -22,6 +22,8 @@ class Post(models.Model):
     nearby_school = fields.TextField(null=True, default='')
     nearby_bank = fields.TextField(null=True, default='')
     nearby_shop = fields.TextField(null=True, default='')
+    # ближайшие объекты по категориям POI: {"subway": [["Пушкинская", 230], ...]}, расстояния в метрах
+    nearby = fields.JSONField(null=True)
 
     rooms = fields.TextField(null=True, default='')
     number_of_floors = fields.TextField(null=True, default='')
@@ -30,8 +32,15 @@ class Post(models.Model):
     balcony = fields.TextField(null=True, default='')
     prepayment = fields.TextField(null=True, default='')
 
+    # числовые копии текстовых параметров — по ним фильтруем в запросах
+    rooms_num = fields.IntField(null=True)
+    total_area_num = fields.FloatField(null=True)
+    apartment_floor_num = fields.IntField(null=True)
+    number_of_floors_num = fields.IntField(null=True)
+
     class Meta:
         table = "posts"
+        indexes = (("city", "city_district", "price_byn", "date"), ("city", "date"))
 
 
 class User(models.Model):
@@ -49,16 +58,49 @@ class User(models.Model):
 
     class Meta:
         table = "users"
+        indexes = (("city", "is_active", "district", "rooms_count"),)
 
 
 class Image(models.Model):
     id = fields.IntField(pk=True, null=False)
     image_src = fields.TextField()
     loaded_to = fields.TextField(default='/img')
+    file_id = fields.TextField(null=True)  # file_id фото в Telegram после первой отправки
     from_post = fields.ForeignKeyField("models.Post", related_name="images", on_delete=fields.CASCADE)
 
     class Meta:
         table = "images"
 
 
+class CrawlState(models.Model):
+    city = fields.CharField(pk=True, max_length=50)
+    last_list_time = fields.DatetimeField(null=True)
+    last_ad_id = fields.CharField(max_length=500, null=True)
+
+    class Meta:
+        table = "crawl_state"
+
+
+# Одна доставка поста одному пользователю; переживает перезапуск процесса
+class OutboxItem(models.Model):
+    id = fields.IntField(pk=True)
+    post = fields.ForeignKeyField("models.Post", related_name="outbox", on_delete=fields.CASCADE)
+    user_id = fields.CharField(max_length=64)
+    status = fields.CharField(max_length=16, default="pending")  # pending / sending / sent / failed
+    attempts = fields.IntField(default=0)
+    next_attempt_at = fields.DatetimeField(default=datetime.now)
 
+    class Meta:
+        table = "outbox"
+        unique_together = (("post", "user_id"),)
+        indexes = (("status", "next_attempt_at"),)
+
+
+# Состояние диалога aiogram (FSM), общее для всех процессов webhook
+class FsmState(models.Model):
+    key = fields.CharField(pk=True, max_length=255)
+    state = fields.CharField(max_length=255, null=True)
+    data = fields.JSONField(default=dict)
+
+    class Meta:
+        table = "fsm_state"
@@ -0,0 +1,103 @@
+import asyncio
+import os
+from collections import defaultdict
+
+from db import claim_deliveries, complete_delivery, fail_delivery, reset_interrupted_deliveries
+from logger import bind_log_context, logger
+from messages import post_text
+from models import Image, OutboxItem, Post
+from tg import send_message_to_all, send_post_with_images_to_all
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 200))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+OUTBOX_RETRY_BACKOFF = float(os.getenv("OUTBOX_RETRY_BACKOFF", 30))
+OUTBOX_POLL_INTERVAL = 5
+
+# сколько доставок одновременно может быть взято в работу (по всем постам)
+OUTBOX_MAX_IN_FLIGHT = int(os.getenv("OUTBOX_MAX_IN_FLIGHT", 1000))
+
+# будит воркер сразу после постановки новых доставок, не дожидаясь опроса
+outbox_ready = asyncio.Event()
+
+
+async def deliver_post(post_id: str, items: list[OutboxItem]) -> None:
+    """Отправляет пост получателям из items и отмечает каждую доставку."""
+    bind_log_context(ad_id=post_id)  # отдельная задача: контекст не выходит за её пределы
+    post = await Post.get_or_none(id=post_id)
+    if post is None:
+        logger.warning(f"Outbox: post [{post_id}] not found, {len(items)} deliveries dropped")
+        for item in items:
+            await fail_delivery(item, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETRY_BACKOFF, permanent=True)
+        return
+
+    user_ids = [item.user_id for item in items]
+    images = await Image.filter(from_post_id=post_id).order_by("id")
+    if images:
+        results = await send_post_with_images_to_all(user_ids, images, post_text(post))
+    else:
+        results = await send_message_to_all(user_ids, post_text(post))
+
+    for item in items:
+        result = results.get(item.user_id)
+        if result:
+            await complete_delivery(item.id)
+        else:
+            # None — пользователь заблокировал бота: повторять бессмысленно
+            await fail_delivery(item, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETRY_BACKOFF, permanent=result is None)
+
+
+async def deliver_post_safely(post_id: str, items: list[OutboxItem]) -> None:
+    try:
+        await deliver_post(post_id, items)
+    except Exception as e:
+        logger.exception(f"Outbox: delivery of post [{post_id}] failed: {e}")
+        # иначе доставки остались бы в sending до рестарта; уже завершённые fail_delivery не трогает
+        for item in items:
+            try:
+                await fail_delivery(item, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETRY_BACKOFF)
+            except Exception as e:
+                logger.exception(f"Outbox: failed to return delivery [{item.id}] to queue: {e}")
+
+
+async def run_outbox_worker() -> None:
+    """Разбирает outbox непрерывно: каждый пост отправляется своей задачей, а новые доставки
+    забираются, пока в работе меньше OUTBOX_MAX_IN_FLIGHT, — медленный пост не держит очередь.
+    После рестарта продолжает с прерванных доставок."""
+    interrupted = await reset_interrupted_deliveries()
+    if interrupted:
+        logger.info(f"Outbox: {interrupted} interrupted deliveries returned to queue")
+
+    in_flight: dict[asyncio.Task, int] = {}  # задача поста -> число её доставок
+    try:
+        while True:
+            capacity = OUTBOX_MAX_IN_FLIGHT - sum(in_flight.values())
+            if capacity <= 0:
+                await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            try:
+                items = await claim_deliveries(min(OUTBOX_BATCH_SIZE, capacity))
+            except Exception as e:
+                logger.exception(f"Outbox: failed to claim deliveries: {e}")
+                items = []
+
+            if items:
+                logger.info(f"Outbox: delivering {len(items)} items")
+                by_post: dict[str, list[OutboxItem]] = defaultdict(list)
+                for item in items:
+                    by_post[item.post_id].append(item)
+                for post_id, post_items in by_post.items():
+                    task = asyncio.create_task(deliver_post_safely(post_id, post_items))
+                    in_flight[task] = len(post_items)
+                    task.add_done_callback(lambda done: in_flight.pop(done, None))
+                continue
+
+            outbox_ready.clear()
+            try:
+                await asyncio.wait_for(outbox_ready.wait(), timeout=OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
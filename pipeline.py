@@ -0,0 +1,80 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from logger import log_context, logger
+
+Handler = Callable[[Any], Awaitable[Optional[Iterable[Any]]]]
+ErrorHandler = Callable[[Any, Exception], None]
+
+
+class Stage:
+    """Этап конвейера: ограниченная очередь и фиксированное число воркеров.
+
+    handler(item) возвращает элементы для следующего этапа (или None). Пока очередь
+    следующего этапа заполнена, воркеры ждут — так давление доходит до самого начала.
+    """
+
+    def __init__(self, name: str, handler: Handler, workers: int = 1, maxsize: int = 100,
+                 on_error: Optional[ErrorHandler] = None, queue: Optional[asyncio.Queue] = None):
+        self.name = name
+        self.handler = handler
+        self.workers_count = workers
+        self.on_error = on_error
+        self.queue = queue if queue is not None else asyncio.Queue(maxsize=maxsize)
+        self.next: Optional[Stage] = None
+        self.workers: list[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    async def put(self, item: Any) -> None:
+        await self.queue.put(item)
+
+    def start(self) -> None:
+        if not self.workers:
+            self.workers = [asyncio.create_task(self._worker()) for _ in range(self.workers_count)]
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self.queue.get()
+            # поля, которые handler добавит через bind_log_context, живут только до конца элемента
+            with log_context(stage=self.name):
+                try:
+                    results = await self.handler(item)
+                    if results and self.next is not None:
+                        for result in results:
+                            await self.next.put(result)
+                except Exception as e:
+                    logger.exception(f"Stage [{self.name}] failed: {e}")
+                    if self.on_error:
+                        self.on_error(item, e)
+                finally:
+                    self.queue.task_done()
+
+    async def drain(self) -> None:
+        """Дожидается обработки всего, что уже в очереди, и останавливает воркеры."""
+        await self.queue.join()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+
+class Pipeline:
+    def __init__(self, stages: list[Stage]):
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next = next_stage
+
+    def start(self) -> None:
+        for stage in self.stages:
+            stage.start()
+
+    async def drain(self) -> None:
+        # по порядку: пока дренируется этап, его воркеры ещё кладут результаты в следующий
+        for stage in self.stages:
+            await stage.drain()
+
+    def depths(self) -> dict[str, int]:
+        return {stage.name: stage.depth for stage in self.stages}
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+import osmium
+import shapely
+
+from logger import logger
+
+OSM_FILE = "./geo/belarus-251117.osm.pbf"
+CACHE_DIR = Path(os.getenv("POI_CACHE_DIR", "./geo/cache"))
+# меняется вместе с логикой извлечения POI, чтобы старый кеш пересобрался
+CACHE_VERSION = 2
+
+CITY_OBJECTS = {
+    "subway":  {"key": "railway", "value": "subway_entrance"},
+    "pharmacy": {"key": "amenity", "value": "pharmacy"},
+    "kindergarten": {"key": "amenity", "value": "kindergarten"},
+    "school": {"key": "amenity", "value": "school"},
+    "bank": {"key": "amenity", "value": "bank"},
+    "supermarket": {"key": "shop", "value": "supermarket"},
+    "convenience": {"key": "shop", "value": "convenience"},
+    "mall": {"key": "shop", "value": "mall"},
+}
+
+
+class POIColumns(NamedTuple):
+    lat: np.ndarray
+    lon: np.ndarray
+    name: np.ndarray  # коды в таблице имён POIStore.names
+
+
+class POIStore:
+    """POI всех категорий в колоночном виде: float64 lat/lon и int32-коды имён."""
+
+    def __init__(self, names: list[str], categories: dict[str, POIColumns]):
+        self.names = names
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return sum(len(columns.lat) for columns in self.categories.values())
+
+
+class POIBuffer:
+    """Накопитель POI одной категории: плоские массивы вместо словаря на каждый объект."""
+    __slots__ = ("lat", "lon", "name")
+
+    def __init__(self):
+        self.lat = array("d")
+        self.lon = array("d")
+        self.name = array("i")
+
+    def append(self, lat: float, lon: float, name: int) -> None:
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.name.append(name)
+
+    def to_columns(self) -> POIColumns:
+        return POIColumns(
+            lat=np.frombuffer(self.lat, dtype=np.float64),
+            lon=np.frombuffer(self.lon, dtype=np.float64),
+            name=np.frombuffer(self.name, dtype=np.int32),
+        )
+
+
+class POIHandler(osmium.SimpleHandler):
+    """Собирает POI из точек, линий и площадных объектов (замкнутые линии и мультиполигоны).
+
+    Площадные объекты приходят в area() из сборщика мультиполигонов osmium, их координата —
+    центроид полигона; незамкнутые линии — центроид линии.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.codes: dict[str, int] = {}
+        self.poi_data = {k: POIBuffer() for k in CITY_OBJECTS.keys()}
+        self.wkb = osmium.geom.WKBFactory()
+
+    def _categories(self, tags) -> list[str]:
+        return [key for key, rule in CITY_OBJECTS.items() if tags.get(rule["key"]) == rule["value"]]
+
+    def _add(self, categories: list[str], tags, lat: float, lon: float) -> None:
+        name = tags.get("name:ru") or tags.get("name") or ""
+        code = self.codes.setdefault(name, len(self.codes))
+        for key in categories:
+            self.poi_data[key].append(lat, lon, code)
+
+    def _add_centroid(self, categories: list[str], tags, wkb: str) -> None:
+        centroid = shapely.from_wkb(wkb).centroid
+        if not centroid.is_empty:
+            self._add(categories, tags, centroid.y, centroid.x)
+
+    def node(self, n):
+        if not n.tags:
+            return
+        categories = self._categories(n.tags)
+        if categories:
+            self._add(categories, n.tags, n.location.lat, n.location.lon)
+
+    def way(self, w):
+        # замкнутые линии придут ещё раз в area() как полигоны
+        if w.is_closed() or not w.tags:
+            return
+        categories = self._categories(w.tags)
+        if categories:
+            try:
+                self._add_centroid(categories, w.tags, self.wkb.create_linestring(w))
+            except RuntimeError as e:
+                logger.warning(f"Skipping way {w.id}: {e}")
+
+    def area(self, a):
+        categories = self._categories(a.tags)
+        if categories:
+            try:
+                self._add_centroid(categories, a.tags, self.wkb.create_multipolygon(a))
+            except RuntimeError as e:
+                kind = "way" if a.from_way() else "relation"
+                logger.warning(f"Skipping {kind} {a.orig_id()}: {e}")
+
+
+def scan_pbf(osm_file: str) -> POIStore:
+    """Полный проход по .osm.pbf — медленно, используется только при устаревшем кеше."""
+    handler = POIHandler()
+    handler.apply_file(osm_file, locations=True)
+
+    categories = {key: buffer.to_columns() for key, buffer in handler.poi_data.items()}
+    return POIStore(list(handler.codes), categories)
+
+
+def file_digest(path: str) -> str:
+    """sha256 файла; результат запоминается рядом с кешем по (size, mtime), чтобы не читать pbf на каждом старте."""
+    stat = os.stat(path)
+    memo_path = CACHE_DIR / f"{Path(path).name}.digest"
+    try:
+        memo = json.loads(memo_path.read_text(encoding="utf-8"))
+        if memo["size"] == stat.st_size and memo["mtime_ns"] == stat.st_mtime_ns:
+            return memo["digest"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    memo_path.write_text(json.dumps({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": digest}),
+                         encoding="utf-8")
+    return digest
+
+
+def cache_path(digest: str) -> Path:
+    return CACHE_DIR / f"poi-{digest[:16]}"
+
+
+def save_poi_cache(store: POIStore, digest: str) -> Path:
+    """Пишет колонки подряд в lat.npy/lon.npy/name.npy, границы категорий и имена — в meta.json."""
+    path = cache_path(digest)
+    # у каждого процесса свой временный каталог: общий .tmp один процесс удалял бы, пока в него пишет другой
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = Path(tempfile.mkdtemp(prefix=f".{path.name}.", dir=CACHE_DIR))
+
+    bounds = {}
+    start = 0
+    for key, columns in store.categories.items():
+        bounds[key] = [start, start + len(columns.lat)]
+        start += len(columns.lat)
+
+    for field in POIColumns._fields:
+        column = np.concatenate([getattr(c, field) for c in store.categories.values()])
+        np.save(tmp_path / f"{field}.npy", column)
+
+    meta = {"digest": digest, "version": CACHE_VERSION, "categories": bounds, "names": store.names}
+    (tmp_path / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+    shutil.rmtree(path, ignore_errors=True)
+    try:
+        tmp_path.rename(path)
+    except OSError:
+        # другой процесс успел положить кеш для того же файла
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    for old in CACHE_DIR.glob("poi-*"):
+        if old != path:
+            shutil.rmtree(old, ignore_errors=True)
+    return path
+
+
+def load_poi_cache(digest: str) -> Optional[POIStore]:
+    path = cache_path(digest)
+    try:
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        if meta["digest"] != digest or meta.get("version") != CACHE_VERSION:
+            return None
+        columns = {field: np.load(path / f"{field}.npy", mmap_mode="r") for field in POIColumns._fields}
+    except (OSError, ValueError, KeyError):
+        return None
+
+    categories = {}
+    for key in CITY_OBJECTS.keys():
+        if key not in meta["categories"]:
+            return None
+        start, end = meta["categories"][key]
+        categories[key] = POIColumns(*(columns[field][start:end] for field in POIColumns._fields))
+    return POIStore(meta["names"], categories)
+
+
+def build_poi_cache(osm_file: str) -> POIStore:
+    digest = file_digest(osm_file)
+    store = scan_pbf(osm_file)
+    path = save_poi_cache(store, digest)
+    logger.info(f"POI cache built: {path} ({len(store)} objects)")
+    return store
+
+
+def ensure_poi_cache(osm_file: str) -> None:
+    """Собирает кеш заранее, в одном процессе, чтобы процессы пула обогащения не сканировали pbf одновременно."""
+    if load_poi_cache(file_digest(osm_file)) is None:
+        logger.info(f"POI cache for {osm_file} is missing or stale, scanning pbf")
+        build_poi_cache(osm_file)
+
+
+def load_poi_store(osm_file: str) -> POIStore:
+    """Загружает POI из кеша; сканирует pbf, только если кеша для этого файла нет."""
+    store = load_poi_cache(file_digest(osm_file))
+    if store is not None:
+        return store
+    logger.info(f"POI cache for {osm_file} is missing or stale, scanning pbf")
+    return build_poi_cache(osm_file)
+
+
+if __name__ == "__main__":
+    build_poi_cache(sys.argv[1] if len(sys.argv) > 1 else OSM_FILE)
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+
+from logger import logger
+
+ParseFunc = Callable[[aiohttp.ClientSession, str], Awaitable[Optional[int]]]
+
+
+class AdaptiveInterval:
+    """Подбирает интервал опроса города по скорости появления новых объявлений.
+
+    Скорость сглаживается EWMA; интервал выбирается так, чтобы за один опрос
+    приходило около target_new_per_poll новых объявлений, и ограничивается
+    [min_interval, max_interval]. В часы пик интервал умножается на peak_factor.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, target_new_per_poll: float = 3,
+                 smoothing: float = 0.3, peak_hours: tuple[int, int] = (8, 23), peak_factor: float = 0.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_new_per_poll = target_new_per_poll
+        self.smoothing = smoothing
+        self.peak_hours = peak_hours
+        self.peak_factor = peak_factor
+
+    def is_peak(self, now: datetime) -> bool:
+        start, end = self.peak_hours
+        if start <= end:
+            return start <= now.hour < end
+        return now.hour >= start or now.hour < end
+
+    def update_rate(self, rate: Optional[float], new_posts: int, elapsed: float) -> float:
+        """Новая оценка скорости (объявлений в секунду) после опроса, покрывшего elapsed секунд."""
+        observed = new_posts / elapsed if elapsed > 0 else 0.0
+        if rate is None:
+            return observed
+        return self.smoothing * observed + (1 - self.smoothing) * rate
+
+    def next_interval(self, rate: float, now: datetime) -> float:
+        interval = self.target_new_per_poll / rate if rate > 0 else self.max_interval
+        if self.is_peak(now):
+            interval *= self.peak_factor
+        return min(self.max_interval, max(self.min_interval, interval))
+
+
+class CityStats:
+    def __init__(self, city: str):
+        self.city = city
+        self.interval: Optional[float] = None
+        self.rate: Optional[float] = None  # новых объявлений в секунду (EWMA)
+        self.last_poll: Optional[float] = None
+        self.cycles = 0
+        self.failures = 0
+        self.last_cycle_seconds: Optional[float] = None
+        self.last_success: Optional[datetime] = None
+        self.last_new_posts = 0
+
+
+class CrawlScheduler:
+    """Параллельный обход городов: у каждого города свой таймер, общий лимит одновременных парсингов.
+
+    parse(session, city) возвращает число новых объявлений или None при неудаче.
+    Без policy каждый город опрашивается с фиксированным интервалом из run().
+    """
+
+    def __init__(self, parse: ParseFunc, cities: list[str], concurrency: int = 3, timeout: float = 60,
+                 policy: Optional[AdaptiveInterval] = None):
+        self.parse = parse
+        self.cities = cities
+        self.timeout = timeout
+        self.policy = policy
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.stats = {city: CityStats(city) for city in cities}
+
+    async def run(self, session: aiohttp.ClientSession, interval: float) -> None:
+        for stats in self.stats.values():
+            stats.interval = interval
+        await asyncio.gather(*(self._city_loop(session, city) for city in self.cities))
+
+    async def _city_loop(self, session: aiohttp.ClientSession, city: str) -> None:
+        stats = self.stats[city]
+        while True:
+            started = time.monotonic()
+            await self.parse_once(session, city)
+            await asyncio.sleep(max(0.0, stats.interval - (time.monotonic() - started)))
+
+    async def parse_once(self, session: aiohttp.ClientSession, city: str) -> Optional[int]:
+        stats = self.stats[city]
+        async with self.semaphore:
+            started = time.monotonic()
+            try:
+                new_posts = await asyncio.wait_for(self.parse(session, city), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"Parsing city {city} timed out after {self.timeout} sec")
+                new_posts = None
+            except Exception as e:
+                logger.exception(f"Parsing city {city} failed: {e}")
+                new_posts = None
+            elapsed = time.monotonic() - started
+
+        stats.cycles += 1
+        stats.last_cycle_seconds = elapsed
+        if new_posts is None:
+            stats.failures += 1
+        else:
+            stats.last_success = datetime.now()
+            stats.last_new_posts = new_posts
+            self._adapt(stats, new_posts, started)
+            logger.info(f"City {city} parsed in {elapsed:.2f} sec, new posts: {new_posts}, "
+                        f"next poll in {stats.interval or 0:.0f} sec")
+        return new_posts
+
+    def _adapt(self, stats: CityStats, new_posts: int, polled_at: float) -> None:
+        # первый опрос отдаёт целую страницу уже известных объявлений — скорость по нему не считаем
+        if self.policy and stats.last_poll is not None:
+            stats.rate = self.policy.update_rate(stats.rate, new_posts, polled_at - stats.last_poll)
+            stats.interval = self.policy.next_interval(stats.rate, datetime.now())
+        stats.last_poll = polled_at
@@ -1,31 +1,30 @@
 from tortoise.signals import post_save
-from models import User, Post
+from models import User
 from logger import logger
+from subscriptions import subscription_index
+from db import USER_CACHE
 import asyncio
+import os
 from typing import Any, Type
 
 
-post_queue = asyncio.Queue()
-user_queue = asyncio.Queue()
+# Ограниченная очередь: если рассылка новым пользователям отстаёт, лишние пользователи
+# пропускаются, а не задерживают user.save() в обработчиках бота
+user_queue = asyncio.Queue(maxsize=int(os.getenv("USER_QUEUE_SIZE", 100)))
 
 
 @post_save(User)
 async def on_user_update(sender: Type[User], instance: User, created: bool, using_db, update_fields) -> None:
+    subscription_index.update(instance)
+    USER_CACHE.put(str(instance.id), instance)
     if not created and instance.is_active:
         safe_put(user_queue, instance)
 
 
-"""@post_save(Post)
-async def on_post_created(sender: Type[Post], instance: Post, created: bool, using_db, update_fields) -> None:
-    if created:
-        safe_put(post_queue, instance)"""
-
-
 def safe_put(queue: asyncio.Queue, item: Any) -> None:
     try:
-        loop = asyncio.get_running_loop()
-        loop.create_task(queue.put(item))
-    except RuntimeError:
-        pass
+        queue.put_nowait(item)
+    except asyncio.QueueFull:
+        logger.warning(f"Queue is full ({queue.maxsize}), item skipped: {item}")
     except Exception as e:
         logger.exception(f"Error queue: {e}")
@@ -0,0 +1,229 @@
+from math import radians, sin, cos, sqrt, asin, floor
+from typing import Callable, Hashable, Iterator, Optional, Sequence
+
+import numpy as np
+
+EARTH_RADIUS = 6371000
+METERS_PER_DEGREE = 2 * 3.141592653589793 * EARTH_RADIUS / 360
+# Беларусь лежит примерно между 51° и 56° с.ш., по этой широте выбираем ширину ячейки по долготе
+REFERENCE_LAT = 53.7
+
+
+def distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+
+    a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
+
+    return 2 * EARTH_RADIUS * asin(sqrt(a))
+
+
+def distances(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Векторный distance(): попарные расстояния между массивами точек, в метрах."""
+    dlat = np.radians(lat2 - lat1)
+    dlon = np.radians(lon2 - lon1)
+
+    a = np.sin(dlat/2)**2 + np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.sin(dlon/2)**2
+
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+
+def lon_radius_deg(lat, radius: float):
+    """Полуширина bbox круга радиусом radius метров по долготе, в градусах (lat — число или массив).
+
+    Берётся на дальнем от экватора краю круга, где градус долготы короче всего."""
+    max_lat = np.minimum(np.abs(lat) + radius / METERS_PER_DEGREE, 89.9)
+    return radius / (METERS_PER_DEGREE * np.cos(np.radians(max_lat)))
+
+
+class GridIndex:
+    """Сеточный пространственный индекс точек (аналог geohash-сетки).
+
+    Точки раскладываются по ячейкам ~cell_size метров, запрос по радиусу
+    проверяет только ячейки, пересекающие bbox круга, и уточняет кандидатов
+    по haversine-расстоянию.
+    """
+
+    def __init__(self, lats: Sequence[float], lons: Sequence[float], cell_size: float = 500):
+        self.lats = lats
+        self.lons = lons
+        self.cell_lat = cell_size / METERS_PER_DEGREE
+        self.cell_lon = cell_size / (METERS_PER_DEGREE * cos(radians(REFERENCE_LAT)))
+        self.cells: dict[tuple[int, int], list[int]] = {}
+
+        for i in range(len(lats)):
+            self.cells.setdefault(self._cell(lats[i], lons[i]), []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return floor(lat / self.cell_lat), floor(lon / self.cell_lon)
+
+    def _candidates(self, lat: float, lon: float, radius: float) -> Iterator[int]:
+        dlat = radius / METERS_PER_DEGREE
+        dlon = float(lon_radius_deg(lat, radius))
+
+        row_min, col_min = self._cell(lat - dlat, lon - dlon)
+        row_max, col_max = self._cell(lat + dlat, lon + dlon)
+
+        for row in range(row_min, row_max + 1):
+            for col in range(col_min, col_max + 1):
+                yield from self.cells.get((row, col), ())
+
+    def query_radius(self, lat: float, lon: float, radius: float) -> list[tuple[float, int]]:
+        """Возвращает (расстояние, индекс) всех точек в радиусе radius метров."""
+        result = []
+        for i in self._candidates(lat, lon, radius):
+            dist = distance(lat, lon, self.lats[i], self.lons[i])
+            if dist <= radius:
+                result.append((dist, i))
+        return result
+
+    def _ring(self, row: int, col: int, ring: int) -> Iterator[int]:
+        """Точки ячеек на границе квадрата (2*ring+1) x (2*ring+1) вокруг ячейки (row, col)."""
+        if ring == 0:
+            yield from self.cells.get((row, col), ())
+            return
+        for c in range(col - ring, col + ring + 1):
+            yield from self.cells.get((row - ring, c), ())
+            yield from self.cells.get((row + ring, c), ())
+        for r in range(row - ring + 1, row + ring):
+            yield from self.cells.get((r, col - ring), ())
+            yield from self.cells.get((r, col + ring), ())
+
+    def nearest(self, lat: float, lon: float, k: int, max_radius: float,
+                key: Optional[Callable[[int], Hashable]] = None) -> list[tuple[float, int]]:
+        """k ближайших точек в пределах max_radius, отсортированные по расстоянию.
+
+        Ячейки обходятся кольцами вокруг ячейки запроса. После кольца ring все точки ближе
+        ring ячеек уже просмотрены, поэтому обход останавливается, как только k-я найденная
+        точка не дальше этой границы, — весь радиус max_radius при этом не перебирается.
+        С key ищутся k ближайших различных значений key(i): от каждого берётся
+        ближайшая точка, точки с пустым key пропускаются.
+        """
+        if k < 1 or not len(self):
+            return []
+
+        row, col = self._cell(lat, lon)
+        found = []
+        ring = 0
+        while True:
+            for i in self._ring(row, col, ring):
+                dist = distance(lat, lon, self.lats[i], self.lons[i])
+                if dist <= max_radius:
+                    found.append((dist, i))
+            found.sort()
+            best = self._first_by_key(found, key) if key is not None else found
+
+            # до ячеек за пределами кольца не меньше ring ячеек в любую сторону
+            max_lat = min(abs(lat) + (ring + 1) * self.cell_lat, 89.9)
+            covered = ring * METERS_PER_DEGREE * min(self.cell_lat, self.cell_lon * cos(radians(max_lat)))
+            if (len(best) >= k and best[k - 1][0] <= covered) or covered >= max_radius:
+                return best[:k]
+            ring += 1
+
+    @staticmethod
+    def _first_by_key(found: list[tuple[float, int]], key: Callable[[int], Hashable]) -> list[tuple[float, int]]:
+        seen = set()
+        result = []
+        for dist, i in found:
+            value = key(i)
+            if value and value not in seen:
+                seen.add(value)
+                result.append((dist, i))
+        return result
+
+
+class SortedIndex:
+    """Точки в массивах numpy, отсортированные по широте.
+
+    Для пачки запросов полосы широт находятся бинарным поиском, кандидаты из всех полос
+    отсекаются по долготе, и расстояния по всем парам (запрос, точка) считаются одной
+    векторной операцией.
+    """
+
+    def __init__(self, lats: np.ndarray, lons: np.ndarray):
+        lats = np.asarray(lats, dtype=np.float64)
+        self.order = np.argsort(lats, kind="stable")
+        self.lats = lats[self.order]
+        self.lons = np.asarray(lons, dtype=np.float64)[self.order]
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def query_radius_many(self, lats: np.ndarray, lons: np.ndarray,
+                          radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Все пары в радиусе radius метров: (номер запроса, исходный индекс точки, расстояние)."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        dlat = radius / METERS_PER_DEGREE
+        dlon = lon_radius_deg(lats, radius)
+
+        start = np.searchsorted(self.lats, lats - dlat, side="left")
+        end = np.searchsorted(self.lats, lats + dlat, side="right")
+        counts = end - start
+
+        # разворачиваем полосы [start, end) всех запросов в плоский список пар
+        query = np.repeat(np.arange(len(lats)), counts)
+        offsets = np.cumsum(counts) - counts
+        pos = start[query] + np.arange(counts.sum()) - offsets[query]
+
+        band = np.abs(self.lons[pos] - lons[query]) <= dlon[query]
+        query, pos = query[band], pos[band]
+
+        dist = distances(lats[query], lons[query], self.lats[pos], self.lons[pos])
+        inside = dist <= radius
+        return query[inside], self.order[pos[inside]], dist[inside]
+
+    def nearest_many(self, lats: np.ndarray, lons: np.ndarray, k: int, max_radius: float,
+                     keys: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Пакетный аналог GridIndex.nearest: до k ближайших точек каждого запроса в пределах max_radius,
+        (номер запроса, исходный индекс точки, расстояние) по запросам и по возрастанию расстояния.
+
+        Радиус поиска растёт вдвое, начиная с половины max_radius, и запрос выбывает, как только
+        внутри текущего радиуса нашлось k результатов: все более близкие точки уже просмотрены, так что
+        они точные, а пары до max_radius перебираются только для запросов, которым не хватило точек.
+        С keys (ключ по исходному индексу точки) ищутся k ближайших различных ключей:
+        от каждого берётся ближайшая точка, точки с отрицательным ключом пропускаются.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        empty = np.empty(0, dtype=np.int64)
+        if k < 1 or not len(self) or not len(lats):
+            return empty, empty, np.empty(0, dtype=np.float64)
+
+        pending = np.arange(len(lats))
+        parts = []
+        radius = max_radius / 2
+        while len(pending):
+            radius = min(radius, max_radius)
+            query, found, dist = self.query_radius_many(lats[pending], lons[pending], radius)
+            if keys is not None:
+                point_keys = keys[found]
+                valid = point_keys >= 0
+                query, found, dist, point_keys = query[valid], found[valid], dist[valid], point_keys[valid]
+
+            # по расстоянию, при равенстве — по индексу точки, как в GridIndex.nearest
+            order = np.lexsort((found, dist, query))
+            query, found, dist = query[order], found[order], dist[order]
+            if keys is not None:
+                # первая (ближайшая) точка каждого ключа у каждого запроса
+                point_keys = point_keys[order]
+                _, first = np.unique(query * (int(point_keys.max(initial=0)) + 1) + point_keys, return_index=True)
+                first.sort()
+                query, found, dist = query[first], found[first], dist[first]
+
+            rank = np.arange(len(query)) - np.searchsorted(query, query, side="left")
+            done = np.bincount(query, minlength=len(pending)) >= k
+            if radius >= max_radius:
+                done[:] = True
+            keep = done[query] & (rank < k)
+            parts.append((pending[query[keep]], found[keep], dist[keep]))
+            pending = pending[~done]
+            radius *= 2
+
+        query = np.concatenate([part[0] for part in parts])
+        order = np.argsort(query, kind="stable")
+        return (query[order], np.concatenate([part[1] for part in parts])[order],
+                np.concatenate([part[2] for part in parts])[order])
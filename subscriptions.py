@@ -0,0 +1,144 @@
+from typing import Optional
+
+from logger import logger
+from models import User, Post
+
+# rooms_count пользователя: 1-3 — ровно столько комнат, 4 — четыре и больше, 5 — любое количество
+ANY_ROOMS = 5
+ROOMS_BUCKETS = (1, 2, 3, 4, ANY_ROOMS)
+
+Interval = tuple[float, float, str]
+
+
+class IntervalTree:
+    """Статическое центрированное дерево интервалов [min_price, max_price] для stabbing-запросов."""
+
+    def __init__(self, intervals: list[Interval]):
+        self.left: Optional[IntervalTree] = None
+        self.right: Optional[IntervalTree] = None
+        self.by_start: list[Interval] = []
+        self.by_end: list[Interval] = []
+        if not intervals:
+            self.center = None
+            return
+
+        endpoints = sorted(value for low, high, _ in intervals for value in (low, high))
+        self.center = endpoints[len(endpoints) // 2]
+
+        left, right, middle = [], [], []
+        for interval in intervals:
+            low, high, _ = interval
+            if high < self.center:
+                left.append(interval)
+            elif low > self.center:
+                right.append(interval)
+            else:
+                middle.append(interval)
+
+        self.by_start = sorted(middle, key=lambda interval: interval[0])
+        self.by_end = sorted(middle, key=lambda interval: -interval[1])
+        if left:
+            self.left = IntervalTree(left)
+        if right:
+            self.right = IntervalTree(right)
+
+    def stab(self, point: float, out: list[str]) -> list[str]:
+        node = self
+        while node is not None and node.center is not None:
+            if point < node.center:
+                for low, _, user_id in node.by_start:
+                    if low > point:
+                        break
+                    out.append(user_id)
+                node = node.left
+            elif point > node.center:
+                for _, high, user_id in node.by_end:
+                    if high < point:
+                        break
+                    out.append(user_id)
+                node = node.right
+            else:
+                out.extend(user_id for _, _, user_id in node.by_start)
+                break
+        return out
+
+
+class PriceBucket:
+    """Подписки одной группы (город, район, комнаты); дерево перестраивается лениво после изменений."""
+
+    def __init__(self):
+        self.intervals: dict[str, tuple[float, float]] = {}
+        self.tree: Optional[IntervalTree] = None
+
+    def put(self, user_id: str, min_price: float, max_price: float) -> None:
+        self.intervals[user_id] = (min_price, max_price)
+        self.tree = None
+
+    def remove(self, user_id: str) -> None:
+        if self.intervals.pop(user_id, None) is not None:
+            self.tree = None
+
+    def stab(self, price: float, out: list[str]) -> list[str]:
+        if self.tree is None:
+            self.tree = IntervalTree([(low, high, user_id) for user_id, (low, high) in self.intervals.items()])
+        return self.tree.stab(price, out)
+
+
+class SubscriptionIndex:
+    """Активные пользователи в памяти: подбор получателей поста без обращения к базе."""
+
+    def __init__(self):
+        self.buckets: dict[tuple[str, str, int], PriceBucket] = {}
+        self.keys: dict[str, tuple[str, str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    async def rebuild(self) -> None:
+        # сначала читаем, потом подменяем: между await индекс не должен оставаться пустым
+        users = await User.filter(is_active=True)
+        self.buckets.clear()
+        self.keys.clear()
+        for user in users:
+            self.update(user)
+        logger.info(f"Subscription index rebuilt: {len(self)} active users")
+
+    def update(self, user: User) -> None:
+        # User.id — TextField, но после get_or_create(id=<int>) в объекте остаётся int
+        user_id = str(user.id)
+        self.remove(user_id)
+        if not user.is_active:
+            return
+        rooms = user.rooms_count if user.rooms_count in ROOMS_BUCKETS else ANY_ROOMS
+        key = (user.city, str(user.district).strip().lower(), rooms)
+        self.buckets.setdefault(key, PriceBucket()).put(user_id, user.min_price, user.max_price)
+        self.keys[user_id] = key
+
+    def remove(self, user_id: str) -> None:
+        user_id = str(user_id)
+        key = self.keys.pop(user_id, None)
+        if key is not None:
+            self.buckets[key].remove(user_id)
+
+    def match(self, post: Post) -> list[str]:
+        """id пользователей, чьи фильтры подходят посту."""
+        districts = {"all"}
+        if post.city_district:
+            districts.add(post.city_district)
+
+        if post.rooms_num is None:
+            rooms_buckets = ROOMS_BUCKETS
+        else:
+            rooms_buckets = (min(post.rooms_num, 4), ANY_ROOMS)
+
+        price = post.price_byn or 0.0
+        result: list[str] = []
+        for district in districts:
+            for rooms in rooms_buckets:
+                bucket = self.buckets.get((post.city, district, rooms))
+                if bucket:
+                    bucket.stab(price, result)
+        return result
+
+
+subscription_index = SubscriptionIndex()
@@ -4,28 +4,61 @@ from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, InputMedia
     KeyboardButton
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import Message, CallbackQuery
 from aiogram.client.default import DefaultBotProperties
-from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
 import asyncio
 import os
 from dotenv import load_dotenv
-from db import get_or_create_user, get_user_by_id, get_districts_from_database
+from db import get_or_create_user, get_user_by_id, refresh_user, save_user, get_city_districts, save_image_file_ids
 from messages import (start_message_text, min_price_text,
                       max_price_text, new_price_accepted,
                       need_number_text, city_text)
-from logger import logger
-from typing import Any
+from logger import log_context, logger
+from typing import Any, Optional
 from models import Image, User
+from delivery import DeliveryEngine, RequestMetricsMiddleware, TelegramLimiter
+from metrics import timed
+from cache import LRUCache
+from fsm_storage import DatabaseStorage
 
 
 load_dotenv()
 
 token = os.getenv('TG_BOT_TOKEN')
-bot = Bot(token, default=DefaultBotProperties(parse_mode='Markdown'))
-dp = Dispatcher()
-
-setting_messages = {}
+# свой сервер Bot API (локальный telegram-bot-api или заглушка для бенчмарков)
+api_server = os.getenv('TG_API_SERVER')
+session = AiohttpSession(api=TelegramAPIServer.from_base(api_server)) if api_server else None
+bot = Bot(token, session=session, default=DefaultBotProperties(parse_mode='Markdown'))
+bot.session.middleware(RequestMetricsMiddleware())
+# процессов, принимающих webhook на одном порту (роль webhook)
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', 1))
+# шаги диалога одного пользователя могут попасть в разные процессы: тогда FSM хранится в базе
+dp = Dispatcher(storage=DatabaseStorage() if WEBHOOK_WORKERS > 1 else MemoryStorage())
+
+TG_GLOBAL_RPS = float(os.getenv('TG_GLOBAL_RPS', 30))
+# доля общего лимита у краулера при раздельном запуске ролей; остальное делят процессы webhook
+TG_CRAWLER_RPS_SHARE = float(os.getenv('TG_CRAWLER_RPS_SHARE', 0.8))
+delivery = DeliveryEngine(TelegramLimiter(global_rate=TG_GLOBAL_RPS,
+                                          chat_rate=float(os.getenv('TG_CHAT_RPS', 1))),
+                          workers=int(os.getenv('TG_SENDER_WORKERS', 16)))
+
+# polling — по умолчанию; webhook — обновления приходят POST-запросами на aiohttp-сервер
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8080))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET') or None
+# публичный адрес, который регистрируется в Telegram через setWebhook (без него регистрацию делают вручную)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '').rstrip('/')
+
+# id последнего сообщения настроек на пользователя; удалить сообщение бот может только в течение 48 часов
+setting_messages = LRUCache(maxsize=int(os.getenv('SETTING_MESSAGES_SIZE', 10_000)), ttl=48 * 3600)
 
 
 class PriceRange(StatesGroup):
@@ -61,7 +94,7 @@ async def command_settings(message: Message) -> None:
             pass
 
     msg = await message.answer("⚙️ Настройки ⚙️")
-    setting_messages[user_id] = msg.message_id
+    setting_messages.put(user_id, msg.message_id)
 
     await render_settings_menu(user, msg)
 
@@ -100,9 +133,10 @@ async def choose_rooms(callback: CallbackQuery) -> None:
     except TelegramBadRequest:
         await callback.message.edit_reply_markup(reply_markup=None)
 
+    await refresh_user(user)
     if user.rooms_count != rooms_settings:
         user.rooms_count = rooms_settings
-        await user.save()
+        await save_user(user, "rooms_count")
         await callback.message.edit_text("Ваш выбор успешно сохранён 💾")
     else:
         await callback.message.edit_text("У вас уже выбран этот вариант 👌")
@@ -121,7 +155,7 @@ async def choose_city(callback: CallbackQuery, state: FSMContext) -> None:
         [InlineKeyboardButton(text="🌇 Могилёв 🌇", callback_data="city_mogilev")]
     ])
 
-    setting_messages[callback.from_user.id] = callback.message.message_id
+    setting_messages.put(callback.from_user.id, callback.message.message_id)
 
     await callback.message.edit_text(city_text(), reply_markup=kb)
 
@@ -129,13 +163,14 @@ async def choose_city(callback: CallbackQuery, state: FSMContext) -> None:
 @dp.callback_query(lambda c: c.data == "change_activity")
 async def change_activity(callback: CallbackQuery) -> None:
     user, _ = await get_or_create_user(callback.from_user.id, callback.from_user.is_bot, callback.from_user.first_name)
+    await refresh_user(user)
     if not user.is_active:
         user.is_active = True
-        await user.save()
+        await save_user(user, "is_active")
         await callback.message.edit_text(f"✅ Рассылка *включена*! Теперь я буду присылать тебе новые объявления 📩")
     else:
         user.is_active = False
-        await user.save()
+        await save_user(user, "is_active")
         await callback.message.edit_text(f"🚫 Рассылка *приостановлена*. Ты можешь включить её снова в любое время.")
 
 
@@ -149,7 +184,7 @@ async def city_selected(callback: CallbackQuery, state: FSMContext) -> None:
 
     user, _ = await get_or_create_user(callback.from_user.id, callback.from_user.is_bot, callback.from_user.first_name)
 
-    districts = await get_districts_from_database(city)
+    districts = get_city_districts(city)
 
     keyboard_with_districts = [[InlineKeyboardButton(text=district, callback_data=f"districts_{district}")] for district
                                in districts]
@@ -165,9 +200,10 @@ async def district_selected(callback: CallbackQuery, state: FSMContext) -> None:
     data = await state.get_data()
     city = data['city']
     user, _ = await get_or_create_user(callback.from_user.id, callback.from_user.is_bot, callback.from_user.first_name)
+    await refresh_user(user)
     user.city = city
     user.district = district
-    await user.save()
+    await save_user(user, "city", "district")
 
     await state.clear()
 
@@ -216,71 +252,167 @@ async def set_max_price(message: Message, state: FSMContext) -> None:
         return
 
     user, _ = await get_or_create_user(message.from_user.id, message.from_user.is_bot, message.from_user.first_name)
+    await refresh_user(user)
     user.min_price = min_price
     user.max_price = max_price
-    await user.save()
+    await save_user(user, "min_price", "max_price")
 
     await state.clear()
     msg = await message.answer(new_price_accepted(min_price, max_price))
     await render_settings_menu(user, msg)
 
 
-async def send_message_to_all(users_group: list[User], message: str) -> None:
-    for user in users_group:
-        user_id = user.id
-        try:
-            await bot.send_message(user_id, message)
-        except Exception as e:
-            logger.exception(f"Message to user [{user_id}] not sent: {e}")
-        await asyncio.sleep(0.2)
+def is_user_unreachable(error: Exception) -> bool:
+    """Пользователь заблокировал бота или удалил аккаунт: повторная отправка не поможет."""
+    return isinstance(error, TelegramForbiddenError) or "USER_IS_BLOCKED" in str(error)
 
 
+async def deactivate_user(user_id: str) -> None:
+    logger.info(f"User [{user_id}] was block bot")
+    user = await get_user_by_id(user_id)
+    if not user:
+        logger.error(f"User {user_id} not found, skip deactivation")
+        return
+    user.is_active = False
+    await save_user(user, "is_active")
+
+
+@timed("tg.send_message_to_all")
+async def send_message_to_all(user_ids: list[str], message: str) -> dict[str, Optional[bool]]:
+    """Результат по пользователю: True — отправлено, False — ошибка, None — пользователь недоступен."""
+    async def send_one(user_id: str) -> Optional[bool]:
+        with log_context(user_id=user_id):
+            try:
+                await delivery.send(user_id, lambda: bot.send_message(user_id, message))
+                return True
+            except Exception as e:
+                if is_user_unreachable(e):
+                    await deactivate_user(user_id)
+                    return None
+                logger.exception(f"Message to user [{user_id}] not sent: {e}")
+                return False
+
+    results = await asyncio.gather(*(send_one(user_id) for user_id in user_ids))
+    return dict(zip(user_ids, results))
+
+
+@timed("tg.message_to_new_user")
 async def message_to_new_user(user_id: str, message: str) -> bool:
     try:
-        await bot.send_message(user_id, message)
+        await delivery.send(user_id, lambda: bot.send_message(user_id, message))
     except Exception as e:
         logger.warning(f"Failed to send message to new user [{user_id}]: {e}")
         return False
 
-    await asyncio.sleep(0.3)
     return True
 
 
 async def start_bot():
+    if BOT_MODE == 'webhook':
+        await run_webhook_server()
+        return
+    # getUpdates не работает, пока в Telegram зарегистрирован webhook
+    await bot.delete_webhook()
     await dp.start_polling(bot)
 
 
-async def send_post_with_images(user_id: str, images: list[Image], message: str) -> None:
+def create_webhook_app() -> web.Application:
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def set_webhook() -> None:
+    if not WEBHOOK_URL:
+        logger.warning("WEBHOOK_URL is not set, webhook is not registered in Telegram")
+        return
+    await bot.set_webhook(f"{WEBHOOK_URL}{WEBHOOK_PATH}", secret_token=WEBHOOK_SECRET)
+    logger.info(f"Webhook registered: {WEBHOOK_URL}{WEBHOOK_PATH}")
+
+
+async def run_webhook_server(register: bool = True, reuse_port: bool = False) -> None:
+    """Принимает обновления до отмены задачи.
+
+    reuse_port позволяет нескольким процессам слушать один порт: ядро само раздаёт им соединения.
+    """
+    runner = web.AppRunner(create_webhook_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT, reuse_port=reuse_port or None).start()
+    logger.info(f"Webhook server listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    if register:
+        await set_webhook()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def build_media_group(images: list[Image], message: str) -> list[InputMediaPhoto]:
     media = []
-    for i, img in enumerate(images[:10]):
+    for i, img in enumerate(images):
+        # после первой загрузки Telegram уже хранит фото — отправляем по file_id, а не по ссылке на Kufar
+        source = img.file_id or img.image_src
         if i == 0:
-            media.append(InputMediaPhoto(media=images[i].image_src, caption=message, parse_mode='Markdown'))
+            media.append(InputMediaPhoto(media=source, caption=message, parse_mode='Markdown'))
         else:
-            media.append(InputMediaPhoto(media=images[i].image_src))
-    while True:
-        try:
-            await bot.send_media_group(chat_id=user_id, media=media)
+            media.append(InputMediaPhoto(media=source))
+    return media
+
+
+@timed("tg.send_post_with_images")
+async def send_post_with_images(user_id: str, images: list[Image], message: str) -> Optional[bool]:
+    """True — отправлено, False — ошибка, None — пользователь заблокировал бота."""
+    # первому получателю отправка идёт прямо в задаче вызывающего: user_id не должен в ней остаться
+    with log_context(user_id=user_id):
+        return await _send_post_with_images(user_id, images, message)
+
+
+async def _send_post_with_images(user_id: str, images: list[Image], message: str) -> Optional[bool]:
+    images = images[:10]
+    media = build_media_group(images, message)
+    try:
+        sent = await delivery.send(user_id, lambda: bot.send_media_group(chat_id=user_id, media=media),
+                                   cost=len(media))
+    except (TelegramBadRequest, TelegramForbiddenError) as e:
+        if is_user_unreachable(e):
+            await deactivate_user(user_id)
+            return None
+        elif any(img.file_id for img in images) and "file" in str(e).lower():
+            logger.warning(f"Stored file_id rejected for user [{user_id}], resending by url: {e}")
+            for img in images:
+                img.file_id = None
+            await save_image_file_ids(images)
+            return await _send_post_with_images(user_id, images, message)
+        else:
+            logger.exception(f"BadRequest for {user_id}: {e}")
+        return False
+    except Exception as e:
+        logger.exception(f"Error to send media group to user [{user_id}]: {e}")
+        return False
+
+    if not all(img.file_id for img in images) and len(sent) == len(images):
+        for img, msg in zip(images, sent):
+            if msg.photo:
+                img.file_id = msg.photo[-1].file_id
+        await save_image_file_ids(images)
+    return True
+
+
+@timed("tg.send_post_with_images_to_all")
+async def send_post_with_images_to_all(user_ids: list[str], images: list[Image],
+                                       message: str) -> dict[str, Optional[bool]]:
+    """Первому получателю фото уходят по ссылкам, остальным — по сохранённым file_id."""
+    results = {}
+    remaining = list(user_ids)
+    while remaining and not all(img.file_id for img in images[:10]):
+        user_id = remaining.pop(0)
+        results[user_id] = await send_post_with_images(user_id, images, message)
+        if results[user_id]:
             break
-        except TelegramRetryAfter as e:
-            logger.warning(f"FloodWait {e.retry_after} sec for user {user_id}")
-            await asyncio.sleep(e.retry_after)
-        except TelegramBadRequest as e:
-            if "USER_IS_BLOCKED" in str(e):
-                logger.info(f"User [{user_id}] was block bot")
-                user = await get_user_by_id(user_id)
-                if not user:
-                    logger.error(f"User {user_id} not found, skip deactivation")
-                    return
-                user.is_active = False
-                await user.save()
-                return
-            else:
-                logger.exception(f"BadRequest for {user_id}: {e}")
-                return
-        except Exception as e:
-            logger.exception(f"Error to send media group to user [{user_id}]: {e}")
-            return
-    await asyncio.sleep(1.5)
+    sent = await asyncio.gather(*(send_post_with_images(user_id, images, message) for user_id in remaining))
+    results.update(zip(remaining, sent))
+    return results
 
 
 def add_button_settings() -> ReplyKeyboardMarkup: